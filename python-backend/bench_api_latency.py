@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+API Latency Benchmark
+Sends /predict and /set_alert requests to a running backend with bounded
+concurrency and reports latency percentiles and requests/sec.
+
+To compare two builds, run it against each and keep the first run's numbers:
+    python bench_api_latency.py --save before.json        # old build running
+    python bench_api_latency.py --baseline before.json    # new build running
+
+Usage: python bench_api_latency.py [--url http://localhost:8000] [--requests 50]
+                                   [--concurrency 4] [--endpoints predict,set_alert]
+"""
+
+import sys
+import json
+import time
+import asyncio
+import argparse
+
+import httpx
+
+PRODUCTS = [
+    ("Kingston Fury Beast 16GB DDR4 RAM", 4299.0, "https://www.amazon.in/dp/B097K2WBL3"),
+    ("Samsung 990 Pro 1TB NVMe SSD", 9999.0, "https://www.amazon.in/dp/B0BHJJ9Y77"),
+    ("Zotac RTX 4070 Twin Edge Graphics Card", 56999.0, "https://www.amazon.in/dp/B0BZSD9HC4"),
+    ("AMD Ryzen 7 7800X3D Processor", 36999.0, "https://www.amazon.in/dp/B0BTZB7F88"),
+]
+
+
+def payload(endpoint, i):
+    name, price, url = PRODUCTS[i % len(PRODUCTS)]
+    if endpoint == 'predict':
+        return {"product_name": name, "current_price": price, "product_url": url}
+    return {"product_url": url, "target_price": price * 0.9, "user_id": f"bench-{i}"}
+
+
+async def run_endpoint(client, endpoint, requests, concurrency):
+    latencies = []
+    failures = 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i):
+        nonlocal failures
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                response = await client.post(f"/{endpoint}", json=payload(endpoint, i))
+                if response.status_code != 200:
+                    failures += 1
+            except httpx.HTTPError:
+                failures += 1
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    pct = lambda p: latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000
+    return {
+        'endpoint': endpoint, 'requests': requests, 'failed': failures, 'rps': requests / elapsed,
+        'p50': pct(0.50), 'p95': pct(0.95), 'p99': pct(0.99), 'max': latencies[-1] * 1000,
+    }
+
+
+async def run(args):
+    async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout) as client:
+        # One untimed request per endpoint so model/feature warm-up isn't counted
+        for endpoint in args.endpoints:
+            try:
+                await client.post(f"/{endpoint}", json=payload(endpoint, 0))
+            except httpx.HTTPError as e:
+                sys.exit(f"Backend not reachable at {args.url}: {e}")
+        return [await run_endpoint(client, endpoint, args.requests, args.concurrency) for endpoint in args.endpoints]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark /predict and /set_alert latency')
+    parser.add_argument('--url', default='http://localhost:8000')
+    parser.add_argument('--requests', type=int, default=50)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--endpoints', default='predict,set_alert')
+    parser.add_argument('--timeout', type=float, default=60)
+    parser.add_argument('--save', help='write results to this JSON file')
+    parser.add_argument('--baseline', help='JSON file from an earlier --save to compare against')
+    args = parser.parse_args()
+    args.endpoints = [e.strip() for e in args.endpoints.split(',') if e.strip()]
+
+    rows = asyncio.run(run(args))
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = {r['endpoint']: r for r in json.load(f)}
+
+    print(f"{'endpoint':<10} {'reqs':>5} {'failed':>7} {'req/s':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for r in rows:
+        print(f"{r['endpoint']:<10} {r['requests']:>5} {r['failed']:>7} {r['rps']:>7.1f} "
+              f"{r['p50']:>8.0f} {r['p95']:>8.0f} {r['p99']:>8.0f} {r['max']:>8.0f}")
+        before = baseline.get(r['endpoint'])
+        if before:
+            print(f"{'  before':<10} {before['requests']:>5} {before['failed']:>7} {before['rps']:>7.1f} "
+                  f"{before['p50']:>8.0f} {before['p95']:>8.0f} {before['p99']:>8.0f} {before['max']:>8.0f}")
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
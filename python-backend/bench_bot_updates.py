@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Bot Update Throughput Benchmark
+Starts fake_bot_api.py, runs PriceAnalysisBot's polling loop against it and
+feeds it /analyze updates spread over several chats. The fake backend /predict
+sleeps --backend-latency-ms, so the numbers show how many updates/sec the bot
+gets through while analyses are in flight.
+
+Each concurrency level is one run per mode; 1 is how the bot behaved before
+updates were processed concurrently. In polling mode the bot long-polls
+getUpdates; in webhook mode the stub POSTs updates to a local server running
+the same /telegram/webhook/{bot_id} handler as main.py. Every run also checks
+that each chat got its replies in the order it sent its messages.
+
+Usage: python bench_bot_updates.py [--updates 200] [--chats 50] [--concurrency 1,8,32]
+                                   [--modes polling,webhook] [--backend-latency-ms 200]
+                                   [--latency-ms 5]
+"""
+
+import os
+import sys
+import time
+import asyncio
+import logging
+import argparse
+import subprocess
+from collections import defaultdict
+from pathlib import Path
+
+import httpx
+
+sys.path.append(str(Path(__file__).parent))
+
+FAKE_TOKEN = '123456:FAKE-benchmark-token'
+
+
+def start_fake_api(args) -> subprocess.Popen:
+    command = [sys.executable, str(Path(__file__).parent / 'fake_bot_api.py'), '--port', str(args.port),
+               '--latency-ms', str(args.latency_ms), '--backend-latency-ms', str(args.backend_latency_ms)]
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL)
+    for _ in range(100):
+        try:
+            httpx.get(f"{args.api}/__fake/stats", timeout=1)
+            return process
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    process.kill()
+    sys.exit("fake_bot_api.py did not start")
+
+
+def check_order(messages, chats):
+    """Chats whose replies arrived out of order (each /analyze sends a status line, then the result)"""
+    by_chat = defaultdict(list)
+    for m in messages:
+        by_chat[m['chat_id']].append(m['text'])
+    broken = []
+    for chat_id in chats:
+        texts = by_chat[chat_id]
+        results = [t for t in texts if 'FAKE' in t]
+        expected = [f"FAKE{seq}" for seq in range(len(results))]
+        in_order = all(e in r for e, r in zip(expected, results))
+        alternating = all(('FAKE' in t) == bool(i % 2) for i, t in enumerate(texts))
+        if not (in_order and alternating):
+            broken.append(chat_id)
+    return broken
+
+
+async def start_webhook_server(port):
+    """The webhook route from main.py, without the rest of the backend"""
+    import uvicorn
+    from fastapi import FastAPI, Request, Response
+    from telegram_integration.webhook import TelegramWebhooks, WEBHOOK_PATH, SECRET_HEADER
+
+    webhooks = TelegramWebhooks(base_url=f"http://127.0.0.1:{port}", tokens=[(1, FAKE_TOKEN)])
+    app = FastAPI()
+
+    @app.post(WEBHOOK_PATH + "/{bot_id}")
+    async def telegram_webhook(bot_id: int, request: Request):
+        status = await webhooks.handle(bot_id, request.headers.get(SECRET_HEADER), await request.body())
+        return Response(status_code=status)
+
+    server = uvicorn.Server(uvicorn.Config(app, host='127.0.0.1', port=port, log_level='warning'))
+    task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+    return webhooks, server, task
+
+
+async def run_level(args, client, mode, concurrency):
+    from telegram_integration.bot import PriceAnalysisBot
+
+    await client.post('/__fake/reset')
+    if mode == 'webhook':
+        webhooks, server, server_task = await start_webhook_server(args.webhook_port)
+        await webhooks.start(concurrent_updates=concurrency)
+    else:
+        bot = PriceAnalysisBot(token=FAKE_TOKEN, concurrent_updates=concurrency)
+        app = bot.application
+        await app.initialize()
+        await app.start()
+        await app.updater.start_polling(poll_interval=0, timeout=5)
+
+    chats = list(range(1001, 1001 + args.chats))
+    per_chat = max(1, args.updates // args.chats)
+    total = per_chat * len(chats)
+    started = time.perf_counter()
+    await client.post('/__fake/updates', json={'chats': chats, 'per_chat': per_chat})
+
+    stats = {}
+    while time.perf_counter() - started < args.timeout:
+        stats = (await client.get('/__fake/stats')).json()
+        if stats['sent'] >= 2 * total:
+            break
+        await asyncio.sleep(0.05)
+    elapsed = time.perf_counter() - started
+
+    if mode == 'webhook':
+        await webhooks.stop()
+        server.should_exit = True
+        await server_task
+    else:
+        await app.updater.stop()
+        await app.stop()
+        await app.shutdown()
+        await bot.close()
+
+    done = stats.get('sent', 0) // 2
+    return {
+        'mode': mode, 'concurrency': concurrency, 'updates': total, 'done': done, 'seconds': elapsed,
+        'rate': done / elapsed, 'out_of_order': len(check_order(stats.get('messages', []), chats)),
+    }
+
+
+async def run(args):
+    async with httpx.AsyncClient(base_url=args.api, timeout=30) as client:
+        return [await run_level(args, client, mode, c) for mode in args.modes for c in args.concurrency]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark concurrent Telegram update processing')
+    parser.add_argument('--updates', type=int, default=200)
+    parser.add_argument('--chats', type=int, default=50)
+    parser.add_argument('--concurrency', default='1,8,32')
+    parser.add_argument('--modes', default='polling,webhook')
+    parser.add_argument('--backend-latency-ms', type=float, default=200.0)
+    parser.add_argument('--latency-ms', type=float, default=5.0, help='Bot API latency per call')
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--webhook-port', type=int, default=8083)
+    parser.add_argument('--timeout', type=float, default=120.0, help='give up on a run after this many seconds')
+    args = parser.parse_args()
+    args.concurrency = [int(c) for c in args.concurrency.split(',') if c.strip()]
+    args.modes = [m.strip() for m in args.modes.split(',') if m.strip()]
+    args.api = f"http://127.0.0.1:{args.port}"
+
+    # Read at import time by the bot modules
+    os.environ['TELEGRAM_API_URL'] = args.api
+    os.environ['BACKEND_URL'] = f"{args.api}/__fake/backend"
+
+    for name in ('httpx', 'telegram'):
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+    fake = start_fake_api(args)
+    try:
+        rows = asyncio.run(run(args))
+    finally:
+        fake.terminate()
+
+    print(f"{'mode':<8} {'concurrency':>11} {'updates':>8} {'done':>6} {'seconds':>8} {'updates/s':>10} {'out of order':>13}")
+    for r in rows:
+        print(f"{r['mode']:<8} {r['concurrency']:>11} {r['updates']:>8} {r['done']:>6} {r['seconds']:>8.1f} "
+              f"{r['rate']:>10.1f} {r['out_of_order']:>13}")
+
+
+if __name__ == '__main__':
+    main()
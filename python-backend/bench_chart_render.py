@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Chart Render Benchmark
+Renders price history + forecast charts for synthetic products and reports:
+- cold renders/sec and latency per size, rendering inline vs on the chart pool
+- the longest event-loop stall seen while those renders run
+- cached charts/sec once every chart is in the LRU
+
+Usage: python bench_chart_render.py [--products 40] [--points 180] [--workers 1,2,4]
+"""
+
+import sys
+import time
+import asyncio
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(Path(__file__).parent))
+
+from charts import ChartRenderer, render_png, SIZES
+
+
+def make_products(count, points, rng):
+    products = []
+    for i in range(count):
+        start = rng.uniform(2000, 60000)
+        prices = start * np.exp(np.cumsum(rng.normal(0, 0.01, points)))
+        history = pd.DataFrame({'ds': pd.date_range(end='2026-10-01', periods=points), 'y': prices})
+        forecast = [{'date': d.strftime('%Y-%m-%d'), 'predicted_price': round(prices[-1] * (1 + 0.001 * k)),
+                     'lower_bound': round(prices[-1] * 0.95), 'upper_bound': round(prices[-1] * 1.05)}
+                    for k, d in enumerate(pd.date_range(start='2026-10-02', periods=30))]
+        products.append((f"https://www.amazon.in/dp/BENCH{i:05d}", history, forecast))
+    return products
+
+
+async def loop_lag(stop: asyncio.Event, interval=0.005):
+    """Longest gap between ticks of a task that wants to run every `interval` seconds"""
+    worst = 0.0
+    last = time.perf_counter()
+    while not stop.is_set():
+        await asyncio.sleep(interval)
+        now = time.perf_counter()
+        worst = max(worst, now - last - interval)
+        last = now
+    return worst
+
+
+async def run_case(products, size, render):
+    stop = asyncio.Event()
+    lag = asyncio.create_task(loop_lag(stop))
+    latencies = []
+
+    async def one(product):
+        started = time.perf_counter()
+        await render(product)
+        latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(p) for p in products))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    latencies.sort()
+    return len(products) / elapsed, latencies[len(latencies) // 2] * 1000, await lag * 1000
+
+
+async def run(args):
+    products = make_products(args.products, args.points, np.random.default_rng(5))
+    print(f"{'case':<22} {'size':<6} {'charts/s':>9} {'p50 ms':>8} {'loop stall ms':>14}")
+
+    for size in SIZES:
+        async def inline(product):
+            url, history, forecast = product
+            render_png(url, history, forecast, SIZES[size])
+        rate, p50, lag = await run_case(products, size, inline)
+        print(f"{'inline (on the loop)':<22} {size:<6} {rate:>9.1f} {p50:>8.0f} {lag:>14.0f}")
+
+        for workers in args.workers:
+            renderer = ChartRenderer(workers=workers)
+
+            async def pooled(product):
+                url, history, forecast = product
+                await renderer.chart(url, history, forecast, size)
+            rate, p50, lag = await run_case(products, size, pooled)
+            print(f"{f'pool, {workers} workers':<22} {size:<6} {rate:>9.1f} {p50:>8.0f} {lag:>14.0f}")
+
+        # Hits never leave the loop, so a stall figure would just be the whole batch
+        rate, p50, _ = await run_case(products * args.repeat, size, pooled)
+        print(f"{'cached':<22} {size:<6} {rate:>9.0f} {p50:>8.2f} {'-':>14}   hit rate {renderer.stats()['hit_rate']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark price chart rendering')
+    parser.add_argument('--products', type=int, default=40)
+    parser.add_argument('--points', type=int, default=180, help='history points per product')
+    parser.add_argument('--workers', default='1,2,4')
+    parser.add_argument('--repeat', type=int, default=25, help='cached lookups per chart')
+    args = parser.parse_args()
+    args.workers = [int(w) for w in args.workers.split(',') if w.strip()]
+    asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    main()
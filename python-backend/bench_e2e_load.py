@@ -0,0 +1,636 @@
+#!/usr/bin/env python3
+"""
+End-to-end Load Test
+Runs the whole backend (main.py, single process or pre-forked with --workers)
+against local stand-ins only, and drives open-loop load at it:
+
+- Postgres: --database-url, or a throwaway cluster started with initdb/pg_ctl
+  from the local PostgreSQL install. Tables come from init_db.py; products and
+  their price history are seeded with seed_data.py's random walk, and every
+  product is indexed in product_identities so /scrape_price answers from the
+  index. Earlier load rows (URLs containing /dp/LOAD) are replaced.
+- Upstream sites: replay_server.py with a synthetic Google News feed, plus any
+  recorded archive passed with --fixtures (HTTP_RECORD, see http_replay.py).
+  Store searches without a fixture get a 404, i.e. "not found".
+- Telegram: fake_bot_api.py, for the alert and analysis notifications.
+
+Requests arrive as a Poisson process at --rate per second whether or not
+earlier ones have finished, so a slow backend builds a queue instead of
+slowing the test down. Latency is measured from each request's scheduled
+time, which keeps the client's own delays in the numbers. Product popularity
+is skewed (--skew), as it is in production, so caches and coalescing matter.
+
+Reports completed requests/sec, p50/p95/p99/max and errors per endpoint,
+CPU and peak RSS of the backend's processes, and the mean of each /predict
+stage from /metrics. --save keeps a run; --baseline compares against one and
+exits 1 when an endpoint got slower or less reliable than --tolerance allows.
+
+Usage: python bench_e2e_load.py [--rate 20] [--duration 60] [--warmup 10]
+                                [--mix predict=4,scrape_price=2,set_alert=1,home=3]
+                                [--workers 2] [--database-url postgresql://...]
+                                [--fixtures recorded.jsonl.gz] [--upstream-latency-ms 80]
+                                [--save run.json] [--baseline run.json]
+       python bench_e2e_load.py --url http://localhost:8000 ...   # an already running backend;
+                                                                  # needs --database-url to seed
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import random
+import shutil
+import socket
+import asyncio
+import argparse
+import tempfile
+import threading
+import subprocess
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import httpx
+
+HERE = Path(__file__).parent
+sys.path.append(str(HERE))
+
+ENDPOINTS = ('predict', 'scrape_price', 'set_alert', 'home')
+LOAD_URL = "https://www.amazon.in/dp/LOAD{:06d}"
+BRANDS = ["Samsung", "Kingston", "Zotac", "Lenovo", "boAt", "Sony", "Crucial", "Logitech", "ASUS", "OnePlus"]
+LINES = ["Fury Beast RAM", "990 Pro NVMe SSD", "Twin Edge Graphics Card", "IdeaPad Slim Laptop",
+         "Rockerz Headphones", "WH Noise Cancelling", "MX Master Mouse", "Nord Smartphone"]
+SIZES = ["8GB", "16GB", "32GB", "512GB", "1TB", "2TB"]
+NEWS_WORDS = ["prices rise as chip shortage bites", "discounts deepen in festive sale",
+              "memory prices fall on oversupply", "GPU prices surge on AI demand",
+              "smartphone makers cut prices", "import duty hike to raise electronics prices"]
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_for(url: str, timeout: float, process: Optional[subprocess.Popen] = None) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            return False
+        try:
+            if httpx.get(url, timeout=2).status_code < 500:
+                return True
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    return False
+
+
+# --- Local services ---------------------------------------------------------
+
+class LocalPostgres:
+    """
+    A throwaway cluster in a temp dir, trusted local connections only.
+    initdb refuses to run as root, so as root (containers, CI) the server runs
+    as an unprivileged user instead.
+    """
+
+    def __init__(self, workdir: Path, user: str = 'nobody'):
+        self.datadir = workdir / 'pg'
+        self.port = free_port()
+        self.bindir = self._bindir()
+        self.prefix: List[str] = []
+        if os.geteuid() == 0:
+            import pwd
+            owner = pwd.getpwnam(user)
+            self.prefix = ['runuser', '-u', user, '--']
+            self.datadir = Path(tempfile.mkdtemp(prefix='e2e-pg-'))
+            os.chown(self.datadir, owner.pw_uid, owner.pw_gid)
+
+    @staticmethod
+    def _bindir() -> Path:
+        if shutil.which('initdb'):
+            return Path(shutil.which('initdb')).parent
+        if shutil.which('pg_config'):
+            return Path(subprocess.check_output(['pg_config', '--bindir'], text=True).strip())
+        sys.exit("No PostgreSQL install found (initdb/pg_config); pass --database-url instead")
+
+    @property
+    def url(self) -> str:
+        return f"postgresql://postgres@127.0.0.1:{self.port}/postgres"
+
+    def start(self):
+        subprocess.run([*self.prefix, str(self.bindir / 'initdb'), '-D', str(self.datadir / 'data'),
+                        '-U', 'postgres', '-A', 'trust', '--no-sync'], check=True, stdout=subprocess.DEVNULL)
+        options = f"-p {self.port} -k {self.datadir} -c listen_addresses=127.0.0.1 -c fsync=off"
+        subprocess.run([*self.prefix, str(self.bindir / 'pg_ctl'), '-D', str(self.datadir / 'data'), '-o', options,
+                        '-l', str(self.datadir / 'server.log'), '-w', 'start'], check=True, stdout=subprocess.DEVNULL)
+
+    def stop(self):
+        subprocess.run([*self.prefix, str(self.bindir / 'pg_ctl'), '-D', str(self.datadir / 'data'), '-m', 'fast',
+                        'stop'], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        if self.prefix:
+            shutil.rmtree(self.datadir, ignore_errors=True)
+
+
+def catalog(count: int, seed: int) -> List[Dict]:
+    """Deterministic load products; the model number makes each title resolvable"""
+    rng = random.Random(seed)
+    products = []
+    for i in range(count):
+        brand, line, size = rng.choice(BRANDS), rng.choice(LINES), rng.choice(SIZES)
+        products.append({"title": f"{brand} {line} LD{i:05d}X {size}", "url": LOAD_URL.format(i),
+                         "price": float(rng.randrange(999, 90000, 100))})
+    return products
+
+
+def seed_database(database_url: str, products: List[Dict], days: int, seed: int):
+    """init_db.py's schema, then products with seed_data.py-style history and index entries"""
+    os.environ['DATABASE_URL'] = database_url  # read by init_db at import
+    import numpy as np
+    from sqlalchemy import create_engine, text
+    import init_db
+    from product_index import ProductIndex
+    from scraping.types import ScrapedProduct
+
+    init_db.init_db()
+    np.random.seed(seed)
+    engine = create_engine(database_url)
+    with engine.begin() as conn:
+        conn.execute(text("""
+            DELETE FROM price_history WHERE product_id IN (SELECT id FROM products WHERE url LIKE '%/dp/LOAD%')
+        """))
+        conn.execute(text("DELETE FROM products WHERE url LIKE '%/dp/LOAD%'"))
+        conn.execute(text("DELETE FROM product_identities WHERE product_url LIKE '%/dp/LOAD%'"))
+        conn.execute(text("INSERT INTO products (title, url, source, latest_price) "
+                          "VALUES (:title, :url, 'Amazon', :price)"), products)
+        ids = dict(conn.execute(text("SELECT url, id FROM products WHERE url LIKE '%/dp/LOAD%'")).fetchall())
+
+        # seed_data.py's walk: a little above today's price in the past, drifting down to it
+        now = datetime.now()
+        rows = []
+        for product in products:
+            product_id = ids[product["url"]]
+            current = product["price"]
+            price = current * (1 + np.random.uniform(0.05, 0.15))
+            for i in range(days, 0, -1):
+                price += np.random.normal(0, current * 0.05 * 0.2)
+                if i < 5:
+                    price = price * 0.8 + current * 0.2
+                rows.append({"product_id": product_id, "price": round(max(price, current * 0.5)),
+                             "created_at": now - timedelta(days=i)})
+        conn.execute(text("INSERT INTO price_history (product_id, price, created_at) "
+                          "VALUES (:product_id, :price, :created_at)"), rows)
+    engine.dispose()
+
+    index = ProductIndex(database_url)
+    index.observe(ScrapedProduct(title=p["title"], price=p["price"], source="Amazon", product_url=p["url"])
+                  for p in products)
+    print(f"Seeded {len(products)} products, {len(rows):,} history rows")
+
+
+def build_fixtures(path: Path, recorded: Optional[str]):
+    """The recorded archive if any, plus a news feed every query falls back to"""
+    from http_replay import FixtureArchive
+
+    archive = FixtureArchive(str(path))
+    if recorded:
+        source = FixtureArchive(recorded)
+        for key in source:
+            method, _, url = key.partition(' ')
+            archive.add(method, url, *source.get(method, url))
+    items = ''.join(
+        f"<item><title>{headline} - Example Times</title><link>https://news.example.com/{i}</link>"
+        f"<pubDate>{(datetime.now(timezone.utc) - timedelta(hours=6 * i)).strftime('%a, %d %b %Y %H:%M:%S GMT')}</pubDate></item>"
+        for i, headline in enumerate(NEWS_WORDS * 3))
+    feed = f'<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel><title>News</title>{items}</channel></rss>'
+    feed_url = "https://news.google.com/rss/search?q=load+test"
+    if archive.get('GET', feed_url, loose=True) is None:
+        archive.add('GET', feed_url, 200, {'content-type': 'application/rss+xml; charset=UTF-8',
+                                           'cache-control': 'max-age=300'}, feed.encode())
+    archive.save()
+    return len(archive)
+
+
+class Stack:
+    """The stand-in services and the backend, as subprocesses"""
+
+    def __init__(self, args, workdir: Path):
+        self.args = args
+        self.workdir = workdir
+        self.processes: List[subprocess.Popen] = []
+        self.backend: Optional[subprocess.Popen] = None
+        self.log_path = workdir / 'backend.log'
+
+    def _spawn(self, command, env=None, log=subprocess.DEVNULL) -> subprocess.Popen:
+        process = subprocess.Popen(command, cwd=str(HERE), env=env, stdout=log, stderr=subprocess.STDOUT)
+        self.processes.append(process)
+        return process
+
+    def start(self, database_url: str) -> str:
+        args = self.args
+        archive = self.workdir / 'fixtures.jsonl.gz'
+        print(f"Fixtures: {build_fixtures(archive, args.fixtures)}")
+
+        replay_port, telegram_port, backend_port = free_port(), free_port(), free_port()
+        replay = self._spawn([sys.executable, 'replay_server.py', '--archive', str(archive),
+                              '--port', str(replay_port), '--latency-ms', str(args.upstream_latency_ms),
+                              '--jitter-ms', str(args.upstream_jitter_ms)])
+        telegram = self._spawn([sys.executable, 'fake_bot_api.py', '--port', str(telegram_port),
+                                '--latency-ms', '20'])
+        if not wait_for(f"http://127.0.0.1:{replay_port}/__replay/stats", 30, replay):
+            sys.exit("replay_server.py did not start")
+        if not wait_for(f"http://127.0.0.1:{telegram_port}/__fake/stats", 30, telegram):
+            sys.exit("fake_bot_api.py did not start")
+
+        cache = self.workdir / 'cache'
+        env = {
+            **os.environ,
+            'DATABASE_URL': database_url,
+            'HTTP_REPLAY_URL': f"http://127.0.0.1:{replay_port}",
+            'TELEGRAM_API_URL': f"http://127.0.0.1:{telegram_port}",
+            'TELEGRAM_BOT_TOKEN_1': '9100:FAKE-load-token',
+            'TELEGRAM_CHAT_ID': '424242',
+            'PORT': str(backend_port),
+            # Nothing shared with a real deployment on this host
+            'SCRAPE_CACHE_DIR': str(cache / 'scrape'),
+            'HTTP_CACHE_DIR': str(cache / 'http'),
+            'METRICS_DIR': str(cache / 'metrics'),
+            'SERVE_STATE_DIR': str(cache / 'serve'),
+            'PROFILE_DIR': str(cache / 'profiles'),
+        }
+        if args.workers:
+            env['BACKEND_WORKERS'] = str(args.workers)
+            command = [sys.executable, 'serve.py']
+        else:
+            command = [sys.executable, '-m', 'uvicorn', 'main:app', '--host', '127.0.0.1',
+                       '--port', str(backend_port), '--log-level', 'warning', '--no-access-log']
+        self.backend = self._spawn(command, env, open(self.log_path, 'w'))
+        url = f"http://127.0.0.1:{backend_port}"
+        if not wait_for(f"{url}/", args.startup_timeout, self.backend):
+            tail = self.log_path.read_text(errors='replace').splitlines()[-20:]
+            sys.exit('\n'.join(["Backend did not start:", *tail]))
+        return url
+
+    def stop(self):
+        for process in reversed(self.processes):
+            process.terminate()
+        for process in self.processes:
+            try:
+                process.wait(timeout=35)  # gunicorn's graceful_timeout is 30s
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+# --- Resource use -----------------------------------------------------------
+
+class ProcessSampler:
+    """CPU seconds and resident memory of a process and its children, from /proc"""
+
+    def __init__(self, pid: int, interval: float = 0.5):
+        self.pid = pid
+        self.interval = interval
+        self.peak_rss = 0
+        self.peak_processes = 0
+        self._cpu: Dict[int, float] = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='resource-sampler', daemon=True)
+        self._ticks = os.sysconf('SC_CLK_TCK')
+        self._page = os.sysconf('SC_PAGE_SIZE')
+
+    def _tree(self) -> List[int]:
+        children = defaultdict(list)
+        for entry in Path('/proc').iterdir():
+            if entry.name.isdigit():
+                try:
+                    fields = (entry / 'stat').read_text().rsplit(')', 1)[1].split()
+                except OSError:
+                    continue
+                children[int(fields[1])].append(int(entry.name))
+        tree, pending = [], [self.pid]
+        while pending:
+            pid = pending.pop()
+            tree.append(pid)
+            pending.extend(children.get(pid, ()))
+        return tree
+
+    def sample(self):
+        rss = 0
+        tree = self._tree()
+        for pid in tree:
+            try:
+                fields = Path(f'/proc/{pid}/stat').read_text().rsplit(')', 1)[1].split()
+                resident = int(Path(f'/proc/{pid}/statm').read_text().split()[1])
+            except OSError:
+                continue
+            # utime and stime; a process that exits keeps its last reading
+            self._cpu[pid] = (int(fields[11]) + int(fields[12])) / self._ticks
+            rss += resident * self._page
+        self.peak_rss = max(self.peak_rss, rss)
+        self.peak_processes = max(self.peak_processes, len(tree))
+
+    @property
+    def cpu_seconds(self) -> float:
+        return sum(self._cpu.values())
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def start(self):
+        self.sample()
+        self._baseline = self.cpu_seconds
+        self._thread.start()
+
+    def stop(self) -> Dict:
+        self._stop.set()
+        self._thread.join()
+        self.sample()
+        return {'cpu_seconds': self.cpu_seconds - self._baseline, 'peak_rss_mb': self.peak_rss / 2 ** 20,
+                'processes': self.peak_processes}
+
+
+# --- Load -------------------------------------------------------------------
+
+class Workload:
+    def __init__(self, args, products: List[Dict]):
+        self.products = products
+        self.unknown = args.unknown
+        self.skew = args.skew
+        self.rng = random.Random(args.seed)
+        mix = dict(part.split('=') for part in args.mix.split(',') if part.strip())
+        unknown = set(mix) - set(ENDPOINTS)
+        if unknown:
+            sys.exit(f"Unknown endpoints in --mix: {', '.join(sorted(unknown))}")
+        self.endpoints = [e for e in ENDPOINTS if float(mix.get(e, 0)) > 0]
+        self.weights = [float(mix[e]) for e in self.endpoints]
+        self.sequence = 0
+
+    def product(self) -> Dict:
+        self.sequence += 1
+        if self.rng.random() < self.unknown:
+            return {"title": f"Unlisted Gadget UX{self.sequence:07d}", "price": 4999.0,
+                    "url": f"https://www.amazon.in/dp/MISS{self.sequence:06d}"}
+        # Low indices are the popular products
+        return self.products[int(len(self.products) * self.rng.random() ** self.skew)]
+
+    def next(self):
+        endpoint = self.rng.choices(self.endpoints, self.weights)[0]
+        if endpoint == 'home':
+            return endpoint, 'GET', '/', None
+        p = self.product()
+        if endpoint == 'predict':
+            body = {"product_name": p["title"], "current_price": round(p["price"] * self.rng.uniform(0.97, 1.03)),
+                    "product_url": p["url"]}
+        elif endpoint == 'scrape_price':
+            body = {"product_title": p["title"]}
+        else:
+            body = {"product_url": p["url"], "target_price": round(p["price"] * 0.9),
+                    "user_id": f"load-{self.sequence % 500}"}
+        return endpoint, 'POST', f"/{endpoint}", body
+
+
+async def open_loop(client: httpx.AsyncClient, workload: Workload, rate: float, duration: float,
+                    max_outstanding: int) -> List[Dict]:
+    results: List[Dict] = []
+    tasks = set()
+    loop = asyncio.get_running_loop()
+
+    async def fire(endpoint, method, path, body, scheduled):
+        error = None
+        try:
+            response = await client.request(method, path, json=body)
+            if response.status_code != 200:
+                error = f"HTTP {response.status_code}"
+        except httpx.HTTPError as e:
+            error = type(e).__name__
+        results.append({'endpoint': endpoint, 'latency': loop.time() - scheduled, 'error': error})
+
+    started = loop.time()
+    offset = 0.0
+    while True:
+        offset += workload.rng.expovariate(rate)
+        if offset >= duration:
+            break
+        scheduled = started + offset
+        delay = scheduled - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        endpoint, method, path, body = workload.next()
+        if len(tasks) >= max_outstanding:
+            # The client is the limit now; count it rather than queue silently
+            results.append({'endpoint': endpoint, 'latency': None, 'error': 'client overloaded'})
+            continue
+        task = asyncio.create_task(fire(endpoint, method, path, body, scheduled))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+    if tasks:
+        await asyncio.wait(tasks)
+    return results
+
+
+def summarize(results: List[Dict], duration: float) -> Dict[str, Dict]:
+    by_endpoint = defaultdict(list)
+    for r in results:
+        by_endpoint[r['endpoint']].append(r)
+        by_endpoint['all'].append(r)
+    rows = {}
+    for endpoint, items in by_endpoint.items():
+        ok = sorted(r['latency'] for r in items if r['error'] is None)
+        errors = Counter(r['error'] for r in items if r['error'] is not None)
+        pct = (lambda p: ok[min(len(ok) - 1, int(p * len(ok)))] * 1000) if ok else (lambda p: None)
+        rows[endpoint] = {
+            'requests': len(items), 'ok': len(ok), 'errors': dict(errors),
+            'error_rate': 1 - len(ok) / len(items), 'rps': len(ok) / duration,
+            'p50': pct(0.50), 'p95': pct(0.95), 'p99': pct(0.99), 'max': ok[-1] * 1000 if ok else None,
+        }
+    return rows
+
+
+STAGE_RE = re.compile(r'^predict_stage_seconds_(sum|count)\{stage="([^"]+)"\} (\S+)$', re.M)
+
+
+async def stage_totals(client: httpx.AsyncClient) -> Dict[str, List[float]]:
+    """{stage: [seconds, count]} from /metrics, or {} when it isn't there"""
+    try:
+        response = await client.get('/metrics')
+    except httpx.HTTPError:
+        return {}
+    totals = defaultdict(lambda: [0.0, 0.0])
+    if response.status_code == 200:
+        for field, stage, value in STAGE_RE.findall(response.text):
+            totals[stage][0 if field == 'sum' else 1] += float(value)
+    return dict(totals)
+
+
+async def run_load(args, url: str, workload: Workload, backend_pid: Optional[int]) -> Dict:
+    limits = httpx.Limits(max_connections=args.max_outstanding, max_keepalive_connections=args.max_outstanding)
+    async with httpx.AsyncClient(base_url=url, timeout=args.timeout, limits=limits) as client:
+        if args.warmup > 0:
+            print(f"Warming up for {args.warmup:.0f}s...")
+            await open_loop(client, workload, args.rate, args.warmup, args.max_outstanding)
+
+        stages_before = await stage_totals(client)
+        sampler = ProcessSampler(backend_pid) if backend_pid else None
+        if sampler:
+            sampler.start()
+        client_cpu = time.process_time()
+        print(f"Running {args.rate:g} req/s for {args.duration:.0f}s...")
+        started = time.perf_counter()
+        results = await open_loop(client, workload, args.rate, args.duration, args.max_outstanding)
+        elapsed = time.perf_counter() - started
+        client_cpu = time.process_time() - client_cpu
+        resources = sampler.stop() if sampler else {}
+        stages_after = await stage_totals(client)
+
+    if resources:
+        resources['cpu_percent'] = 100 * resources['cpu_seconds'] / elapsed
+    resources['client_cpu_percent'] = 100 * client_cpu / elapsed
+    stages = {}
+    for stage, (seconds, count) in stages_after.items():
+        before = stages_before.get(stage, [0.0, 0.0])
+        if count > before[1]:
+            stages[stage] = {'count': count - before[1], 'mean_ms': 1000 * (seconds - before[0]) / (count - before[1])}
+    return {'config': {'rate': args.rate, 'duration': args.duration, 'mix': args.mix, 'workers': args.workers,
+                       'products': args.products, 'unknown': args.unknown, 'skew': args.skew},
+            'elapsed': elapsed, 'endpoints': summarize(results, elapsed), 'resources': resources, 'stages': stages}
+
+
+# --- Report -----------------------------------------------------------------
+
+def fmt(value, spec='.0f') -> str:
+    return '-' if value is None else format(value, spec)
+
+
+def report(run: Dict, baseline: Optional[Dict], tolerance: float, min_delta_ms: float) -> List[str]:
+    """Print the run (and the baseline under it); returns the regressions found"""
+    regressions = []
+    before_rows = (baseline or {}).get('endpoints', {})
+    print(f"\n{'endpoint':<13} {'reqs':>6} {'errors':>7} {'err %':>6} {'ok/s':>7} "
+          f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for endpoint in [*ENDPOINTS, 'all']:
+        row = run['endpoints'].get(endpoint)
+        if row is None:
+            continue
+        for label, r in ((endpoint, row), ('  before', before_rows.get(endpoint))):
+            if r is None:
+                continue
+            print(f"{label:<13} {r['requests']:>6} {sum(r['errors'].values()):>7} {100 * r['error_rate']:>6.1f} "
+                  f"{r['rps']:>7.1f} {fmt(r['p50']):>8} {fmt(r['p95']):>8} {fmt(r['p99']):>8} {fmt(r['max']):>8}")
+        if row['errors']:
+            print(f"{'':<13} {', '.join(f'{k}: {v}' for k, v in Counter(row['errors']).most_common())}")
+
+        before = before_rows.get(endpoint)
+        if before is None:
+            continue
+        for key in ('p50', 'p95', 'p99'):
+            new, old = row[key], before[key]
+            if new is not None and old is not None and new > old * (1 + tolerance) and new - old > min_delta_ms:
+                regressions.append(f"{endpoint} {key} {old:.0f} -> {new:.0f} ms")
+        if row['error_rate'] > before['error_rate'] + 0.01:
+            regressions.append(f"{endpoint} errors {100 * before['error_rate']:.1f}% -> {100 * row['error_rate']:.1f}%")
+        if row['rps'] < before['rps'] * (1 - tolerance):
+            regressions.append(f"{endpoint} throughput {before['rps']:.1f} -> {row['rps']:.1f} ok/s")
+
+    resources = run['resources']
+    before = (baseline or {}).get('resources', {})
+    if 'cpu_percent' in resources:
+        print(f"\nBackend: {resources['cpu_percent']:.0f}% CPU ({resources['cpu_seconds']:.1f}s), "
+              f"peak RSS {resources['peak_rss_mb']:.0f} MB over {resources['processes']} processes"
+              + (f"  [before: {before['cpu_percent']:.0f}% CPU, {before['peak_rss_mb']:.0f} MB]"
+                 if 'cpu_percent' in before else ''))
+    print(f"Load generator: {resources['client_cpu_percent']:.0f}% CPU")
+    if resources['client_cpu_percent'] > 80:
+        print("⚠️  The load generator is near a full core; latencies include its own queueing")
+
+    if run['stages']:
+        before_stages = (baseline or {}).get('stages', {})
+        print(f"\n{'/predict stage':<17} {'count':>7} {'mean ms':>8} {'before':>8}")
+        for stage, s in sorted(run['stages'].items(), key=lambda item: -item[1]['mean_ms'] * item[1]['count']):
+            old = before_stages.get(stage, {}).get('mean_ms')
+            print(f"{stage:<17} {s['count']:>7.0f} {s['mean_ms']:>8.1f} {fmt(old, '.1f'):>8}")
+
+    if baseline and baseline.get('config') != run['config']:
+        print(f"\n⚠️  Baseline ran with different settings: {baseline.get('config')}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Open-loop load test of the backend against local stand-ins')
+    parser.add_argument('--rate', type=float, default=20.0, help='requests per second, all endpoints together')
+    parser.add_argument('--duration', type=float, default=60.0, help='measured seconds')
+    parser.add_argument('--warmup', type=float, default=10.0, help='unmeasured seconds first (caches, fits)')
+    parser.add_argument('--mix', default='predict=4,scrape_price=2,set_alert=1,home=3', help='endpoint weights')
+    parser.add_argument('--products', type=int, default=200)
+    parser.add_argument('--history-days', type=int, default=60)
+    parser.add_argument('--unknown', type=float, default=0.1, help='share of requests for unseeded products')
+    parser.add_argument('--skew', type=float, default=2.0, help='product popularity skew (1 = uniform)')
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--workers', type=int, default=0, help='run serve.py with this many workers (0: one uvicorn)')
+    parser.add_argument('--database-url', help='defaults to a throwaway local Postgres cluster')
+    parser.add_argument('--fixtures', help='recorded fixture archive to serve as well')
+    parser.add_argument('--upstream-latency-ms', type=float, default=80.0)
+    parser.add_argument('--upstream-jitter-ms', type=float, default=40.0)
+    parser.add_argument('--url', help='load an already running backend instead of starting one')
+    parser.add_argument('--pid', type=int, help='with --url: backend process to measure resource use of')
+    parser.add_argument('--max-outstanding', type=int, default=1000)
+    parser.add_argument('--timeout', type=float, default=60.0)
+    parser.add_argument('--startup-timeout', type=float, default=180.0)
+    parser.add_argument('--keep', action='store_true', help='keep the temp dir (backend log, fixtures, caches)')
+    parser.add_argument('--save', help='write results to this JSON file')
+    parser.add_argument('--baseline', help='JSON file from an earlier --save to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.15, help='allowed relative slowdown')
+    parser.add_argument('--min-delta-ms', type=float, default=5.0, help='ignore latency changes smaller than this')
+    args = parser.parse_args()
+
+    products = catalog(args.products, args.seed)
+    workload = Workload(args, products)
+    workdir = Path(tempfile.mkdtemp(prefix='e2e-load-'))
+    postgres, stack = None, None
+    try:
+        if args.url:
+            url, pid = args.url.rstrip('/'), args.pid
+            if args.database_url:
+                seed_database(args.database_url, products, args.history_days, args.seed)
+        else:
+            database_url = args.database_url
+            if not database_url:
+                postgres = LocalPostgres(workdir)
+                postgres.start()
+                database_url = postgres.url
+            seed_database(database_url, products, args.history_days, args.seed)
+            stack = Stack(args, workdir)
+            url = stack.start(database_url)
+            pid = stack.backend.pid
+        run = asyncio.run(run_load(args, url, workload, pid))
+    finally:
+        if stack:
+            stack.stop()
+        if postgres:
+            postgres.stop()
+        if args.keep:
+            print(f"Kept {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    regressions = report(run, baseline, args.tolerance, args.min_delta_ms)
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(run, f, indent=2)
+    if regressions:
+        print("\n❌ Regressions against the baseline:")
+        for line in regressions:
+            print(f"   {line}")
+        sys.exit(1)
+    if baseline:
+        print(f"\n✅ Within {100 * args.tolerance:.0f}% of the baseline")
+
+
+if __name__ == '__main__':
+    main()
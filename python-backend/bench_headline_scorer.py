@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Headline Scorer Benchmark
+Scores synthetic price-news headlines with the old per-headline substring loop,
+HeadlineScorer.score() one at a time, and HeadlineScorer.score_batch(), and
+reports headlines/sec plus a few cases where the old matcher was wrong.
+
+Usage: python bench_headline_scorer.py [--headlines 100000] [--repeat 3]
+"""
+
+import sys
+import time
+import random
+import argparse
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+
+from news_sentiment import inflation_words, deflation_words, headline_scorer
+
+SUBJECTS = ['DRAM', 'NAND flash', 'GPU', 'SSD', 'CPU', 'DDR5 memory', 'Graphics card', 'Laptop', 'Smartphone', 'RTX 4090']
+RISES = ['prices surge', 'costs jump', 'prices soar amid shortage', 'makers announce price hike', 'contract prices climb',
+         'prices not expected to fall', 'no discount this quarter']
+DROPS = ['prices drop', 'prices fall further', 'retailers slash prices', 'prices plunge on glut', 'hits all-time low',
+         'prices cut ahead of launch', 'no price hike expected']
+NEUTRAL = ['makers follow Samsung roadmap', 'demand stays flat', 'vendors allow preorders', 'new lineup unveiled',
+           'download the spec sheet', 'market outlook for 2025']
+PUBLISHERS = ['Reuters', 'Tom\'s Hardware', 'The Verge', 'Economic Times', 'TrendForce', 'Digitimes']
+
+TRICKY = [
+    "Apple to follow Samsung on pricing",
+    "Vendors allow early upgrades",
+    "No price hike expected for GPUs",
+    "DRAM prices not expected to fall",
+    "SSD makers don't see prices dropping",
+]
+
+
+def make_headlines(count, rng):
+    headlines = []
+    for _ in range(count):
+        phrase = rng.choice(rng.choice((RISES, DROPS, NEUTRAL)))
+        headlines.append(f"{rng.choice(SUBJECTS)} {phrase} - {rng.choice(PUBLISHERS)}")
+    return headlines
+
+
+def legacy_score(title):
+    """The old loop: any() substring checks over both word lists"""
+    title = title.lower()
+    score = 0
+    if any(w in title for w in inflation_words):
+        score += 1
+    if any(w in title for w in deflation_words):
+        score -= 1
+    return score
+
+
+def best_rate(fn, headlines, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(headlines)
+        best = min(best, time.perf_counter() - started)
+    return len(headlines) / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark headline sentiment scoring')
+    parser.add_argument('--headlines', type=int, default=100_000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    headlines = make_headlines(args.headlines, random.Random(11))
+
+    print(f"{'scorer':<28} {'headlines/s':>14}")
+    runs = {
+        'legacy substring loop': lambda hs: [legacy_score(h) for h in hs],
+        'HeadlineScorer.score': lambda hs: [headline_scorer.score(h) for h in hs],
+        'HeadlineScorer.score_batch': headline_scorer.score_batch,
+    }
+    for name, fn in runs.items():
+        print(f"{name:<28} {best_rate(fn, headlines, args.repeat):>14,.0f}")
+
+    batch = headline_scorer.score_batch(headlines).tolist()
+    changed = sum(a != b for a, b in zip(batch, (legacy_score(h) for h in headlines)))
+    print(f"\nScores that differ from the legacy loop: {changed:,} of {len(headlines):,}\n")
+
+    print(f"{'legacy':>6} {'new':>4}  headline")
+    for title, score in zip(TRICKY, headline_scorer.score_batch(TRICKY).tolist()):
+        print(f"{legacy_score(title):>6} {score:>4}  {title}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+HTML Extraction Benchmark
+Compares the old history_scraper approach (BeautifulSoup + html.parser, then a
+regex scan of every <script> tag) with scraping.extract on the debug HTML
+fixtures checked into the repo root.
+Allocations come from tracemalloc, which only sees the Python heap; libxml2's
+own C allocations for the lxml tree are not included.
+
+Usage: python bench_html_extract.py [--seconds 2]
+"""
+
+import re
+import sys
+import time
+import argparse
+import tracemalloc
+from pathlib import Path
+
+from bs4 import BeautifulSoup
+
+sys.path.append(str(Path(__file__).parent))
+
+from scraping.extract import Selector, parse_html, extract_next_data, extract_chart_series
+
+FIXTURES = ['debug_bing.html', 'debug_iphone_bing.html', 'debug_ebay.html']
+FIXTURE_DIR = Path(__file__).parent.parent
+
+PRODUCT_LINK = Selector('a[href^="/product/"]')
+
+
+def legacy_extract(html: str):
+    """What fetch_pricehistoryapp_data used to do for one page"""
+    soup = BeautifulSoup(html, 'html.parser')
+    link = soup.select_one('a[href^="/product/"]')
+    found = None
+    for s in soup.find_all('script'):
+        if s.string:
+            if '__NEXT_DATA__' in s.string:
+                found = s.string
+            if 'Highcharts' in s.string or 'Chart' in s.string:
+                dates_match = re.search(r'categories":(\[[^\]]+\])', s.string)
+                prices_match = re.search(r'data":(\[[^\]]+\])', s.string)
+                if dates_match and prices_match:
+                    found = (dates_match.group(1), prices_match.group(1))
+    return link, found
+
+
+def fast_extract(html: str):
+    """Same work through scraping.extract"""
+    link = PRODUCT_LINK.first(parse_html(html))
+    return link, extract_next_data(html) or extract_chart_series(html)
+
+
+def pages_per_second(fn, html: str, seconds: float) -> float:
+    fn(html)  # warm up
+    count = 0
+    start = time.perf_counter()
+    deadline = start + seconds
+    while time.perf_counter() < deadline:
+        fn(html)
+        count += 1
+    return count / (time.perf_counter() - start)
+
+
+def allocations(fn, html: str):
+    """(peak KiB, allocated blocks) for one extraction"""
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    fn(html)
+    after = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    blocks = sum(stat.count_diff for stat in after.compare_to(before, 'filename') if stat.count_diff > 0)
+    return peak / 1024, blocks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--seconds', type=float, default=2.0, help='time budget per measurement')
+    args = parser.parse_args()
+
+    print(f"{'fixture':<26}{'approach':<10}{'pages/sec':>12}{'peak KiB':>12}{'blocks':>10}")
+    for name in FIXTURES:
+        html = (FIXTURE_DIR / name).read_text(encoding='utf-8', errors='replace')
+        rates = {}
+        for label, fn in (('legacy', legacy_extract), ('fast', fast_extract)):
+            rates[label] = pages_per_second(fn, html, args.seconds)
+            peak_kib, blocks = allocations(fn, html)
+            print(f"{name:<26}{label:<10}{rates[label]:>12.1f}{peak_kib:>12.1f}{blocks:>10}")
+        print(f"{'':<26}{'speedup':<10}{rates['fast'] / rates['legacy']:>11.1f}x")
+
+
+if __name__ == '__main__':
+    main()
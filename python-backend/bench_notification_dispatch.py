@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Notification Dispatch Benchmark
+End-to-end run of the Telegram outbox: price drops are enqueued for linked
+users, then NotificationDispatcher drains them through a pool of fake bots
+into fake_bot_api.py started with --enforce-limits, which answers 429 like
+Telegram whenever a token goes over 30 msgs/sec or a chat gets more than one
+message a second.
+
+Reports delivery rate, how drops were batched into messages, the busiest
+second per bot, the closest gap between two messages to one chat and every
+429 the stub handed out. Uses a throwaway SQLite outbox unless --database-url
+points at a Postgres database initialised with init_db.py.
+
+Usage: python bench_notification_dispatch.py [--users 300] [--drops 3] [--bots 3]
+                                             [--throttle-rate 0.02] [--port 8082]
+"""
+
+import os
+import sys
+import time
+import asyncio
+import logging
+import argparse
+import tempfile
+import subprocess
+from collections import Counter, defaultdict
+from pathlib import Path
+
+import httpx
+
+sys.path.append(str(Path(__file__).parent))
+
+# The outbox tables from init_db.py, in SQLite's dialect
+SQLITE_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS telegram_links (
+        user_email TEXT PRIMARY KEY, chat_id TEXT NOT NULL, linked_at TIMESTAMP
+    )""",
+    """CREATE TABLE IF NOT EXISTS telegram_outbox (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, notification_id TEXT NOT NULL UNIQUE,
+        user_email TEXT NOT NULL, chat_id TEXT NOT NULL, body TEXT NOT NULL,
+        status TEXT NOT NULL DEFAULT 'pending', attempts INTEGER NOT NULL DEFAULT 0,
+        next_attempt_at TIMESTAMP NOT NULL, claimed_at TIMESTAMP, sent_at TIMESTAMP,
+        last_error TEXT, created_at TIMESTAMP NOT NULL
+    )""",
+]
+
+
+def start_fake_api(args) -> subprocess.Popen:
+    command = [sys.executable, str(Path(__file__).parent / 'fake_bot_api.py'), '--port', str(args.port),
+               '--latency-ms', str(args.latency_ms), '--throttle-rate', str(args.throttle_rate),
+               '--enforce-limits']
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL)
+    for _ in range(100):
+        try:
+            httpx.get(f"{args.api}/__fake/stats", timeout=1)
+            return process
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    process.kill()
+    sys.exit("fake_bot_api.py did not start")
+
+
+def seed(dispatcher, engine, args):
+    from sqlalchemy import text
+    from telegram_integration.dispatcher import format_drop
+
+    with engine.begin() as conn:
+        if engine.dialect.name == 'sqlite':
+            for statement in SQLITE_SCHEMA:
+                conn.execute(text(statement))
+        conn.execute(text("DELETE FROM telegram_outbox WHERE notification_id LIKE 'bench-%'"))
+        conn.execute(text("DELETE FROM telegram_links WHERE user_email LIKE 'bench-%'"))
+        conn.execute(text("INSERT INTO telegram_links (user_email, chat_id) VALUES (:email, :chat)"),
+                     [{"email": f"bench-{u}@example.com", "chat": str(700000 + u)} for u in range(args.users)])
+        for u in range(args.users):
+            for d in range(args.drops):
+                body = format_drop(f"Bench product {u}-{d}", 1999.0, 1499.0,
+                                   f"https://www.amazon.in/dp/BENCH{u:05d}{d:03d}")
+                dispatcher.enqueue(f"bench-{u}-{d}", f"bench-{u}@example.com", body, conn)
+
+
+def outbox_status(engine):
+    from sqlalchemy import text
+    with engine.connect() as conn:
+        return dict(conn.execute(text("""
+            SELECT status, COUNT(*) FROM telegram_outbox WHERE notification_id LIKE 'bench-%' GROUP BY status
+        """)).fetchall())
+
+
+async def run(args, database_url):
+    from telegram_integration.pool import BotPool
+    from telegram_integration.dispatcher import NotificationDispatcher
+
+    tokens = [f"{9000 + i}:FAKE-dispatch-token-{i}" for i in range(args.bots)]
+    pool = BotPool(tokens=tokens)
+    dispatcher = NotificationDispatcher(database_url, pool=pool)
+    engine = dispatcher._get_engine()
+    await asyncio.to_thread(seed, dispatcher, engine, args)
+
+    await pool.start()
+    started = time.perf_counter()
+    while time.perf_counter() - started < args.timeout:
+        await dispatcher.drain()
+        status = await asyncio.to_thread(outbox_status, engine)
+        if not status.get('pending') and not status.get('sending'):
+            break
+        # Rows held back by retry_after become due again shortly
+        await asyncio.sleep(0.2)
+    elapsed = time.perf_counter() - started
+    await pool.stop()
+
+    async with httpx.AsyncClient(base_url=args.api) as client:
+        stub = (await client.get('/__fake/stats')).json()
+    return elapsed, dispatcher.stats(), pool.stats(), await asyncio.to_thread(outbox_status, engine), stub
+
+
+def busiest_second(times):
+    times = sorted(times)
+    best, start = 0, 0
+    for end, t in enumerate(times):
+        while t - times[start] >= 1.0:
+            start += 1
+        best = max(best, end - start + 1)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the Telegram notification outbox')
+    parser.add_argument('--users', type=int, default=300)
+    parser.add_argument('--drops', type=int, default=3, help='price drops queued per user')
+    parser.add_argument('--bots', type=int, default=3)
+    parser.add_argument('--throttle-rate', type=float, default=0.02, help='extra random 429s from the stub')
+    parser.add_argument('--latency-ms', type=float, default=20.0, help='Bot API latency per call')
+    parser.add_argument('--port', type=int, default=8082)
+    parser.add_argument('--database-url', help='defaults to a temporary SQLite file')
+    parser.add_argument('--timeout', type=float, default=120.0)
+    args = parser.parse_args()
+    args.api = f"http://127.0.0.1:{args.port}"
+
+    # Read at import time by the bot modules
+    os.environ['TELEGRAM_API_URL'] = args.api
+    for name in ('httpx', 'telegram'):
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+    database_url = args.database_url or f"sqlite:///{tempfile.mkdtemp()}/outbox.db"
+    fake = start_fake_api(args)
+    try:
+        elapsed, dispatched, pool, status, stub = asyncio.run(run(args, database_url))
+    finally:
+        fake.terminate()
+
+    messages = stub['messages']
+    by_token = defaultdict(list)
+    by_chat = defaultdict(list)
+    for m in messages:
+        by_token[m['token']].append(m['at'])
+        by_chat[m['chat_id']].append(m['at'])
+    gaps = [b - a for times in by_chat.values() for a, b in zip(sorted(times), sorted(times)[1:])]
+
+    drops = args.users * args.drops
+    print(f"Delivered {dispatched['sent_rows']:,} of {drops:,} drops to {len(by_chat):,} chats "
+          f"in {elapsed:.1f}s ({dispatched['sent_rows'] / elapsed:,.0f} drops/s, {len(messages) / elapsed:,.1f} msgs/s)")
+    print(f"Messages sent: {len(messages):,} ({drops / max(1, len(messages)):.1f} drops per message)")
+    print(f"Outbox: {status}")
+    print(f"429s from the stub: random {stub['throttled']}, over bot rate {stub['over_bot_rate']}, "
+          f"over chat rate {stub['over_chat_rate']}; dispatcher rescheduled {dispatched['throttled']} batches")
+    if gaps:
+        print(f"Closest two messages to one chat: {min(gaps):.2f}s")
+    print(f"\n{'bot':<6} {'messages':>9} {'busiest second':>15} {'throttled':>10}")
+    for pooled, token in zip(pool['bots'], [f"{9000 + i}:FAKE-dispatch-token-{i}" for i in range(args.bots)]):
+        print(f"{pooled['name']:<6} {len(by_token[token]):>9} {busiest_second(by_token[token]):>15} {pooled['throttled']:>10}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Product Identity Index Benchmark
+Builds a ProductIndex of synthetic catalogue titles (memory only, no database)
+and measures resolve() latency for reordered/reformatted titles, URL lookups and
+misses, against the old linear substring scan in find_best_match.
+
+Usage: python bench_product_index.py [--products 1000000] [--queries 5000]
+"""
+
+import sys
+import time
+import random
+import argparse
+import resource
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+
+from product_index import ProductIndex
+from scraping.types import ScrapedProduct
+
+BRANDS = ['Samsung', 'Apple', 'OnePlus', 'Xiaomi', 'Realme', 'Sony', 'LG', 'Lenovo', 'HP', 'Dell',
+          'Asus', 'Acer', 'Boat', 'JBL', 'Kingston', 'Crucial', 'WD', 'Seagate', 'Nikon', 'Canon']
+LINES = ['Galaxy', 'Pro', 'Nord', 'Note', 'Narzo', 'Bravia', 'Gram', 'IdeaPad', 'Pavilion', 'Inspiron',
+         'Vivobook', 'Aspire', 'Rockerz', 'Tune', 'Fury', 'Ballistix', 'Blue', 'Barracuda', 'Coolpix', 'EOS']
+CATEGORIES = ['Smartphone', 'Laptop', 'Headphones', 'Speaker', 'SSD', 'RAM', 'Camera', 'Monitor', 'TV', 'Tablet']
+COLORS = ['Black', 'Blue', 'Silver', 'Green', 'White', 'Grey', 'Gold', 'Red']
+CAPACITIES = ['64 GB', '128 GB', '256 GB', '512 GB', '1 TB', '8 GB', '16 GB', '32 GB']
+
+
+def make_product(i, rng):
+    brand = BRANDS[i % len(BRANDS)]
+    line = LINES[(i // 20) % len(LINES)]
+    model = f"{rng.choice('ABCDEFGHJKLMNPRSTUVWXYZ')}{rng.choice('ABCDEFGHJKLMNPRSTUVWXYZ')}-{i:07d}"
+    title = (f"{brand} {line} {i // 400 % 1000} {rng.choice(CATEGORIES)} "
+             f"({rng.choice(COLORS)}, {rng.choice(CAPACITIES)}) {model}")
+    url = f"https://www.amazon.in/dp/B{i:09d}"
+    return ScrapedProduct(title=title, price=float(rng.randrange(500, 150000)), source='Amazon', product_url=url)
+
+
+def reorder(title, rng):
+    """Same product the way another store would write it"""
+    words = title.replace(' GB', 'GB').replace(' TB', 'TB').replace('(', ' ').replace(')', ' ').replace(',', ' ').split()
+    rng.shuffle(words)
+    return ' '.join(words)
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return {p: samples[min(len(samples) - 1, int(p / 100 * len(samples)))] * 1e6 for p in (50, 95, 99)}
+
+
+def timed(fn, inputs):
+    latencies, hits = [], 0
+    for args in inputs:
+        start = time.perf_counter()
+        result = fn(*args)
+        latencies.append(time.perf_counter() - start)
+        hits += result is not None
+    return percentiles(latencies), hits / len(inputs)
+
+
+def legacy_find(products, query):
+    """Old find_best_match: substring check + len ratio over every product"""
+    query_lower = query.lower()
+    best, best_score = None, 0
+    for product in products:
+        title_lower = product.title.lower()
+        if query_lower in title_lower:
+            score = len(query_lower) / len(title_lower)
+            if score > best_score:
+                best, best_score = product, score
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark product identity resolution')
+    parser.add_argument('--products', type=int, default=1_000_000)
+    parser.add_argument('--queries', type=int, default=5000)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    products = [make_product(i, rng) for i in range(args.products)]
+
+    index = ProductIndex()
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started = time.perf_counter()
+    for offset in range(0, len(products), 1000):
+        index.observe(products[offset:offset + 1000])
+    build = time.perf_counter() - started
+    # ru_maxrss is KiB on Linux; peak growth while indexing approximates the index size
+    memory = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before) / 1024
+    print(f"Indexed {args.products:,} products in {build:.1f}s "
+          f"({args.products / build:,.0f}/s), ~{memory:,.0f} MiB, {index.stats()['identifiers']:,} identifiers\n")
+
+    sample = rng.sample(products, min(args.queries, len(products)))
+    cases = {
+        'exact title': [(p.title, None) for p in sample],
+        'reordered title': [(reorder(p.title, rng), None) for p in sample],
+        'title, no model no.': [(p.title.rsplit(' ', 1)[0], None) for p in sample],
+        'url only': [('', p.product_url + '?ref=sr_1_1') for p in sample],
+        'unknown product': [(f"Nothing {i} Widget Ultra", None) for i in range(len(sample))],
+    }
+
+    print(f"{'lookup':<22} {'p50 µs':>8} {'p95 µs':>8} {'p99 µs':>8} {'resolved':>9}")
+    for name, inputs in cases.items():
+        pct, hit_rate = timed(index.resolve, inputs)
+        print(f"{name:<22} {pct[50]:>8.1f} {pct[95]:>8.1f} {pct[99]:>8.1f} {hit_rate:>9.1%}")
+
+    # The linear scan is far too slow at this size; time a handful of lookups
+    few = sample[:20]
+    pct, hit_rate = timed(lambda q, _: legacy_find(products, q), [(reorder(p.title, rng), None) for p in few])
+    print(f"{'legacy scan, reordered':<22} {pct[50]:>8.0f} {pct[95]:>8.0f} {pct[99]:>8.0f} {hit_rate:>9.1%}")
+
+
+if __name__ == '__main__':
+    main()
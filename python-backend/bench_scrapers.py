@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+"""
+Scraper Throughput Benchmark
+Drives the store scrapers, the history scraper, the news fetcher and the alert
+checker's price lookup against replay_server.py, and reports operations/sec,
+upstream requests/sec and latency percentiles.
+
+Fixtures come from --archive: either a real recording (run the backend or
+checker with HTTP_RECORD_ARCHIVE=path) or, by default, a synthetic archive that
+is generated on first use and covers every URL the benchmark asks for.
+
+The HTTP cache and the scrape caches are bypassed so every operation really
+goes upstream. Per-host rate limits are lifted unless --rate-limits is given;
+circuit breakers stay on, so fault injection shows up as fast failures.
+
+Usage: python bench_scrapers.py [--ops 200] [--concurrency 16] [--latency-ms 80 --jitter-ms 40]
+                                [--error-rate 0.02] [--scenarios stores,history,news,alerts]
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import logging
+import subprocess
+import contextlib
+from pathlib import Path
+from urllib.parse import quote, quote_plus
+
+sys.path.append(str(Path(__file__).parent))
+
+# Backend modules read their HTTP settings at import time, so they are only
+# imported after main() has pointed the environment at the replay server
+
+DEFAULT_ARCHIVE = Path(__file__).parent / '.cache' / 'replay' / 'synthetic.jsonl.gz'
+QUERIES = ['iPhone 15', 'Galaxy S24', 'Pixel 8', 'OnePlus 12', 'Redmi Note 13',
+           'MacBook Air M3', 'Sony WH-1000XM5', 'Kingston 16GB DDR4 RAM', 'Samsung 990 Pro SSD', 'RTX 4070']
+CARDS_PER_PAGE = 20
+HISTORY_POINTS = 180
+
+
+# ---- synthetic fixtures ----
+
+def _titles(query):
+    colors = ['Black', 'Blue', 'Silver', 'Green']
+    return [f"{query} ({colors[i % 4]}, {64 * (i % 4 + 1)} GB) Variant {i}" for i in range(CARDS_PER_PAGE)]
+
+
+def _price(rng):
+    return rng.randrange(5000, 150000)
+
+
+def _filler(rng, kb=60):
+    # Real search pages are mostly markup the parser has to walk past
+    return ''.join(f'<div class="f{rng.randrange(999)}"><span>{"x" * 90}</span></div>' for _ in range(kb * 8))
+
+
+def _page(body):
+    return f'<!DOCTYPE html><html><head><title>results</title></head><body>{body}</body></html>'
+
+
+def amazon_page(query, rng):
+    cards = ''.join(
+        f'<div data-component-type="s-search-result" data-asin="B0{i:08d}">'
+        f'<h2><a href="/dp/B0{i:08d}"><span>{title}</span></a></h2>'
+        f'<span class="a-price-whole">{_price(rng):,}</span>'
+        f'<span class="a-text-price"><span class="a-offscreen">₹{_price(rng):,}</span></span>'
+        f'<img class="s-image" src="https://m.media-amazon.com/{i}.jpg"></div>'
+        for i, title in enumerate(_titles(query)))
+    return _page(cards + _filler(rng))
+
+
+def flipkart_page(query, rng):
+    cards = ''.join(
+        f'<div data-id="MOB{i:012d}"><a href="/p/item?pid=MOB{i:012d}" title="{title}">'
+        f'<div>₹{_price(rng):,}</div><div>₹{_price(rng):,}</div></a>'
+        f'<div class="XQDdHH">4.{i % 10}</div></div>'
+        for i, title in enumerate(_titles(query)))
+    return _page(cards + _filler(rng))
+
+
+def croma_page(query, rng):
+    cards = ''.join(
+        f'<div data-productcode="{300000 + i}"><a href="/p/{300000 + i}"><h3>{title}</h3></a>'
+        f'<span>₹{_price(rng):,}</span><span>₹{_price(rng):,}</span></div>'
+        for i, title in enumerate(_titles(query)))
+    return _page(cards + _filler(rng))
+
+
+def reliance_page(query, rng):
+    cards = ''.join(
+        f'<div data-product-id="{400000 + i}"><a href="/product/{400000 + i}"><p class="sp__name">{title}</p></a>'
+        f'<span>₹{_price(rng):,}</span><span>₹{_price(rng):,}</span></div>'
+        for i, title in enumerate(_titles(query)))
+    return _page(cards + _filler(rng))
+
+
+def snapdeal_page(query, rng):
+    cards = ''.join(
+        f'<div class="product-tuple-listing"><a class="dp-widget-link" href="/product/x/{500000 + i}">'
+        f'<p class="product-title">{title}</p></a>'
+        f'<span class="lfloat product-price">₹ {_price(rng):,}</span>'
+        f'<span class="product-desc-price">₹ {_price(rng):,}</span>'
+        f'<div class="filled-stars" style="width:{60 + i}%"></div></div>'
+        for i, title in enumerate(_titles(query)))
+    return _page(cards + _filler(rng))
+
+
+STORE_PAGES = {
+    'Amazon': amazon_page,
+    'Flipkart': flipkart_page,
+    'Croma': croma_page,
+    'Reliance': reliance_page,
+    'Snapdeal': snapdeal_page,
+}
+
+
+def product_urls(count):
+    return [f"https://www.amazon.in/dp/B0BENCH{i:03d}" for i in range(count)]
+
+
+def history_pages(asin, rng):
+    search = _page(f'<a href="/product/bench-{asin.lower()}">{asin}</a>' + _filler(rng, 20))
+    start = time.time() - HISTORY_POINTS * 86400
+    points = [{'date': time.strftime('%Y-%m-%d', time.gmtime(start + d * 86400)), 'price': _price(rng)}
+              for d in range(HISTORY_POINTS)]
+    next_data = json.dumps({'props': {'pageProps': {'product': {'asin': asin, 'priceHistory': points}}}})
+    product = _page(f'<script id="__NEXT_DATA__" type="application/json">{next_data}</script>' + _filler(rng, 40))
+    return search, product
+
+
+def news_feed(rng):
+    words = ['price hike', 'shortage', 'discount', 'price cut', 'launch', 'review', 'surplus', 'surge']
+    items = ''.join(
+        f'<item><title>Market update {i}: {rng.choice(words)} expected</title>'
+        f'<link>https://news.example.com/{i}</link><pubDate>Mon, 01 Jan 2024 00:00:00 GMT</pubDate></item>'
+        for i in range(40))
+    return f'<?xml version="1.0"?><rss version="2.0"><channel><title>news</title>{items}</channel></rss>'
+
+
+def synthesize_archive(path: Path, ops: int):
+    from http_replay import FixtureArchive
+    from scraping.stores import STORE_EXTRACTORS
+
+    rng = random.Random(42)
+    archive = FixtureArchive(str(path))
+    html = {'content-type': 'text/html; charset=utf-8'}
+
+    for query in QUERIES:
+        for store in STORE_EXTRACTORS.values():
+            page = STORE_PAGES[store.name](query, rng)
+            archive.add('GET', store.search_url(query), 200, html, page.encode())
+
+    for url in product_urls(max(ops, 50)):
+        asin = url.rsplit('/', 1)[1]
+        search, product = history_pages(asin, rng)
+        archive.add('GET', f"https://pricehistoryapp.com/search?q={quote(asin)}", 200, html, search.encode())
+        archive.add('GET', f"https://pricehistoryapp.com/product/bench-{asin.lower()}", 200, html, product.encode())
+
+    # The news query varies per product; the replay server's path fallback serves this one
+    archive.add('GET', f"https://news.google.com/rss/search?q={quote_plus('price')}", 200,
+                {'content-type': 'application/rss+xml'}, news_feed(rng).encode())
+
+    archive.save()
+    print(f"Synthesized {len(archive)} fixtures into {path}")
+
+
+# ---- replay server ----
+
+def start_replay_server(args) -> subprocess.Popen:
+    cmd = [sys.executable, str(Path(__file__).parent / 'replay_server.py'),
+           '--archive', str(args.archive), '--port', str(args.port),
+           '--latency-ms', str(args.latency_ms), '--jitter-ms', str(args.jitter_ms),
+           '--error-rate', str(args.error_rate), '--throttle-rate', str(args.throttle_rate),
+           '--hang-rate', str(args.hang_rate)]
+    proc = subprocess.Popen(cmd)
+
+    import httpx
+    for _ in range(100):
+        try:
+            httpx.get(f"http://127.0.0.1:{args.port}/__replay/stats", timeout=0.5)
+            return proc
+        except httpx.HTTPError:
+            if proc.poll() is not None:
+                sys.exit("Replay server failed to start")
+            time.sleep(0.1)
+    proc.terminate()
+    sys.exit("Replay server did not come up")
+
+
+def server_stats(port):
+    import httpx
+    return httpx.get(f"http://127.0.0.1:{port}/__replay/stats", timeout=2).json()
+
+
+# ---- scenarios ----
+
+async def run_scenario(name, op, ops, concurrency, port):
+    """Run `ops` calls of op(i) with bounded concurrency; returns a result row"""
+    latencies = []
+    failures = 0
+    before = server_stats(port)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i):
+        nonlocal failures
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                ok = await op(i)
+            except Exception:
+                ok = False
+            latencies.append(time.perf_counter() - start)
+            if not ok:
+                failures += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(ops)))
+    elapsed = time.perf_counter() - started
+
+    after = server_stats(port)
+    upstream = sum(after[k] - before[k] for k in ('served', 'missing', 'errors', 'throttled', 'hung'))
+    latencies.sort()
+
+    def pct(p):
+        return latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000
+
+    return {
+        'scenario': name, 'ops': ops, 'failed': failures,
+        'ops_per_sec': ops / elapsed, 'upstream_rps': upstream / elapsed,
+        'p50': pct(0.50), 'p95': pct(0.95), 'p99': pct(0.99), 'max': latencies[-1] * 1000,
+    }
+
+
+def build_scenarios(names):
+    """name -> async op(i) -> bool; scenarios whose code can't be imported are skipped with a note"""
+    scenarios = {}
+
+    if 'stores' in names:
+        from scraping import scrape_engine
+
+        async def stores(i):
+            return bool(await scrape_engine.search(QUERIES[i % len(QUERIES)]))
+        scenarios['stores'] = stores
+
+    if 'history' in names:
+        from history_scraper import fetch_external_history_uncached
+        urls = product_urls(50)
+
+        async def history(i):
+            df = await asyncio.to_thread(fetch_external_history_uncached, urls[i % len(urls)])
+            return not df.empty
+        scenarios['history'] = history
+
+    if 'news' in names:
+        try:
+            from news_sentiment import resolve_news_query, score_news_query
+
+            # fetch_market_sentiment answers from news_store and sentiment_cache;
+            # score the query directly so every op fetches the feed
+            async def news(i):
+                query = resolve_news_query(QUERIES[i % len(QUERIES)])
+                return bool(await asyncio.to_thread(score_news_query, query))
+            scenarios['news'] = news
+        except ImportError as e:
+            print(f"⚠️  Skipping news: {e}")
+
+    if 'alerts' in names:
+        try:
+            from price_alert_checker import PriceAlertChecker
+            from scraping import scrape_cache
+            checker = PriceAlertChecker()
+
+            async def alerts(i):
+                query = QUERIES[i % len(QUERIES)]
+                scrape_cache.clear()
+                # 0.0 means the lookup failed or found nothing
+                return await checker.check_product_price(query, '') > 0
+            scenarios['alerts'] = alerts
+        except Exception as e:
+            print(f"⚠️  Skipping alerts (checker needs its database settings): {e}")
+
+    return scenarios
+
+
+async def run_all(args):
+    from http_client import http_pool, close_sync_client
+
+    scenarios = build_scenarios(args.scenarios.split(','))
+    if not args.verbose:
+        logging.getLogger().setLevel(logging.WARNING)
+        logging.getLogger('httpx').setLevel(logging.WARNING)
+    rows = []
+    for name, op in scenarios.items():
+        # The scrapers print per request; keep that out of the report
+        with contextlib.redirect_stdout(sys.stdout if args.verbose else io.StringIO()):
+            # Warm the pools so connection setup isn't charged to the first scenario
+            await run_scenario(name, op, min(args.concurrency, args.ops), args.concurrency, args.port)
+            rows.append(await run_scenario(name, op, args.ops, args.concurrency, args.port))
+
+    await http_pool.aclose()
+    close_sync_client()
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark scrapers against recorded fixtures')
+    parser.add_argument('--archive', type=Path, default=DEFAULT_ARCHIVE)
+    parser.add_argument('--ops', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--scenarios', default='stores,history,news,alerts')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency-ms', type=float, default=80.0)
+    parser.add_argument('--jitter-ms', type=float, default=40.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--throttle-rate', type=float, default=0.0)
+    parser.add_argument('--hang-rate', type=float, default=0.0)
+    parser.add_argument('--rate-limits', action='store_true', help='keep the per-host AIMD limits')
+    parser.add_argument('--verbose', action='store_true', help="show the scrapers' own output")
+    args = parser.parse_args()
+
+    os.environ['HTTP_REPLAY_URL'] = f"http://127.0.0.1:{args.port}"
+    os.environ['HTTP_CACHE_DISABLED'] = '1'
+    # Otherwise the alerts scenario is answered from the product index after one scrape
+    os.environ['IDENTITY_PRICE_FRESH_SECONDS'] = '0'
+    if not args.rate_limits:
+        os.environ['HOST_RATE_INITIAL'] = os.environ['HOST_RATE_MAX'] = '1000000'
+
+    if not args.archive.exists():
+        synthesize_archive(args.archive, args.ops)
+
+    server = start_replay_server(args)
+    try:
+        rows = asyncio.run(run_all(args))
+    finally:
+        server.terminate()
+        server.wait()
+
+    print(f"\nlatency {args.latency_ms:.0f}ms + exp({args.jitter_ms:.0f}ms), errors {args.error_rate:.0%}, "
+          f"429s {args.throttle_rate:.0%}, hangs {args.hang_rate:.0%}, concurrency {args.concurrency}\n")
+    print(f"{'scenario':<10} {'ops':>6} {'failed':>7} {'ops/s':>9} {'upstream/s':>11} "
+          f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for r in rows:
+        print(f"{r['scenario']:<10} {r['ops']:>6} {r['failed']:>7} {r['ops_per_sec']:>9.1f} {r['upstream_rps']:>11.1f} "
+              f"{r['p50']:>8.0f} {r['p95']:>8.0f} {r['p99']:>8.0f} {r['max']:>8.0f}")
+
+
+if __name__ == '__main__':
+    main()
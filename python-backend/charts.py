@@ -0,0 +1,203 @@
+"""
+Price history / forecast charts as PNG.
+
+Rendering is matplotlib's Agg backend through the Figure API (no pyplot
+global state), on a small worker pool so it never runs on the event loop.
+Finished images are kept in an LRU keyed by (product, fingerprint, size): the
+fingerprint hashes the title and the plotted points, so a chart is re-rendered
+only when what it shows actually changed. Concurrent requests for the same
+chart share one render.
+
+The bot's /history and GET /chart both go through chart_renderer, so they
+serve the same cached bytes; the fingerprint doubles as the HTTP ETag.
+
+Charts never wait on a Prophet fit: the forecast is drawn only once it is in
+forecast_cache (see PricePredictor.cached_prediction), and until then the
+chart shows history alone.
+"""
+
+import io
+import os
+import asyncio
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+import matplotlib
+matplotlib.use('Agg')
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+import matplotlib.dates as mdates
+import matplotlib.ticker as mticker
+
+from metrics import register_cache
+
+logger = logging.getLogger(__name__)
+
+CHART_WORKERS = int(os.environ.get('CHART_WORKERS', '2'))
+CHART_CACHE_ENTRIES = int(os.environ.get('CHART_CACHE_ENTRIES', '256'))
+CHART_CACHE_BYTES = int(os.environ.get('CHART_CACHE_BYTES', str(32 * 1024 * 1024)))
+DPI = 100
+SIZES = {
+    'small': (640, 360),
+    'large': (1280, 720),
+}
+
+
+def fingerprint(history: pd.DataFrame, forecast: Optional[List[Dict]] = None, title: str = '') -> str:
+    """Hash of the title and points a chart would plot"""
+    digest = hashlib.sha1(chart_title(title).encode())
+    digest.update(pd.to_datetime(history['ds'], utc=True).astype('int64').to_numpy().tobytes())
+    digest.update(history['y'].to_numpy(dtype=np.float64).tobytes())
+    for point in forecast or ():
+        digest.update(f"{point['date']}|{point['predicted_price']}|{point.get('lower_bound')}|{point.get('upper_bound')}".encode())
+    return digest.hexdigest()[:20]
+
+
+def chart_title(title: str) -> str:
+    return title[:80]
+
+
+def render_png(title: str, history: pd.DataFrame, forecast: Optional[List[Dict]], size: Tuple[int, int]) -> bytes:
+    """Blocking render; runs on the chart pool"""
+    width, height = size
+    fig = Figure(figsize=(width / DPI, height / DPI), dpi=DPI)
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+
+    ds = pd.to_datetime(history['ds'])
+    y = history['y'].astype(float)
+    ax.plot(ds, y, color='#1f77b4', linewidth=1.6, label='Price')
+    low = int(np.argmin(y.to_numpy()))
+    ax.scatter([ds.iloc[low]], [y.iloc[low]], color='#2ca02c', zorder=3, s=24)
+    ax.annotate(f"₹{y.iloc[low]:,.0f}", (ds.iloc[low], y.iloc[low]), textcoords='offset points',
+                xytext=(0, -14), ha='center', fontsize=8, color='#2ca02c')
+
+    if forecast:
+        f_ds = pd.to_datetime([p['date'] for p in forecast])
+        f_y = [p['predicted_price'] for p in forecast]
+        ax.plot(f_ds, f_y, color='#ff7f0e', linewidth=1.4, linestyle='--', label='Forecast')
+        if all('lower_bound' in p and 'upper_bound' in p for p in forecast):
+            ax.fill_between(f_ds, [p['lower_bound'] for p in forecast], [p['upper_bound'] for p in forecast],
+                            color='#ff7f0e', alpha=0.15, linewidth=0)
+        ax.legend(loc='best', fontsize=8, frameon=False)
+
+    ax.set_title(chart_title(title), fontsize=10)
+    ax.yaxis.set_major_formatter(mticker.FuncFormatter(lambda v, _: f"₹{v:,.0f}"))
+    ax.xaxis.set_major_locator(mdates.AutoDateLocator(maxticks=8))
+    ax.xaxis.set_major_formatter(mdates.ConciseDateFormatter(ax.xaxis.get_major_locator()))
+    ax.grid(True, alpha=0.3)
+    ax.margins(x=0.01, y=0.12)
+    ax.tick_params(labelsize=8)
+    # Fixed pixel margins; tight_layout() measures every label and costs a third of the render
+    fig.subplots_adjust(left=70 / width, right=1 - 15 / width, bottom=44 / height, top=1 - 28 / height)
+
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png')
+    return buffer.getvalue()
+
+
+class ChartRenderer:
+    def __init__(self, workers: int = CHART_WORKERS, max_entries: int = CHART_CACHE_ENTRIES,
+                 max_bytes: int = CHART_CACHE_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='chart')
+        self._cache: "OrderedDict[Tuple, bytes]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._inflight: Dict[Tuple, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.renders = 0
+
+    @staticmethod
+    def size_of(size) -> Tuple[int, int]:
+        if isinstance(size, str):
+            return SIZES.get(size, SIZES['small'])
+        width, height = size
+        return max(200, min(int(width), 2000)), max(150, min(int(height), 1200))
+
+    def get(self, key: Tuple) -> Optional[bytes]:
+        with self._lock:
+            png = self._cache.get(key)
+            if png is not None:
+                self._cache.move_to_end(key)
+            return png
+
+    def put(self, key: Tuple, png: bytes):
+        with self._lock:
+            old = self._cache.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old)
+            self._cache[key] = png
+            self._bytes += len(png)
+            while self._cache and (len(self._cache) > self.max_entries or self._bytes > self.max_bytes):
+                _, evicted = self._cache.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    async def chart(self, product: str, history: pd.DataFrame, forecast: Optional[List[Dict]] = None,
+                    size='small', title: Optional[str] = None) -> Tuple[bytes, str]:
+        """(PNG bytes, etag) for a product's chart, rendered at most once per distinct input"""
+        dims = self.size_of(size)
+        title = title or product
+        etag = f"{fingerprint(history, forecast, title)}-{dims[0]}x{dims[1]}"
+        key = (product, etag)
+
+        png = self.get(key)
+        if png is not None:
+            self.hits += 1
+            return png, etag
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self.hits += 1
+            return await asyncio.shield(pending), etag
+
+        self.misses += 1
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self._pool, render_png, title, history, forecast, dims)
+        self._inflight[key] = future
+        try:
+            # Shielded: a caller giving up must not cancel the render others are waiting on
+            png = await asyncio.shield(future)
+        finally:
+            self._inflight.pop(key, None)
+        self.renders += 1
+        self.put(key, png)
+        return png, etag
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._cache), 'bytes': self._bytes, 'hits': self.hits, 'misses': self.misses,
+            'renders': self.renders, 'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+# Global instance
+chart_renderer = ChartRenderer()
+register_cache('chart', chart_renderer)
+
+
+async def product_chart(predictor, product_url: str, product_name: str = "", size='small',
+                        with_forecast: bool = True) -> Optional[Tuple[bytes, str]]:
+    """
+    History chart for a product URL, or None without enough history. The
+    forecast is added when one is cached; otherwise it is started for later.
+    """
+    history, source = await predictor.load_history(product_url)
+    if len(history) < 2:
+        return None
+    history = history.assign(ds=pd.to_datetime(history['ds']).dt.tz_localize(None))
+    forecast = None
+    if with_forecast:
+        result = predictor.cached_prediction(float(history['y'].iloc[-1]), product_url, product_name)
+        forecast = (result or {}).get('forecast') or None
+    return await chart_renderer.chart(product_url, history, forecast, size, title=product_name or product_url)
@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Telegram Bot API, for load tests.
+
+Answers /bot<token>/<method> the way api.telegram.org does for the methods the
+bots use: getMe, getUpdates (long polling with offsets), setWebhook /
+deleteWebhook, sendMessage (recorded per chat, in arrival order) and anything
+else with a bare ok. Point the bots at it with TELEGRAM_API_URL=http://127.0.0.1:<port>.
+
+Once a bot has set a webhook, queued updates are POSTed to it instead (with
+the secret token header, up to max_connections at a time, each chat's
+updates in order) and getUpdates answers 409, as Telegram does.
+
+Admin routes:
+  POST /__fake/updates          {"chats": [...], "per_chat": n, "text": "/analyze {url}"}
+                                queues incoming messages for getUpdates
+  GET  /__fake/stats            counters plus every sent message
+  POST /__fake/reset            forget queued updates and sent messages
+  POST /__fake/backend/predict  a slow stand-in for the backend's /predict
+
+Fault injection, all optional:
+  --latency-ms          delay on every Bot API call
+  --throttle-rate       fraction of sendMessage calls answered with 429 + retry_after
+  --enforce-limits      answer 429 like Telegram when a token sends more than
+                        --bot-rate messages in a second or a chat gets more
+                        than one message per --chat-interval seconds
+  --backend-latency-ms  delay on the fake /predict
+
+Usage: python fake_bot_api.py [--port 8081] [--latency-ms 20] [--backend-latency-ms 200]
+"""
+
+import json
+import time
+import random
+import asyncio
+import argparse
+from collections import deque
+from dataclasses import dataclass, asdict
+from typing import Dict, List, Optional
+from urllib.parse import parse_qsl
+
+
+@dataclass
+class FakeConfig:
+    latency_ms: float = 0.0
+    throttle_rate: float = 0.0
+    retry_after: int = 1
+    backend_latency_ms: float = 200.0
+    enforce_limits: bool = False
+    bot_rate: int = 30
+    chat_interval: float = 1.0
+    # Arrival jitter allowed before a chat counts as flooded
+    slack: float = 0.05
+
+
+class FakeBotApi:
+    """Minimal ASGI app, like replay_server.py, so the stub isn't the bottleneck"""
+
+    def __init__(self, config: FakeConfig):
+        self.config = config
+        self.reset()
+
+    def reset(self):
+        self.updates: List[Dict] = []
+        self.next_update_id = 1
+        self.sent: List[Dict] = []
+        # token -> (url, secret_token, max_connections)
+        self.webhooks: Dict[str, tuple] = {}
+        self.counters = {'calls': 0, 'get_updates': 0, 'delivered': 0, 'sent': 0, 'throttled': 0,
+                         'over_bot_rate': 0, 'over_chat_rate': 0, 'predicts': 0,
+                         'webhook_posts': 0, 'webhook_errors': 0}
+        self._token_sends: Dict[str, deque] = {}
+        self._chat_last: Dict[str, float] = {}
+        self._new_updates = asyncio.Event()
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            while True:
+                message = await receive()
+                if message['type'] == 'lifespan.startup':
+                    self._new_updates = asyncio.Event()
+                    await send({'type': 'lifespan.startup.complete'})
+                elif message['type'] == 'lifespan.shutdown':
+                    await send({'type': 'lifespan.shutdown.complete'})
+                    return
+
+        path = scope['path']
+        body = b''
+        while True:
+            message = await receive()
+            body += message.get('body', b'')
+            if not message.get('more_body'):
+                break
+
+        if path.startswith('/__fake/'):
+            status, result = await self.admin(path[len('/__fake/'):], body)
+            return await self._respond(send, status, result)
+
+        parts = path.strip('/').split('/')
+        if len(parts) != 2 or not parts[0].startswith('bot'):
+            return await self._respond(send, 404, {'ok': False, 'error_code': 404, 'description': 'Not Found'})
+        token, method = parts[0][3:], parts[1]
+        params = self.parse_params(body, dict(scope['headers']).get(b'content-type', b''))
+
+        self.counters['calls'] += 1
+        if self.config.latency_ms:
+            await asyncio.sleep(self.config.latency_ms / 1000.0)
+        status, result = await self.bot_method(token, method, params)
+        await self._respond(send, status, result)
+
+    @staticmethod
+    def parse_params(body: bytes, content_type: bytes) -> Dict:
+        """PTB posts form fields whose values are JSON-encoded"""
+        if not body:
+            return {}
+        if content_type.startswith(b'application/json'):
+            return json.loads(body)
+        params = {}
+        for key, value in parse_qsl(body.decode()):
+            try:
+                params[key] = json.loads(value)
+            except ValueError:
+                params[key] = value
+        return params
+
+    async def bot_method(self, token: str, method: str, params: Dict):
+        if method == 'getMe':
+            return 200, {'ok': True, 'result': {'id': abs(hash(token)) % 10**9, 'is_bot': True,
+                                                'first_name': 'Fake', 'username': f"fake_{token[:6]}_bot"}}
+        if method == 'getUpdates':
+            if token in self.webhooks:
+                return 409, {'ok': False, 'error_code': 409,
+                             'description': "Conflict: can't use getUpdates method while webhook is active"}
+            return 200, {'ok': True, 'result': await self.get_updates(params)}
+        if method == 'setWebhook':
+            self.webhooks[token] = (params.get('url'), params.get('secret_token'),
+                                    int(params.get('max_connections') or 40))
+            return 200, {'ok': True, 'result': True}
+        if method == 'deleteWebhook':
+            self.webhooks.pop(token, None)
+            return 200, {'ok': True, 'result': True}
+        if method == 'sendMessage':
+            if random.random() < self.config.throttle_rate:
+                self.counters['throttled'] += 1
+                return 429, {'ok': False, 'error_code': 429, 'description': 'Too Many Requests: retry later',
+                             'parameters': {'retry_after': self.config.retry_after}}
+            chat_id = params.get('chat_id')
+            if self.config.enforce_limits:
+                limited = self.over_limit(token, str(chat_id))
+                if limited:
+                    self.counters[limited] += 1
+                    return 429, {'ok': False, 'error_code': 429, 'description': 'Too Many Requests: retry later',
+                                 'parameters': {'retry_after': self.config.retry_after}}
+            self.sent.append({'chat_id': chat_id, 'text': params.get('text', ''), 'token': token, 'at': time.time()})
+            self.counters['sent'] += 1
+            return 200, {'ok': True, 'result': {'message_id': len(self.sent), 'date': int(time.time()),
+                                                'chat': {'id': chat_id, 'type': 'private'},
+                                                'text': params.get('text', '')}}
+        return 200, {'ok': True, 'result': True}
+
+    def over_limit(self, token: str, chat_id: str) -> Optional[str]:
+        now = time.monotonic()
+        sends = self._token_sends.setdefault(token, deque())
+        while sends and now - sends[0] >= 1.0:
+            sends.popleft()
+        if len(sends) >= self.config.bot_rate:
+            return 'over_bot_rate'
+        last = self._chat_last.get(chat_id)
+        if last is not None and now - last < self.config.chat_interval - self.config.slack:
+            return 'over_chat_rate'
+        sends.append(now)
+        self._chat_last[chat_id] = now
+        return None
+
+    async def get_updates(self, params: Dict) -> List[Dict]:
+        self.counters['get_updates'] += 1
+        offset = int(params.get('offset') or 0)
+        limit = int(params.get('limit') or 100)
+        # Confirmed updates are dropped, as Telegram does
+        self.updates = [u for u in self.updates if u['update_id'] >= offset]
+        if not self.updates:
+            self._new_updates.clear()
+            try:
+                await asyncio.wait_for(self._new_updates.wait(), float(params.get('timeout') or 0))
+            except asyncio.TimeoutError:
+                pass
+        batch = self.updates[:limit]
+        self.counters['delivered'] += len(batch)
+        return batch
+
+    def queue_message(self, chat_id: int, text: str):
+        update_id = self.next_update_id
+        self.next_update_id += 1
+        entities = []
+        if text.startswith('/'):
+            command = text.split()[0]
+            entities.append({'type': 'bot_command', 'offset': 0, 'length': len(command)})
+        self.updates.append({
+            'update_id': update_id,
+            'message': {
+                'message_id': update_id, 'date': int(time.time()), 'text': text, 'entities': entities,
+                'chat': {'id': chat_id, 'type': 'private'},
+                'from': {'id': chat_id, 'is_bot': False, 'first_name': f"user{chat_id}"},
+            },
+        })
+
+    async def push_webhook(self, token: str, updates: List[Dict]):
+        import httpx
+        url, secret, max_connections = self.webhooks[token]
+        headers = {'X-Telegram-Bot-Api-Secret-Token': secret} if secret else {}
+        by_chat: Dict[int, List[Dict]] = {}
+        for update in updates:
+            by_chat.setdefault(update['message']['chat']['id'], []).append(update)
+        semaphore = asyncio.Semaphore(max_connections)
+
+        async def push_chat(client, chat_updates):
+            for update in chat_updates:
+                async with semaphore:
+                    try:
+                        response = await client.post(url, json=update, headers=headers)
+                        ok = response.status_code == 200
+                    except httpx.HTTPError:
+                        ok = False
+                self.counters['webhook_posts' if ok else 'webhook_errors'] += 1
+
+        async with httpx.AsyncClient(timeout=30, limits=httpx.Limits(max_connections=max_connections)) as client:
+            await asyncio.gather(*(push_chat(client, chat_updates) for chat_updates in by_chat.values()))
+
+    async def admin(self, route: str, body: bytes):
+        if route == 'stats':
+            return 200, {**self.counters, 'queued': len(self.updates), 'config': asdict(self.config), 'messages': self.sent}
+        if route == 'reset':
+            self.reset()
+            return 200, {'ok': True}
+        if route == 'updates':
+            spec = json.loads(body or b'{}')
+            chats = spec.get('chats', [1])
+            template = spec.get('text', '/analyze https://www.amazon.in/dp/FAKE{seq}')
+            # Interleave chats so each chat's messages arrive spread across the stream
+            for seq in range(int(spec.get('per_chat', 1))):
+                for chat_id in chats:
+                    self.queue_message(chat_id, template.format(chat=chat_id, seq=seq))
+            if self.webhooks:
+                updates, self.updates = self.updates, []
+                token = spec.get('token') or next(iter(self.webhooks))
+                asyncio.create_task(self.push_webhook(token, updates))
+                return 200, {'ok': True, 'pushing': len(updates)}
+            self._new_updates.set()
+            return 200, {'ok': True, 'queued': len(self.updates)}
+        if route == 'backend/predict':
+            self.counters['predicts'] += 1
+            request = json.loads(body or b'{}')
+            await asyncio.sleep(self.config.backend_latency_ms / 1000.0)
+            return 200, {'trend': 'stable', 'forecast': [],
+                         'recommendation': f"hold {request.get('product_url', '')}"}
+        return 404, {'ok': False}
+
+    @staticmethod
+    async def _respond(send, status, result):
+        body = json.dumps(result).encode()
+        await send({'type': 'http.response.start', 'status': status,
+                    'headers': [(b'content-type', b'application/json'),
+                                (b'content-length', str(len(body)).encode())]})
+        await send({'type': 'http.response.body', 'body': body})
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fake Telegram Bot API for load tests')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--latency-ms', type=float, default=0.0)
+    parser.add_argument('--throttle-rate', type=float, default=0.0)
+    parser.add_argument('--retry-after', type=int, default=1)
+    parser.add_argument('--backend-latency-ms', type=float, default=200.0)
+    parser.add_argument('--enforce-limits', action='store_true')
+    parser.add_argument('--bot-rate', type=int, default=30)
+    parser.add_argument('--chat-interval', type=float, default=1.0)
+    args = parser.parse_args()
+
+    config = FakeConfig(args.latency_ms, args.throttle_rate, args.retry_after, args.backend_latency_ms,
+                        args.enforce_limits, args.bot_rate, args.chat_interval)
+
+    import uvicorn
+    print(f"Fake Bot API on http://{args.host}:{args.port}")
+    uvicorn.run(FakeBotApi(config), host=args.host, port=args.port, log_level='warning', access_log=False)
+
+
+if __name__ == '__main__':
+    main()
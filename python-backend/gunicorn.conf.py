@@ -0,0 +1,52 @@
+"""
+gunicorn settings for the production serving mode (see serving.py).
+
+    gunicorn -c gunicorn.conf.py main:app      # or: python serve.py
+
+Environment: PORT, BACKEND_WORKERS ("auto" or a count), BACKEND_TIMEOUT,
+BACKEND_MAX_REQUESTS, SCRAPE_CACHE_DIR.
+"""
+
+import os
+from pathlib import Path
+
+from serving import STATE_DIR, worker_count
+
+_here = Path(__file__).parent
+
+# Read by the cache modules at import, so set before the app is preloaded:
+# the disk tier is what the workers share; memory only holds a hot set
+os.environ.setdefault('SCRAPE_CACHE_DIR', str(_here / '.cache' / 'scrape'))
+os.environ.setdefault('SCRAPE_CACHE_MAX_BYTES', str(16 * 1024 * 1024))
+
+wsgi_app = 'main:app'
+chdir = str(_here)
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = worker_count()
+worker_class = 'uvicorn.workers.UvicornWorker'
+
+# Import prophet, pandas and the app once; workers fork with it in memory
+preload_app = True
+
+# A worker is restarted when it misses heartbeats this long; the event loop
+# never blocks on a fit, so this only catches a wedged process
+timeout = int(os.environ.get('BACKEND_TIMEOUT', '120'))
+# In-flight requests get this long to finish on reload or shutdown
+graceful_timeout = 30
+keepalive = 5
+
+# Recycle workers one at a time, staggered, to cap slow memory growth
+max_requests = int(os.environ.get('BACKEND_MAX_REQUESTS', '2000'))
+max_requests_jitter = max_requests // 10
+
+Path(STATE_DIR).mkdir(parents=True, exist_ok=True)
+pidfile = str(Path(STATE_DIR) / 'gunicorn.pid')
+accesslog = '-'
+forwarded_allow_ips = '*'
+
+
+def when_ready(server):
+    # The app is already imported (preload); fill its read-only state before any fork
+    from serving import preload_shared_state
+    preload_shared_state()
+    server.log.info(f"Serving with {server.num_workers} workers")
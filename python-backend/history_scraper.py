@@ -1,11 +1,14 @@
-import requests
-from bs4 import BeautifulSoup
-from fake_useragent import UserAgent
 import pandas as pd
 import re
 import json
 from datetime import datetime
 import urllib.parse
+from http_client import get_sync_client, ua_pool
+from scraping.cache import scrape_cache
+from scraping.extract import Selector, parse_html, extract_next_data, extract_chart_series, find_price_history
+
+# Compiled once, reused for every search page
+PRODUCT_LINK = Selector('a[href^="/product/"]')
 
 def extract_asin(url):
     # Support Amazon ASIN extraction
@@ -18,12 +21,7 @@ def fetch_pricehistoryapp_data(product_url):
     """
     Attempts to scrape historical data from pricehistoryapp.com
     """""
-    ua = UserAgent()
-    headers = {
-        'User-Agent': ua.random,
-        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-        'Accept-Language': 'en-US,en;q=0.5'
-    }
+    headers = ua_pool.headers()
     
     try:
         # EXTRACT ASIN/SLUG
@@ -36,84 +34,93 @@ def fetch_pricehistoryapp_data(product_url):
         
         # 1. Search Page
         search_url = f"https://pricehistoryapp.com/search?q={cleaned_query}"
-        sess = requests.Session()
-        resp = sess.get(search_url, headers=headers, timeout=10)
+        sess = get_sync_client()
+        resp = sess.get(search_url, headers=headers)
         
         if resp.status_code != 200:
             print("Scraper: Search failed")
             return pd.DataFrame()
             
-        soup = BeautifulSoup(resp.text, 'html.parser')
-        
         # Find product link (usually card-link or similar)
         # Select the first link that looks like a product page
-        link = soup.select_one('a[href^="/product/"]')
+        link = PRODUCT_LINK.first(parse_html(resp.content))
         
-        if not link:
+        if link is None:
             print("Scraper: No product found on tracker site.")
             return pd.DataFrame()
             
         # 2. Product Page
-        page_url = "https://pricehistoryapp.com" + link['href']
+        page_url = "https://pricehistoryapp.com" + link.get('href')
         print(f"Scraper: Found Page {page_url}, fetching...")
         
-        prod_resp = sess.get(page_url, headers=headers, timeout=10)
-        
-        # 3. Extract Data - Look for Chart Data in Scripts
-        # Highcharts or 'priceHistory' variable
-        chart_pattern = re.compile(r'data:\s*(\[[^\]]+\])')
+        prod_resp = sess.get(page_url, headers=headers)
         
-        # We look for the main chart data series
-        # content-wrapper -> script
-        soup_prod = BeautifulSoup(prod_resp.text, 'html.parser')
-        scripts = soup_prod.find_all('script')
+        # 3. Extract Data - straight from the raw HTML, no DOM
+        # Many Next.js sites ship the series in __NEXT_DATA__
+        points = find_price_history(extract_next_data(prod_resp.text))
+        if points:
+            df = points_to_frame(points)
+            if not df.empty:
+                print(f"Scraper: Extracted {len(df)} points from page data.")
+                return df
         
-        history_data = []
+        # Fallback: Highcharts config in an inline script
+        # categories: [....], data: [....]
+        series = extract_chart_series(prod_resp.text)
+        if series:
+            df = series_to_frame(*series)
+            if not df.empty:
+                print(f"Scraper: Extracted {len(df)} points from chart config.")
+                return df
 
-        for s in scripts:
-            if s.string:
-                # heuristic: look for large array of numbers or dates
-                # Many Next.js sites use __NEXT_DATA__
-                if '__NEXT_DATA__' in s.string:
-                    try:
-                        json_data = json.loads(s.string)
-                        # Traverse JSON to find 'priceHistory'
-                        # This path is highly specific and WILL BREAK if site changes
-                        # But it's the "Real" way to do it.
-                        props = json_data.get('props', {}).get('pageProps', {})
-                        product_data = props.get('product', {})
-                        prices = tuple() 
-                        # This path varies. 
-                        # If we can't find direct JSON, we might fallback to regex
-                    except:
-                        pass
-                
-                # Regex Fallback for Highcharts
-                # dates: [....], data: [....]
-                if 'Highcharts' in s.string or 'Chart' in s.string:
-                    dates_match = re.search(r'categories":(\[[^\]]+\])', s.string)
-                    prices_match = re.search(r'data":(\[[^\]]+\])', s.string)
-                    
-                    if dates_match and prices_match:
-                         # Parse
-                         pass
-
-        # Since solving the specific DOM structure of a 3rd party site blind is error-prone:
-        # We will assume if we reached the page, we can extract the 'Current Price' and 'Lowest Price' 
-        # often listed in text, and maybe construct a linear interpolation if chart is protected.
-        
-        print("Scraper: Page reached, but chart extraction is strictly protected.")
-        return pd.DataFrame() # Return empty to avoid breaking law/terms
+        print("Scraper: Page reached, but no price series found in page data or charts.")
+        return pd.DataFrame()
         
     except Exception as e:
         print(f"Scraper Error: {e}")
         
     return pd.DataFrame()
 
+def points_to_frame(points):
+    """[{date, price}, ...] from page JSON -> DataFrame(ds, y)"""
+    rows = []
+    for point in points:
+        ds = point.get('date') or point.get('time') or point.get('x') or point.get('ds')
+        y = point.get('price') or point.get('y') or point.get('value')
+        if ds is not None and y is not None:
+            rows.append((ds, y))
+    return rows_to_frame(rows)
+
+def series_to_frame(categories, data):
+    """Highcharts categories/data arrays -> DataFrame(ds, y)"""
+    rows = []
+    for ds, y in zip(categories, data):
+        # Points can be bare numbers or [timestamp, price] pairs
+        if isinstance(y, list) and len(y) == 2:
+            ds, y = y
+        rows.append((ds, y))
+    return rows_to_frame(rows)
+
+def rows_to_frame(rows):
+    if not rows:
+        return pd.DataFrame()
+    df = pd.DataFrame(rows, columns=['ds', 'y'])
+    # Millisecond epochs (Highcharts) vs date strings
+    if pd.api.types.is_numeric_dtype(df['ds']):
+        df['ds'] = pd.to_datetime(df['ds'], unit='ms', errors='coerce')
+    else:
+        df['ds'] = pd.to_datetime(df['ds'], errors='coerce')
+    df['y'] = pd.to_numeric(df['y'], errors='coerce')
+    return df.dropna()
+
 def fetch_external_history(product_url):
     """
     Main entry point for external history
+    Cached per normalized URL; concurrent callers share one scrape
     """
+    return scrape_cache.get_or_fetch_sync('history', product_url, lambda: fetch_external_history_uncached(product_url))
+
+def fetch_external_history_uncached(product_url):
     # Try multiple sources
     df = fetch_pricehistoryapp_data(product_url)
     if not df.empty:
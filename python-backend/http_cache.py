@@ -0,0 +1,304 @@
+"""
+HTTP response cache on disk for the shared sync client.
+
+A private cache in the RFC 9111 sense, implemented as an httpx transport:
+- honours Cache-Control (no-store, no-cache, max-age, must-revalidate),
+  Expires, Age and Vary, with the usual Last-Modified heuristic
+- fresh responses are served from disk without touching the network
+- stale responses with an ETag/Last-Modified are revalidated with a
+  conditional GET, and a 304 refreshes the stored copy instead of
+  re-downloading it
+- the store is a sqlite file capped at HTTP_CACHE_MAX_BYTES, evicting least
+  recently used responses first
+
+Responses carry extensions['cache_status']: HIT, REVALIDATED or MISS.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import Dict, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = os.environ.get('HTTP_CACHE_DIR', str(Path(__file__).parent / '.cache' / 'http'))
+MAX_BYTES = int(os.environ.get('HTTP_CACHE_MAX_BYTES', str(256 * 1024 * 1024)))
+
+# Status codes that are cacheable by default (RFC 9110 15.1)
+CACHEABLE_STATUS = {200, 203, 204, 300, 301, 308, 404, 405, 410, 414, 501}
+# Hop-by-hop and per-message headers a 304 must not overwrite on the stored response
+NOT_UPDATED_BY_304 = {'content-length', 'content-encoding', 'transfer-encoding', 'connection'}
+HEURISTIC_FRACTION = 0.1
+HEURISTIC_MAX = 24 * 60 * 60
+
+
+def parse_cache_control(value: Optional[str]) -> Dict[str, Optional[str]]:
+    directives = {}
+    for part in (value or '').split(','):
+        part = part.strip()
+        if not part:
+            continue
+        name, _, arg = part.partition('=')
+        directives[name.strip().lower()] = arg.strip().strip('"') or None
+    return directives
+
+
+def parse_http_date(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+def _seconds(value: Optional[str]) -> Optional[int]:
+    try:
+        return max(0, int(value))
+    except (TypeError, ValueError):
+        return None
+
+
+class StoredResponse:
+    def __init__(self, status: int, headers: Dict[str, str], body: bytes,
+                 request_time: float, response_time: float, vary: Dict[str, str]):
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.request_time = request_time
+        self.response_time = response_time
+        self.vary = vary
+
+    @property
+    def cache_control(self) -> Dict[str, Optional[str]]:
+        return parse_cache_control(self.headers.get('cache-control'))
+
+    def freshness_lifetime(self) -> float:
+        cc = self.cache_control
+        max_age = _seconds(cc.get('max-age'))
+        if max_age is not None:
+            return max_age
+        expires = parse_http_date(self.headers.get('expires'))
+        date = parse_http_date(self.headers.get('date')) or self.response_time
+        if expires is not None:
+            return max(0.0, expires - date)
+        # Heuristic freshness: 10% of the time since last modification
+        last_modified = parse_http_date(self.headers.get('last-modified'))
+        if last_modified is not None and self.status in CACHEABLE_STATUS:
+            return min(HEURISTIC_MAX, max(0.0, (date - last_modified) * HEURISTIC_FRACTION))
+        return 0.0
+
+    def current_age(self, now: float) -> float:
+        date = parse_http_date(self.headers.get('date')) or self.response_time
+        apparent_age = max(0.0, self.response_time - date)
+        age_value = _seconds(self.headers.get('age')) or 0
+        response_delay = self.response_time - self.request_time
+        corrected_initial_age = max(apparent_age, age_value + response_delay)
+        return corrected_initial_age + (now - self.response_time)
+
+    def is_fresh(self, now: float) -> bool:
+        if 'no-cache' in self.cache_control:
+            return False
+        return self.current_age(now) < self.freshness_lifetime()
+
+    def validators(self) -> Dict[str, str]:
+        headers = {}
+        if 'etag' in self.headers:
+            headers['If-None-Match'] = self.headers['etag']
+        if 'last-modified' in self.headers:
+            headers['If-Modified-Since'] = self.headers['last-modified']
+        return headers
+
+
+class HttpCacheStore:
+    """sqlite store with size-capped LRU eviction"""
+
+    def __init__(self, directory: str = CACHE_DIR, max_bytes: int = MAX_BYTES):
+        self.max_bytes = max_bytes
+        path = Path(directory)
+        path.mkdir(parents=True, exist_ok=True)
+        self.path = path / 'responses.sqlite3'
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=5)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                meta TEXT NOT NULL,
+                body BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._conn.execute('CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)')
+        self._conn.commit()
+        self._total = self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+
+    def get(self, key: str) -> Optional[StoredResponse]:
+        with self._lock:
+            row = self._conn.execute('SELECT meta, body FROM responses WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return None
+            self._conn.execute('UPDATE responses SET last_access = ? WHERE key = ?', (time.time(), key))
+            self._conn.commit()
+        meta = json.loads(row[0])
+        return StoredResponse(meta['status'], meta['headers'], row[1],
+                              meta['request_time'], meta['response_time'], meta['vary'])
+
+    def put(self, key: str, stored: StoredResponse):
+        meta = json.dumps({
+            'status': stored.status,
+            'headers': stored.headers,
+            'request_time': stored.request_time,
+            'response_time': stored.response_time,
+            'vary': stored.vary,
+        })
+        size = len(stored.body) + len(meta)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._conn.execute('SELECT size FROM responses WHERE key = ?', (key,)).fetchone()
+            self._conn.execute('INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)',
+                               (key, meta, stored.body, size, time.time()))
+            self._total += size - (old[0] if old else 0)
+            if self._total > self.max_bytes:
+                self._evict(self.max_bytes * 0.9)
+            self._conn.commit()
+
+    def delete(self, key: str):
+        with self._lock:
+            row = self._conn.execute('SELECT size FROM responses WHERE key = ?', (key,)).fetchone()
+            if row:
+                self._conn.execute('DELETE FROM responses WHERE key = ?', (key,))
+                self._total -= row[0]
+                self._conn.commit()
+
+    def _evict(self, target: float):
+        for key, size in self._conn.execute('SELECT key, size FROM responses ORDER BY last_access').fetchall():
+            if self._total <= target:
+                break
+            self._conn.execute('DELETE FROM responses WHERE key = ?', (key,))
+            self._total -= size
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total
+
+
+class CachingTransport(httpx.BaseTransport):
+    """Wraps another transport with the disk cache (GET only)"""
+
+    def __init__(self, transport: httpx.BaseTransport, store: Optional[HttpCacheStore] = None):
+        self.transport = transport
+        self.store = store or HttpCacheStore()
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(request: httpx.Request) -> str:
+        return hashlib.sha256(str(request.url).encode()).hexdigest()
+
+    @staticmethod
+    def _vary_matches(stored: StoredResponse, request: httpx.Request) -> bool:
+        return all(request.headers.get(name, '') == value for name, value in stored.vary.items())
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        if request.method != 'GET':
+            return self.transport.handle_request(request)
+
+        request_cc = parse_cache_control(request.headers.get('cache-control'))
+        if 'no-store' in request_cc:
+            return self.transport.handle_request(request)
+
+        key = self._key(request)
+        stored = self.store.get(key)
+        if stored is not None and not self._vary_matches(stored, request):
+            stored = None
+
+        now = time.time()
+        if stored is not None and 'no-cache' not in request_cc and stored.is_fresh(now):
+            self.hits += 1
+            return self._build(stored, request, 'HIT')
+
+        if stored is not None:
+            for name, value in stored.validators().items():
+                request.headers[name] = value
+
+        request_time = time.time()
+        response = self.transport.handle_request(request)
+        response_time = time.time()
+
+        if response.status_code == 304 and stored is not None:
+            response.close()
+            for name, value in response.headers.items():
+                if name.lower() not in NOT_UPDATED_BY_304:
+                    stored.headers[name.lower()] = value
+            stored.request_time, stored.response_time = request_time, response_time
+            self.store.put(key, stored)
+            self.revalidated += 1
+            return self._build(stored, request, 'REVALIDATED')
+
+        self.misses += 1
+        return self._maybe_store(key, request, response, request_time, response_time)
+
+    def _maybe_store(self, key: str, request: httpx.Request, response: httpx.Response,
+                     request_time: float, response_time: float) -> httpx.Response:
+        cc = parse_cache_control(response.headers.get('cache-control'))
+        vary_header = response.headers.get('vary', '')
+        if (response.status_code not in CACHEABLE_STATUS or 'no-store' in cc
+                or vary_header.strip() == '*'):
+            if response.status_code in CACHEABLE_STATUS:
+                self.store.delete(key)
+            return self._mark(response, 'MISS')
+
+        # Raw (still content-encoded) bytes straight off the transport stream;
+        # the client decodes them as usual
+        try:
+            body = b''.join(response.stream)
+        finally:
+            response.close()
+
+        headers = {name.lower(): value for name, value in response.headers.items()}
+        vary = {name.strip().lower(): request.headers.get(name.strip(), '')
+                for name in vary_header.split(',') if name.strip()}
+        stored = StoredResponse(response.status_code, headers, body, request_time, response_time, vary)
+
+        # Only worth keeping if it can be served fresh or revalidated later
+        if stored.freshness_lifetime() > 0 or stored.validators():
+            self.store.put(key, stored)
+        return self._build(stored, request, 'MISS')
+
+    @staticmethod
+    def _build(stored: StoredResponse, request: httpx.Request, status: str) -> httpx.Response:
+        return httpx.Response(
+            stored.status,
+            headers=list(stored.headers.items()),
+            stream=httpx.ByteStream(stored.body),
+            request=request,
+            extensions={'cache_status': status},
+        )
+
+    @staticmethod
+    def _mark(response: httpx.Response, status: str) -> httpx.Response:
+        response.extensions = {**response.extensions, 'cache_status': status}
+        return response
+
+    def close(self):
+        self.transport.close()
+
+    def stats(self) -> Dict:
+        return {
+            'hits': self.hits,
+            'revalidated': self.revalidated,
+            'misses': self.misses,
+            'bytes': self.store.total_bytes,
+        }
@@ -0,0 +1,227 @@
+"""
+Process-wide HTTP client layer.
+
+Every outbound call (store scrapers, history scraper, news feeds, Telegram)
+goes through one of the pooled clients here instead of building its own
+session, so TCP/TLS connections are kept alive per host and reused:
+
+- http_pool: async client for the scraping engine, with per-host concurrency limits
+- get_sync_client(): thread-safe sync client for the synchronous code paths,
+  backed by the conditional-request disk cache in http_cache.py
+- ua_pool: User-Agent strings loaded once and rotated
+- telegram_request(): python-telegram-bot request object using the same timeouts
+
+Both pooled clients send through resilience.py, so every upstream host gets a
+circuit breaker, an adaptive rate limit and the caller's deadline budget.
+HTTP_RECORD_ARCHIVE / HTTP_REPLAY_URL switch on recording or offline replay
+(see http_replay.py).
+
+HTTP/2 is negotiated when the optional `h2` package is installed.
+"""
+
+import os
+import random
+import asyncio
+import logging
+import itertools
+import threading
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+from http_replay import wrap_transport, wrap_async_transport
+from resilience import ResilientTransport, AsyncResilientTransport
+
+logger = logging.getLogger(__name__)
+
+MAX_CONNECTIONS = int(os.environ.get('HTTP_MAX_CONNECTIONS', '100'))
+MAX_KEEPALIVE_CONNECTIONS = int(os.environ.get('HTTP_MAX_KEEPALIVE_CONNECTIONS', '20'))
+KEEPALIVE_EXPIRY = float(os.environ.get('HTTP_KEEPALIVE_EXPIRY', '30'))
+PER_HOST_CONCURRENCY = int(os.environ.get('HTTP_PER_HOST_CONCURRENCY', '4'))
+CONNECT_TIMEOUT = float(os.environ.get('HTTP_CONNECT_TIMEOUT', '5'))
+READ_TIMEOUT = float(os.environ.get('HTTP_READ_TIMEOUT', '10'))
+UA_POOL_SIZE = int(os.environ.get('HTTP_UA_POOL_SIZE', '32'))
+HTTP_CACHE_ENABLED = os.environ.get('HTTP_CACHE_DISABLED', '').lower() not in ('1', 'true', 'yes')
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = os.environ.get('HTTP_DISABLE_HTTP2', '').lower() not in ('1', 'true', 'yes')
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# Used when fake_useragent's dataset can't be loaded
+FALLBACK_USER_AGENTS = [
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:138.0) Gecko/20100101 Firefox/138.0',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 14_4) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.4 Safari/605.1.15',
+    'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36 Edg/124.0.0.0',
+]
+
+BROWSER_HEADERS = {
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.5',
+}
+
+
+def build_timeout(connect: float = CONNECT_TIMEOUT, read: float = READ_TIMEOUT) -> httpx.Timeout:
+    return httpx.Timeout(read, connect=connect)
+
+
+def build_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=MAX_CONNECTIONS,
+        max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=KEEPALIVE_EXPIRY,
+    )
+
+
+class UserAgentPool:
+    """
+    A fixed sample of real User-Agent strings, loaded once per process.
+    fake_useragent parses its whole dataset on construction, which is far too
+    slow to do per request.
+    """
+
+    def __init__(self, size: int = UA_POOL_SIZE):
+        self.size = size
+        self._agents: Optional[List[str]] = None
+        self._cycle = None
+        self._lock = threading.Lock()
+
+    def _load(self) -> List[str]:
+        try:
+            from fake_useragent import UserAgent
+            ua = UserAgent()
+            agents = list({ua.random for _ in range(self.size * 2)})[:self.size]
+        except Exception as e:
+            logger.warning(f"UserAgent dataset unavailable, using built-in list: {e}")
+            agents = []
+        agents = agents or list(FALLBACK_USER_AGENTS)
+        random.shuffle(agents)
+        return agents
+
+    def preload(self):
+        with self._lock:
+            if self._agents is None:
+                self._agents = self._load()
+                self._cycle = itertools.cycle(self._agents)
+
+    def next(self) -> str:
+        if self._agents is None:
+            self.preload()
+        with self._lock:
+            return next(self._cycle)
+
+    def headers(self, extra: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+        """Browser-like headers with the next User-Agent in the rotation"""
+        return {**BROWSER_HEADERS, 'User-Agent': self.next(), **(extra or {})}
+
+
+class HttpPool:
+    """Async keep-alive connection pool with per-host concurrency limits"""
+
+    def __init__(self, per_host_concurrency: int = PER_HOST_CONCURRENCY,
+                 timeout: Optional[httpx.Timeout] = None):
+        self.per_host_concurrency = per_host_concurrency
+        self.timeout = timeout or build_timeout(read=15.0)
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._host_limits: Dict[str, asyncio.Semaphore] = {}
+
+    def _get_client(self) -> httpx.AsyncClient:
+        # Connections and semaphores belong to one event loop; scripts that call
+        # asyncio.run() more than once get a fresh pool for each loop
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop:
+            transport = wrap_async_transport(httpx.AsyncHTTPTransport(limits=build_limits(), http2=HTTP2_AVAILABLE))
+            self._client = httpx.AsyncClient(
+                transport=AsyncResilientTransport(transport),
+                timeout=self.timeout,
+                follow_redirects=True,
+            )
+            self._loop = loop
+            self._host_limits = {}
+        return self._client
+
+    def _host_limit(self, host: str) -> asyncio.Semaphore:
+        limit = self._host_limits.get(host)
+        if limit is None:
+            limit = asyncio.Semaphore(self.per_host_concurrency)
+            self._host_limits[host] = limit
+        return limit
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """Send a request through the shared pool, waiting for a per-host slot"""
+        client = self._get_client()
+        host = urlsplit(url).hostname or ''
+        async with self._host_limit(host):
+            return await client.request(method, url, **kwargs)
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request('GET', url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request('POST', url, **kwargs)
+
+    async def aclose(self):
+        """Close pooled connections (call on shutdown)"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            self._loop = None
+            self._host_limits = {}
+
+
+_sync_client: Optional[httpx.Client] = None
+_sync_lock = threading.Lock()
+http_cache_transport = None
+
+
+def get_sync_client() -> httpx.Client:
+    """Process-wide synchronous client (httpx.Client is safe to share across threads)"""
+    global _sync_client, http_cache_transport
+    if _sync_client is None:
+        with _sync_lock:
+            if _sync_client is None:
+                # Cache in front of the guards: a cache hit never counts against a host
+                transport = ResilientTransport(wrap_transport(httpx.HTTPTransport(limits=build_limits(), http2=HTTP2_AVAILABLE)))
+                if HTTP_CACHE_ENABLED:
+                    from http_cache import CachingTransport
+                    transport = http_cache_transport = CachingTransport(transport)
+                _sync_client = httpx.Client(
+                    transport=transport,
+                    timeout=build_timeout(),
+                    follow_redirects=True,
+                )
+    return _sync_client
+
+
+def close_sync_client():
+    global _sync_client
+    with _sync_lock:
+        if _sync_client is not None:
+            _sync_client.close()
+            _sync_client = None
+
+
+def telegram_request(connection_pool_size: int = 8, http2: bool = True):
+    """
+    HTTPXRequest for python-telegram-bot with our timeouts.
+    PTB owns its httpx client, so this shares configuration rather than sockets.
+    Self-hosted Bot API servers only speak HTTP/1.1; pass http2=False for them.
+    """
+    from telegram.request import HTTPXRequest
+    return HTTPXRequest(
+        connection_pool_size=connection_pool_size,
+        connect_timeout=CONNECT_TIMEOUT,
+        read_timeout=READ_TIMEOUT,
+        write_timeout=READ_TIMEOUT,
+        http_version='2' if http2 and HTTP2_AVAILABLE else '1.1',
+    )
+
+
+# Global instances
+http_pool = HttpPool()
+ua_pool = UserAgentPool()
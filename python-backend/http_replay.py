@@ -0,0 +1,225 @@
+"""
+Record/replay support for the shared HTTP clients.
+
+Two env switches, read when the pooled clients are built (http_client.py):
+- HTTP_RECORD_ARCHIVE=path: every response from a live upstream is captured
+  into a fixture archive (gzip'd JSON lines, bodies base64, keyed by method+URL)
+- HTTP_REPLAY_URL=http://127.0.0.1:8765: every request is routed to a local
+  replay server (replay_server.py) instead of the internet. The original URL
+  travels in the X-Replay-Url header, so host guards, caches and logs still
+  see the real upstream host.
+
+Nothing here is active unless one of the variables is set.
+"""
+
+import os
+import gzip
+import json
+import atexit
+import base64
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+RECORD_ARCHIVE = os.environ.get('HTTP_RECORD_ARCHIVE')
+REPLAY_URL = os.environ.get('HTTP_REPLAY_URL')
+REPLAY_URL_HEADER = 'X-Replay-Url'
+
+# Stored bodies are already decoded, so these no longer describe them
+DROP_HEADERS = {'content-encoding', 'content-length', 'transfer-encoding', 'connection', 'set-cookie'}
+
+
+def fixture_key(method: str, url: str) -> str:
+    return f"{method.upper()} {url}"
+
+
+def loose_key(method: str, url: str) -> str:
+    """Same request ignoring the query string (for feeds whose query varies)"""
+    return fixture_key(method, url.split('?', 1)[0])
+
+
+class FixtureArchive:
+    """method+URL -> (status, headers, body), persisted as gzip'd JSON lines"""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = Path(path) if path else None
+        self._entries: Dict[str, Tuple[int, Dict[str, str], bytes]] = {}
+        self._loose: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+        if self.path and self.path.exists():
+            self.load()
+
+    def load(self):
+        with gzip.open(self.path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                self._put(record['method'], record['url'],
+                          (record['status'], record['headers'], base64.b64decode(record['body'])))
+        logger.info(f"Loaded {len(self._entries)} fixtures from {self.path}")
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix('.tmp')
+            with gzip.open(tmp, 'wt', encoding='utf-8') as f:
+                for key, (status, headers, body) in self._entries.items():
+                    method, _, url = key.partition(' ')
+                    f.write(json.dumps({
+                        'method': method, 'url': url, 'status': status, 'headers': headers,
+                        'body': base64.b64encode(body).decode('ascii'),
+                    }) + '\n')
+            tmp.replace(self.path)
+            self._dirty = False
+
+    def add(self, method: str, url: str, status: int, headers: Dict[str, str], body: bytes):
+        headers = {k.lower(): v for k, v in headers.items() if k.lower() not in DROP_HEADERS}
+        with self._lock:
+            self._put(method, url, (status, headers, body))
+            self._dirty = True
+
+    def _put(self, method: str, url: str, fixture: Tuple[int, Dict[str, str], bytes]):
+        key = fixture_key(method, url)
+        self._entries[key] = fixture
+        self._loose.setdefault(loose_key(method, url), key)
+
+    def get(self, method: str, url: str, loose: bool = False) -> Optional[Tuple[int, Dict[str, str], bytes]]:
+        """Exact match, or with loose=True the first fixture recorded for the same path"""
+        fixture = self._entries.get(fixture_key(method, url))
+        if fixture is None and loose:
+            key = self._loose.get(loose_key(method, url))
+            fixture = self._entries.get(key) if key else None
+        return fixture
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._entries))
+
+    @property
+    def dirty(self) -> bool:
+        return self._dirty
+
+
+class RecordingTransport(httpx.BaseTransport):
+    """Passes requests through and copies every response into the archive"""
+
+    def __init__(self, transport: httpx.BaseTransport, archive: FixtureArchive):
+        self.transport = transport
+        self.archive = archive
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        response = self.transport.handle_request(request)
+        body = response.read()
+        self.archive.add(request.method, str(request.url), response.status_code, dict(response.headers), body)
+        return httpx.Response(response.status_code, headers=_replayable(response.headers),
+                              content=body, request=request, extensions=response.extensions)
+
+    def close(self):
+        self.transport.close()
+        self.archive.save()
+
+
+class AsyncRecordingTransport(httpx.AsyncBaseTransport):
+    def __init__(self, transport: httpx.AsyncBaseTransport, archive: FixtureArchive):
+        self.transport = transport
+        self.archive = archive
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        response = await self.transport.handle_async_request(request)
+        body = await response.aread()
+        self.archive.add(request.method, str(request.url), response.status_code, dict(response.headers), body)
+        return httpx.Response(response.status_code, headers=_replayable(response.headers),
+                              content=body, request=request, extensions=response.extensions)
+
+    async def aclose(self):
+        await self.transport.aclose()
+        self.archive.save()
+
+
+def _replayable(headers: httpx.Headers):
+    # The body handed back is decoded; don't let the client decode it twice
+    return [(k, v) for k, v in headers.multi_items() if k.lower() not in ('content-encoding', 'content-length')]
+
+
+def _route_to_replay(request: httpx.Request, replay_url: httpx.URL) -> httpx.URL:
+    """Point the request at the replay server; returns its original URL"""
+    original = request.url
+    request.headers[REPLAY_URL_HEADER] = str(original)
+    request.url = replay_url
+    return original
+
+
+class ReplayRoutingTransport(httpx.BaseTransport):
+    """Sends every request to the replay server instead of its real host"""
+
+    def __init__(self, transport: httpx.BaseTransport, replay_url: str):
+        self.transport = transport
+        self.replay_url = httpx.URL(replay_url).join('/replay')
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        original = _route_to_replay(request, self.replay_url)
+        try:
+            return self.transport.handle_request(request)
+        finally:
+            # Relative redirects and response.url resolve against the real upstream
+            request.url = original
+
+    def close(self):
+        self.transport.close()
+
+
+class AsyncReplayRoutingTransport(httpx.AsyncBaseTransport):
+    def __init__(self, transport: httpx.AsyncBaseTransport, replay_url: str):
+        self.transport = transport
+        self.replay_url = httpx.URL(replay_url).join('/replay')
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        original = _route_to_replay(request, self.replay_url)
+        try:
+            return await self.transport.handle_async_request(request)
+        finally:
+            request.url = original
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+
+_record_archive: Optional[FixtureArchive] = None
+
+
+def record_archive() -> Optional[FixtureArchive]:
+    """Archive shared by every recording transport in this process"""
+    global _record_archive
+    if RECORD_ARCHIVE and _record_archive is None:
+        _record_archive = FixtureArchive(RECORD_ARCHIVE)
+        # Scripts rarely close their clients; don't lose the recording
+        atexit.register(lambda: _record_archive.dirty and _record_archive.save())
+    return _record_archive
+
+
+def wrap_transport(transport: httpx.BaseTransport) -> httpx.BaseTransport:
+    """Innermost layer for the sync client: replay routing or recording, if enabled"""
+    if REPLAY_URL:
+        return ReplayRoutingTransport(transport, REPLAY_URL)
+    if RECORD_ARCHIVE:
+        return RecordingTransport(transport, record_archive())
+    return transport
+
+
+def wrap_async_transport(transport: httpx.AsyncBaseTransport) -> httpx.AsyncBaseTransport:
+    if REPLAY_URL:
+        return AsyncReplayRoutingTransport(transport, REPLAY_URL)
+    if RECORD_ARCHIVE:
+        return AsyncRecordingTransport(transport, record_archive())
+    return transport
@@ -8,6 +8,147 @@ DATABASE_URL = os.environ.get("DATABASE_URL")
 if not DATABASE_URL:
     raise ValueError("DATABASE_URL environment variable is not set")
 
+def migrate_notifications(conn):
+    """
+    Schema for notification dedupe and archival.
+    "Notification" itself is owned by Prisma; these statements mirror
+    schema.prisma so databases that were pushed before the dedupe key existed
+    get upgraded without a `prisma db push`. Before Prisma has created the
+    table there is nothing to upgrade; only the archive is created then.
+    """
+    if conn.execute(text("""SELECT to_regclass('"Notification"')""")).scalar() is None:
+        print('Table "Notification" does not exist yet (Prisma creates it); skipping its upgrade.')
+    else:
+        conn.execute(text("""
+            ALTER TABLE "Notification" ADD COLUMN IF NOT EXISTS "dedupeKey" TEXT;
+        """))
+        # Same index names Prisma generates, so a later db push sees them as in sync
+        conn.execute(text("""
+            CREATE UNIQUE INDEX IF NOT EXISTS "Notification_dedupeKey_key"
+            ON "Notification" ("dedupeKey");
+        """))
+        conn.execute(text("""
+            CREATE INDEX IF NOT EXISTS "Notification_createdAt_idx"
+            ON "Notification" ("createdAt");
+        """))
+
+    # Cold storage for notifications moved out by notification_retention.py
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS "NotificationArchive" (
+            id TEXT PRIMARY KEY,
+            "userEmail" TEXT NOT NULL,
+            "alertId" TEXT,
+            type TEXT NOT NULL,
+            title TEXT NOT NULL,
+            message TEXT NOT NULL,
+            "productTitle" TEXT,
+            "oldPrice" DOUBLE PRECISION,
+            "newPrice" DOUBLE PRECISION,
+            "productImage" TEXT,
+            "productLink" TEXT,
+            "isRead" BOOLEAN NOT NULL DEFAULT false,
+            "dedupeKey" TEXT,
+            "createdAt" TIMESTAMP(3) NOT NULL,
+            "archivedAt" TIMESTAMP(3) NOT NULL DEFAULT NOW()
+        );
+    """))
+    conn.execute(text("""
+        CREATE INDEX IF NOT EXISTS "NotificationArchive_userEmail_idx"
+        ON "NotificationArchive" ("userEmail");
+    """))
+
+def migrate_product_index(conn):
+    """Tables behind product_index.py: canonical products and their identifiers"""
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS product_identities (
+            id SERIAL PRIMARY KEY,
+            created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+            updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+            canonical_title TEXT NOT NULL,
+            product_url TEXT,
+            source TEXT,
+            latest_price NUMERIC,
+            price_seen_at TIMESTAMP WITH TIME ZONE
+        );
+    """))
+    # identifier is 'kind:value' - url:..., asin:..., fkpid:..., model:...
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS product_identifiers (
+            identifier TEXT PRIMARY KEY,
+            product_id INTEGER NOT NULL REFERENCES product_identities(id) ON DELETE CASCADE
+        );
+    """))
+    conn.execute(text("""
+        CREATE INDEX IF NOT EXISTS product_identifiers_product_id_idx
+        ON product_identifiers (product_id);
+    """))
+
+def migrate_news_ingest(conn):
+    """Tables behind news_ingest.py: scored headlines and the per-category sentiment series"""
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS news_headlines (
+            category TEXT NOT NULL,
+            headline_key TEXT NOT NULL,
+            title TEXT NOT NULL,
+            link TEXT,
+            published_at TIMESTAMP WITH TIME ZONE NOT NULL,
+            fetched_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+            score SMALLINT NOT NULL,
+            PRIMARY KEY (category, headline_key)
+        );
+    """))
+    conn.execute(text("""
+        CREATE INDEX IF NOT EXISTS news_headlines_published_idx
+        ON news_headlines (category, published_at DESC);
+    """))
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS news_sentiment_series (
+            category TEXT NOT NULL,
+            observed_at TIMESTAMP WITH TIME ZONE NOT NULL,
+            score REAL NOT NULL,
+            headline_count INTEGER NOT NULL,
+            PRIMARY KEY (category, observed_at)
+        );
+    """))
+
+def migrate_telegram_outbox(conn):
+    """Tables behind telegram_integration/dispatcher.py: user chats and the notification outbox"""
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS telegram_links (
+            user_email TEXT PRIMARY KEY,
+            chat_id TEXT NOT NULL,
+            linked_at TIMESTAMP DEFAULT NOW()
+        );
+    """))
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS telegram_outbox (
+            id BIGSERIAL PRIMARY KEY,
+            notification_id TEXT NOT NULL UNIQUE,
+            user_email TEXT NOT NULL,
+            chat_id TEXT NOT NULL,
+            body TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at TIMESTAMP NOT NULL,
+            claimed_at TIMESTAMP,
+            sent_at TIMESTAMP,
+            last_error TEXT,
+            created_at TIMESTAMP NOT NULL
+        );
+    """))
+    # Only rows still to send are scanned by the dispatcher
+    conn.execute(text("""
+        CREATE INDEX IF NOT EXISTS telegram_outbox_due_idx
+        ON telegram_outbox (next_attempt_at, id) WHERE status = 'pending';
+    """))
+
+MIGRATIONS = [
+    (migrate_notifications, "Notification dedupe index and archive table are ready."),
+    (migrate_product_index, "Product identity index tables are ready."),
+    (migrate_news_ingest, "News ingestion tables are ready."),
+    (migrate_telegram_outbox, "Telegram outbox tables are ready."),
+]
+
 def init_db():
     print("Connecting to Neon Database...")
     try:
@@ -40,6 +181,16 @@ def init_db():
             """))
             conn.commit()
             print("Tables 'products' and 'price_history' are ready.")
+
+            # One failed migration must not keep the others from running
+            for migrate, ready in MIGRATIONS:
+                try:
+                    migrate(conn)
+                    conn.commit()
+                    print(ready)
+                except Exception as e:
+                    conn.rollback()
+                    print(f"Error in {migrate.__name__}: {e}")
             
     except Exception as e:
         print(f"Error initializing DB: {e}")
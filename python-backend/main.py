@@ -1,11 +1,23 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Request, Response, Header
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
-from model import PricePredictor
+from model import PricePredictor, STAGE_SECONDS
 import uvicorn
 from fastapi.middleware.cors import CORSMiddleware
 import os
+import json
 import asyncio
-from telegram_integration import telegram_integration, init_telegram_integration, get_price_analysis_sync, set_price_alert_sync
+from telegram_integration import telegram_integration, init_telegram_integration
+from product_index import product_index, lookup_or_scrape
+from news_ingest import run_news_ingestion, news_store
+from telegram_integration.dispatcher import notification_dispatcher, run_notification_dispatcher
+from telegram_integration.webhook import telegram_webhooks, SECRET_HEADER
+from http_client import http_pool, ua_pool, close_sync_client
+from charts import product_chart
+from serving import jobs_lock, run_singleton_jobs
+from metrics import metrics_store, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from profiling import ProfilingMiddleware, request_profiler
 
 app = FastAPI()
 
@@ -16,9 +28,21 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Opt-in: X-Profile header or PROFILE_SLOW_SECONDS, otherwise a pass-through
+app.add_middleware(ProfilingMiddleware)
 
 predictor = PricePredictor()
 
+# The event loop only keeps weak references to tasks; hold these until they finish
+background_jobs = set()
+
+
+def spawn(coroutine) -> asyncio.Task:
+    task = asyncio.create_task(coroutine)
+    background_jobs.add(task)
+    task.add_done_callback(background_jobs.discard)
+    return task
+
 class PriceRequest(BaseModel):
     product_name: str
     current_price: float
@@ -36,105 +60,123 @@ class ScrapePriceRequest(BaseModel):
 @app.on_event("startup")
 async def startup_event():
     """Initialize services on startup"""
+    # Per process (each gunicorn worker); /metrics adds up every process's snapshot
+    metrics_store.start()
+    # Load the User-Agent dataset once, off the request path
+    await asyncio.to_thread(ua_pool.preload)
+    # Product identities load in the background; lookups before it finishes just scrape.
+    # Under gunicorn the master has already loaded them (serving.preload_shared_state)
+    if not product_index.loaded:
+        spawn(asyncio.to_thread(product_index.load))
+
     try:
         await init_telegram_integration()
         print("✅ Telegram integration initialized")
     except Exception as e:
         print(f"⚠️  Telegram integration failed: {e}")
 
+    def start_jobs():
+        # Category news is fetched on an interval so predict never waits on a feed
+        spawn(run_news_ingestion())
+        # Price-drop notifications queued by the alert checker go out through the bot pool
+        spawn(run_notification_dispatcher())
+
+    # With several workers only one runs these; the rest pick up its news from the DB
+    spawn(run_singleton_jobs(start_jobs, lambda: asyncio.to_thread(news_store.load)))
+
+    # Webhook mode: bot handlers run here, on this loop, with the in-process predictor
+    if telegram_webhooks.enabled:
+        await telegram_webhooks.start(predictor, register=jobs_lock.acquire())
+        print(f"✅ Telegram webhooks ready for {len(telegram_webhooks.bots)} bots")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Close pooled HTTP connections"""
+    await telegram_webhooks.stop()
+    await telegram_integration.shutdown()
+    await http_pool.aclose()
+    close_sync_client()
+
 @app.get("/")
 def home():
-    return {"status": "ML Backend Live", "telegram_bots": len(telegram_integration.active_bots)}
+    return {"status": "ML Backend Live", "telegram_bots": len(telegram_integration.active_bots),
+            "predictions": predictor.stats()}
 
 @app.post("/predict")
-def predict_price(request: PriceRequest):
+async def predict_price(request: PriceRequest, background_tasks: BackgroundTasks):
     try:
-        # Use Telegram integration for price analysis
-        print(f"🔍 Requesting price analysis via Telegram for: {request.product_name}")
-
-        result = get_price_analysis_sync(
-            request.product_url,
-            request.product_name,
-            request.current_price
-        )
-
-        if result:
-            result['product_name'] = request.product_name
-            print("✅ Analysis completed via Telegram integration")
-            return result
-        else:
-            print("❌ Telegram analysis failed, falling back to direct model")
-            # Fallback to direct model
-            result = predictor.predict(request.current_price, request.product_url, request.product_name)
-            result['product_name'] = request.product_name
-            return result
+        print(f"🔍 Running price analysis for: {request.product_name}")
+
+        # In-process and on this event loop; blocking model stages run on threads
+        result = await predictor.predict_async(request.current_price, request.product_url, request.product_name)
+        result['product_name'] = request.product_name
+
+        # Telegram is told after the response has gone out, never on its path
+        background_tasks.add_task(telegram_integration.notify_analysis,
+                                  request.product_url, request.product_name, result)
+        print("✅ Analysis completed")
+        with STAGE_SECONDS.time(stage="serialize"):
+            return JSONResponse(jsonable_encoder(result))
 
     except Exception as e:
         print(f"❌ Prediction Error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/set_alert")
-def set_alert(request: AlertRequest):
-    try:
-        print(f"🔔 Setting price alert via Telegram for: {request.product_url}")
+@app.post("/predict/stream")
+async def predict_price_stream(request: PriceRequest, background_tasks: BackgroundTasks):
+    """
+    /predict as newline-delimited JSON events, so the page can show something
+    while Prophet fits: {"event": "estimate"} (current price and a trend from
+    recent history) within one DB read, {"event": "news"} when the sentiment is
+    in, then {"event": "forecast"} with exactly what /predict returns.
+    """
+    print(f"🔍 Streaming price analysis for: {request.product_name}")
+
+    async def events():
+        async for event, payload in predictor.predict_stream(request.current_price, request.product_url,
+                                                             request.product_name):
+            if event == "forecast":
+                payload['product_name'] = request.product_name
+                # Runs once the stream has been sent, as for /predict
+                background_tasks.add_task(telegram_integration.notify_analysis,
+                                          request.product_url, request.product_name, payload)
+            yield json.dumps({"event": event, **jsonable_encoder(payload)}) + "\n"
 
-        success = set_price_alert_sync(
-            request.product_url,
-            request.target_price,
-            request.user_id
-        )
+    # No proxy buffering, or the first line waits for the last
+    return StreamingResponse(events(), media_type="application/x-ndjson",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
-        if success:
-            print("✅ Alert set via Telegram integration")
-            return {"success": True, "message": "Alert set successfully"}
-        else:
-            print("❌ Telegram alert failed")
-            return {"success": False, "message": "Failed to set alert"}
+@app.post("/set_alert")
+async def set_alert(request: AlertRequest, background_tasks: BackgroundTasks):
+    try:
+        # Alerts themselves are stored by the web app (Prisma); this only notifies
+        print(f"🔔 Setting price alert for: {request.product_url}")
+        background_tasks.add_task(telegram_integration.notify_alert,
+                                  request.product_url, request.target_price, request.user_id)
+        return {"success": True, "message": "Alert set successfully"}
 
     except Exception as e:
         print(f"❌ Alert Error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/scrape_price")
-def scrape_price(request: ScrapePriceRequest):
+async def scrape_price(request: ScrapePriceRequest):
     """Scrape current price for a product (used by alert checker)"""
     try:
-        from lib.scraper import scrapeProductsReal
-
         print(f"🔍 Scraping price for: {request.product_title}")
 
-        # Scrape products with the title
-        products = scrapeProductsReal(request.product_title, 1)  # Get first page only
-
-        if products and len(products) > 0:
-            # Find the best matching product
-            best_match = None
-            best_score = 0
-
-            for product in products:
-                # Simple title matching score
-                title_lower = product.title.lower()
-                query_lower = request.product_title.lower()
-
-                # Exact match gets highest score
-                if query_lower in title_lower:
-                    score = len(query_lower) / len(title_lower)
-                    if score > best_score:
-                        best_score = score
-                        best_match = product
-
-            if best_match:
-                # Extract price
-                price_str = best_match.price
-                price_num = float(price_str.replace('₹', '').replace(',', '').strip())
-
-                print(f"✅ Found price: ₹{price_num} for {best_match.title}")
-                return {
-                    "success": True,
-                    "price": price_num,
-                    "product_title": best_match.title,
-                    "store": best_match.storeName
-                }
+        # Recently priced products are answered from the identity index
+        best_match, from_index = await lookup_or_scrape(request.product_title, request.product_url)
+
+        if best_match:
+            print(f"✅ Found price: ₹{best_match.price} for {best_match.title}{' (index)' if from_index else ''}")
+            return {
+                "success": True,
+                "price": best_match.price,
+                "product_title": best_match.title,
+                "store": best_match.source,
+                "cached": from_index
+            }
 
         print("❌ No matching product found")
         return {"success": False, "message": "Product not found"}
@@ -143,12 +185,72 @@ def scrape_price(request: ScrapePriceRequest):
         print(f"❌ Scrape price error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/chart")
+async def price_chart(request: Request, product_url: str, product_name: str = "", size: str = "small",
+                      forecast: bool = True):
+    """PNG price history (and forecast) chart; the same cached image the bot sends"""
+    try:
+        chart = await product_chart(predictor, product_url, product_name, size, forecast)
+    except Exception as e:
+        print(f"❌ Chart Error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    if chart is None:
+        raise HTTPException(status_code=404, detail="Not enough price history")
+
+    png, etag = chart
+    headers = {"ETag": f'"{etag}"', "Cache-Control": "public, max-age=300"}
+    if request.headers.get("if-none-match", "").strip('"') == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=png, media_type="image/png", headers=headers)
+
+@app.post("/telegram/webhook/{bot_id}")
+async def telegram_webhook(bot_id: int, request: Request):
+    """Updates pushed by Telegram for TELEGRAM_BOT_TOKEN_<bot_id>"""
+    status = await telegram_webhooks.handle(bot_id, request.headers.get(SECRET_HEADER), await request.body())
+    return Response(status_code=status)
+
+@app.get("/metrics")
+def metrics():
+    """Prometheus metrics for every API worker and the alert checker"""
+    return Response(content=metrics_store.render(), media_type=METRICS_CONTENT_TYPE)
+
+def require_admin(token):
+    if not request_profiler.token:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not request_profiler.authorized(token):
+        raise HTTPException(status_code=403, detail="Forbidden")
+
+@app.get("/admin/profiles")
+def list_profiles(x_admin_token: str = Header(None)):
+    """Saved request profiles, newest first"""
+    require_admin(x_admin_token)
+    return {"profiles": request_profiler.list(), "profiler": request_profiler.stats()}
+
+@app.get("/admin/profiles/{name}")
+def get_profile(name: str, x_admin_token: str = Header(None)):
+    """One profile as folded stacks, for flamegraph.pl or speedscope"""
+    require_admin(x_admin_token)
+    folded = request_profiler.read(name)
+    if folded is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return Response(content=folded, media_type="text/plain")
+
+@app.post("/admin/profiles")
+async def capture_profile(seconds: float = 10.0, x_admin_token: str = Header(None)):
+    """Profile this worker for a few seconds, background jobs included"""
+    require_admin(x_admin_token)
+    name = await request_profiler.capture("capture", max(0.1, min(seconds, 120.0)))
+    return {"name": name}
+
 @app.get("/telegram_status")
 def telegram_status():
     """Check Telegram bot status"""
     return {
         "bots_configured": len(telegram_integration.bot_tokens),
         "bots_active": len(telegram_integration.active_bots),
+        "pool": telegram_integration.pool.stats(),
+        "dispatcher": notification_dispatcher.stats(),
+        "webhooks": telegram_webhooks.stats(),
         "backend_url": telegram_integration.backend_url
     }
 
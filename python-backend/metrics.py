@@ -0,0 +1,314 @@
+"""
+Prometheus metrics for the API and the alert checker, without a client library.
+
+Counters and histograms live in the process that records them; recording is a
+dict update under a lock, cheap enough for every stage of every request.
+GET /metrics renders them in the Prometheus text format (0.0.4).
+
+Several processes report into one scrape: each writes a snapshot of its
+metrics to METRICS_DIR every METRICS_FLUSH_INTERVAL seconds and at exit, and
+/metrics adds up the snapshots of every process on the host - the gunicorn
+workers, and the daily alert checker run. Counters and histograms of
+processes that have exited are folded into an archive file, so totals never
+go backwards when a worker is recycled. Gauges only count while their process
+is alive. An empty METRICS_DIR keeps everything in-process.
+
+Cache hit rates are derived in Prometheus from cache_lookups_total, e.g.
+    sum by (cache) (rate(cache_lookups_total{result=~"hit|stale"}[5m]))
+      / sum by (cache) (rate(cache_lookups_total[5m]))
+"""
+
+import os
+import json
+import time
+import fcntl
+import atexit
+import bisect
+import logging
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+METRICS_DIR = os.environ.get('METRICS_DIR', str(Path(__file__).parent / '.cache' / 'metrics'))
+FLUSH_INTERVAL = float(os.environ.get('METRICS_FLUSH_INTERVAL', '10'))
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class Metric:
+    kind = ''
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), registry: Optional['Registry'] = None):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], object] = {}
+        (registry or REGISTRY).register(self)
+
+    def _key(self, labels: Dict) -> Tuple[str, ...]:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def describe(self) -> Dict:
+        return {'kind': self.kind, 'help': self.help, 'labelnames': list(self.labelnames)}
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            values = [[list(key), value if not isinstance(value, list) else list(value)]
+                      for key, value in self._values.items()]
+        return {**self.describe(), 'values': values}
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS, registry: Optional['Registry'] = None):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, help, labelnames, registry)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Per-bucket counts (the last one is +Inf), then the sum
+                state = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            state[index] += 1
+            state[-1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def describe(self) -> Dict:
+        return {**super().describe(), 'buckets': list(self.buckets)}
+
+
+# (name, kind, help, labels, value) from a collector, evaluated at snapshot time
+Sample = Tuple[str, str, str, Dict[str, str], float]
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._collectors: List[Callable[[], Iterable[Sample]]] = []
+
+    def register(self, metric: Metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+
+    def add_collector(self, collect: Callable[[], Iterable[Sample]]):
+        """Counters or gauges read from existing stats when a snapshot is taken"""
+        self._collectors.append(collect)
+
+    def snapshot(self) -> Dict[str, Dict]:
+        families = {name: metric.snapshot() for name, metric in self._metrics.items()}
+        for collect in self._collectors:
+            try:
+                samples = list(collect())
+            except Exception as e:
+                logger.warning(f"[Metrics] Collector failed: {e}")
+                continue
+            for name, kind, help, labels, value in samples:
+                family = families.setdefault(name, {'kind': kind, 'help': help,
+                                                    'labelnames': sorted(labels), 'values': []})
+                family['values'].append([[str(labels[n]) for n in family['labelnames']], float(value)])
+        return families
+
+
+def merge(into: Dict[str, Dict], snapshot: Dict[str, Dict], gauges: bool = True):
+    """Add one snapshot's values to another's"""
+    for name, family in snapshot.items():
+        if family['kind'] == 'gauge' and not gauges:
+            continue
+        target = into.get(name)
+        if target is None:
+            target = into[name] = {**family, 'values': []}
+        elif target.get('buckets') != family.get('buckets') or target['labelnames'] != family['labelnames']:
+            logger.warning(f"[Metrics] {name} changed shape between processes; skipping a snapshot of it")
+            continue
+        index = {tuple(key): i for i, (key, _) in enumerate(target['values'])}
+        for key, value in family['values']:
+            i = index.get(tuple(key))
+            if i is None:
+                index[tuple(key)] = len(target['values'])
+                target['values'].append([key, list(value) if isinstance(value, list) else value])
+            elif isinstance(value, list):
+                target['values'][i][1] = [a + b for a, b in zip(target['values'][i][1], value)]
+            else:
+                target['values'][i][1] += value
+    return into
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value: float) -> str:
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+def render(families: Dict[str, Dict]) -> str:
+    lines = []
+    for name in sorted(families):
+        family = families[name]
+        lines.append(f"# HELP {name} {family['help']}")
+        lines.append(f"# TYPE {name} {family['kind']}")
+        names = family['labelnames']
+        for key, value in sorted(family['values'], key=lambda v: v[0]):
+            if family['kind'] != 'histogram':
+                lines.append(f"{name}{_labels(names, key)} {_number(value)}")
+                continue
+            cumulative = 0
+            for bound, count in zip(family['buckets'] + ['+Inf'], value[:-1]):
+                cumulative += count
+                le = 'le="+Inf"' if bound == '+Inf' else f'le="{_number(bound)}"'
+                lines.append(f"{name}_bucket{_labels(names, key, le)} {cumulative}")
+            lines.append(f"{name}_sum{_labels(names, key)} {_number(value[-1])}")
+            lines.append(f"{name}_count{_labels(names, key)} {cumulative}")
+    return '\n'.join(lines) + '\n'
+
+
+class MetricsStore:
+    """Per-process snapshot files in one directory, added up at scrape time"""
+
+    def __init__(self, registry: 'Registry', directory: Optional[str] = METRICS_DIR):
+        self.registry = registry
+        self.directory = Path(directory) if directory else None
+        self._flusher: Optional[threading.Thread] = None
+
+    def _path(self, pid: int) -> Path:
+        return self.directory / f"{pid}.json"
+
+    def flush(self):
+        """Write this process's snapshot; atomic, so readers never see half a file"""
+        if self.directory is None:
+            return
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            path = self._path(os.getpid())
+            tmp = path.with_suffix('.tmp')
+            tmp.write_text(json.dumps(self.registry.snapshot()))
+            os.replace(tmp, path)
+        except OSError as e:
+            logger.warning(f"[Metrics] Flush failed: {e}")
+
+    def start(self, interval: float = FLUSH_INTERVAL):
+        """Flush periodically and at exit; call in the process that records (not a pre-fork master)"""
+        if self.directory is None or self._flusher is not None:
+            return
+
+        def run():
+            while True:
+                time.sleep(interval)
+                self.flush()
+
+        self._flusher = threading.Thread(target=run, name='metrics-flush', daemon=True)
+        self._flusher.start()
+        atexit.register(self.flush)
+
+    @staticmethod
+    def _alive(pid: int) -> bool:
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            pass
+        return True
+
+    def _read(self, path: Path) -> Optional[Dict]:
+        try:
+            return json.loads(path.read_text())
+        except (OSError, ValueError):
+            return None
+
+    def _archive(self, dead: List[Path]) -> Dict:
+        """Fold exited processes' counters into archive.json; returns the archive"""
+        archive_path = self.directory / 'archive.json'
+        with open(self.directory / 'archive.lock', 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            archive = self._read(archive_path) or {}
+            folded = False
+            for path in dead:
+                snapshot = self._read(path) if path.exists() else None
+                if snapshot is not None:
+                    merge(archive, snapshot, gauges=False)
+                    folded = True
+                path.unlink(missing_ok=True)
+            if folded:
+                tmp = archive_path.with_suffix('.tmp')
+                tmp.write_text(json.dumps(archive))
+                os.replace(tmp, archive_path)
+        return archive
+
+    def collect(self) -> Dict[str, Dict]:
+        """This process's live metrics plus every other process's latest snapshot"""
+        families = self.registry.snapshot()
+        if self.directory is None or not self.directory.exists():
+            return families
+        others, dead = [], []
+        for path in self.directory.glob('*.json'):
+            if not path.stem.isdigit() or int(path.stem) == os.getpid():
+                continue
+            (others if self._alive(int(path.stem)) else dead).append(path)
+        merge(families, self._archive(dead) if dead else (self._read(self.directory / 'archive.json') or {}))
+        for path in others:
+            snapshot = self._read(path)
+            if snapshot is not None:
+                merge(families, snapshot)
+        return families
+
+    def render(self) -> str:
+        return render(self.collect())
+
+
+def register_cache(name: str, cache):
+    """Expose a cache's stats() counters (hits, stale_hits, misses, coalesced) as cache_lookups_total"""
+    results = {'hits': 'hit', 'stale_hits': 'stale', 'misses': 'miss'}
+    help = 'Cache lookups by result'
+
+    def collect():
+        stats = cache.stats()
+        for field, result in results.items():
+            if field in stats:
+                yield 'cache_lookups_total', 'counter', help, {'cache': name, 'result': result}, stats[field]
+        if 'coalesced' in stats:
+            yield ('cache_coalesced_total', 'counter', 'Misses that waited on an in-flight fetch',
+                   {'cache': name}, stats['coalesced'])
+        if 'entries' in stats:
+            yield 'cache_entries', 'gauge', 'Entries held in memory', {'cache': name}, stats['entries']
+
+    REGISTRY.add_collector(collect)
+
+
+# Global instances
+REGISTRY = Registry()
+metrics_store = MetricsStore(REGISTRY)
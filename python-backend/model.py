@@ -3,10 +3,17 @@ import numpy as np
 from prophet import Prophet
 from datetime import datetime, timedelta
 import random
+import time
 from sqlalchemy import create_engine, text
 import os
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 from pathlib import Path
+from resilience import deadline
+from scraping.cache import ScrapeCache, CACHE_DIR, normalize_key
+from metrics import Counter, Histogram, register_cache
 
 # Load environment variables from .env file in parent directory
 env_path = Path(__file__).parent.parent / ".env"
@@ -19,9 +26,66 @@ if not DATABASE_URL:
     raise ValueError("DATABASE_URL environment variable is not set")
 engine = create_engine(DATABASE_URL)
 
+# Seconds predict() may spend on upstream calls in total, and per source
+UPSTREAM_BUDGET = float(os.environ.get("PREDICT_UPSTREAM_BUDGET", "12"))
+HISTORY_BUDGET = float(os.environ.get("PREDICT_HISTORY_BUDGET", "8"))
+NEWS_BUDGET = float(os.environ.get("PREDICT_NEWS_BUDGET", "4"))
+
+# Fit the ingested category sentiment series as a Prophet regressor (instead of
+# the flat news drift) once it covers this many days of a product's history
+NEWS_REGRESSOR = os.environ.get("PREDICT_NEWS_REGRESSOR", "0") == "1"
+NEWS_REGRESSOR_MIN_DAYS = int(os.environ.get("PREDICT_NEWS_REGRESSOR_MIN_DAYS", "14"))
+
+# Blocking predict stages (DB read, scrapes, Prophet fit) run here. A private
+# pool, so a speculative scrape that is no longer needed never holds up
+# asyncio.run() at shutdown the way the default executor would.
+STAGE_WORKERS = int(os.environ.get("PREDICT_STAGE_WORKERS", "16"))
+_stage_pool = ThreadPoolExecutor(max_workers=STAGE_WORKERS, thread_name_prefix="predict-stage")
+
+# Fitted forecasts per (product, name, horizon). With SCRAPE_CACHE_DIR set the
+# disk tier is shared, so under gunicorn one worker's fit serves all of them
+FORECAST_FRESH_SECONDS = float(os.environ.get("PREDICT_FORECAST_TTL", str(30 * 60)))
+FORECAST_STALE_SECONDS = float(os.environ.get("PREDICT_FORECAST_STALE", str(2 * 60 * 60)))
+forecast_cache = ScrapeCache(max_entries=128, disk_dir=CACHE_DIR,
+                             ttls={'forecast': (FORECAST_FRESH_SECONDS, FORECAST_STALE_SECONDS)})
+register_cache('forecast', forecast_cache)
+
+STAGE_SECONDS = Histogram('predict_stage_seconds', 'Time spent in each stage of a prediction', ['stage'],
+                          buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30))
+PREDICTIONS = Counter('predictions_total', 'Predictions by where their history came from', ['data_source'])
+# data_source values as metric labels
+SOURCE_LABELS = {"Database": "db", "External Scraper (Live)": "external",
+                 "Insufficient History": "insufficient", "Error": "error"}
+
+# Days of stored history behind the quick estimate that predict_stream() sends first
+ESTIMATE_DAYS = int(os.environ.get("PREDICT_ESTIMATE_DAYS", "14"))
+
+def forecast_target(product_url, product_name, days_ahead):
+    """forecast_cache target for one forecast"""
+    return f"{days_ahead}|{product_name or ''}|{product_url or ''}"
+
+def classify_trend(projected_price, current_price):
+    """(trend, recommendation) for a price expected at the end of the horizon"""
+    trend = "Stable"
+    if projected_price < current_price * 0.95:
+        trend = "Dropping"
+    elif projected_price > current_price * 1.05:
+        trend = "Rising"
+    return trend, "Buy Now" if trend == "Rising" or trend == "Stable" else "Wait"
+
+def run_stage(fn, *args):
+    """Start a blocking stage now; the deadline budget travels with it"""
+    ctx = contextvars.copy_context()
+    return asyncio.get_running_loop().run_in_executor(_stage_pool, ctx.run, fn, *args)
+
 class PricePredictor:
     def __init__(self):
         self.model = None
+        # Single-flight: concurrent predictions for the same product share one
+        # history load, news fetch and fit; (url, name, days_ahead) -> future
+        self._inflight = {}
+        self.predictions = 0
+        self.coalesced = 0
 
     def get_real_history(self, product_url):
         """Fetch real price history from DB"""
@@ -33,7 +97,7 @@ class PricePredictor:
                 WHERE p.url = :url
                 ORDER BY ph.created_at ASC
             """)
-            with engine.connect() as conn:
+            with STAGE_SECONDS.time(stage="db_history"), engine.connect() as conn:
                 df = pd.read_sql(query, conn, params={"url": product_url})
                 return df
         except Exception as e:
@@ -52,56 +116,246 @@ class PricePredictor:
         prices = np.array(prices) - (prices[-1] - current_price)
         return pd.DataFrame({'ds': dates, 'y': prices})
 
-    def predict(self, current_price, product_url=None, product_name="", days_ahead=30):
-        # 1. Try to get Real History from DB
+    async def load_history(self, product_url):
+        """DB history, falling back to the external scraper; returns (df, source)"""
+        df = pd.DataFrame()
+        source = "Database"
+        if not product_url:
+            return df, "Synthetic"
+
+        # 1. Real History from DB, 2. External Scraper. The scrape is started
+        # alongside the DB read so a miss doesn't pay for both in series; when
+        # the DB has enough points its result is simply left to warm the cache.
+        external = run_stage(self.fetch_external, product_url)
+        df = await run_stage(self.get_real_history, product_url)
+        if len(df) < 5:
+            print("DB empty, using external history...")
+            ext_df = await external
+            if not ext_df.empty:
+                print(f"Scraper Success! Found {len(ext_df)} points.")
+                df = ext_df
+                source = "External Scraper (Live)"
+        return df, source
+
+    def fetch_external(self, product_url):
         from history_scraper import fetch_external_history
+        try:
+            with STAGE_SECONDS.time(stage="external_scrape"), deadline(HISTORY_BUDGET):
+                return fetch_external_history(product_url)
+        except Exception as e:
+            print(f"Scraper failed: {e}")
+            return pd.DataFrame()
+
+    def fetch_news(self, product_name):
         from news_sentiment import fetch_market_sentiment
-        
-        df = pd.DataFrame()
-        source = "Synthetic"
-        
-        if product_url:
-            df = self.get_real_history(product_url)
-            
-            # 2. If DB is empty, Try External Scraper
-            if len(df) < 5:
-                print("DB empty, attempting to scrape external history...")
+        with STAGE_SECONDS.time(stage="news_fetch"), deadline(NEWS_BUDGET):
+            return fetch_market_sentiment(product_name)
+
+    def news_regressor(self, product_name, df):
+        """Stored daily sentiment for the product's category, if it covers enough of df"""
+        if not (NEWS_REGRESSOR and product_name):
+            return None
+        from news_sentiment import resolve_news_query
+        from news_ingest import news_store
+        series = news_store.daily_series(resolve_news_query(product_name))
+        if series.empty:
+            return None
+        covered = series['ds'].between(df['ds'].min().floor('D'), df['ds'].max())
+        return series if covered.sum() >= NEWS_REGRESSOR_MIN_DAYS else None
+
+    @staticmethod
+    def with_regressor(frame, regressor):
+        # Each row takes the latest sentiment on or before its date; future rows the last known value
+        merged = pd.merge_asof(frame.sort_values('ds'), regressor.astype({'ds': frame['ds'].dtype}),
+                               on='ds', direction='backward')
+        merged['news_sentiment'] = merged['news_sentiment'].fillna(0.0)
+        return merged
+
+    def fit_forecast(self, df, days_ahead, regressor=None):
+        m = Prophet(daily_seasonality=True, yearly_seasonality=False)
+        if regressor is not None:
+            m.add_regressor('news_sentiment')
+            df = self.with_regressor(df, regressor)
+        with STAGE_SECONDS.time(stage="prophet_fit"):
+            m.fit(df)
+        with STAGE_SECONDS.time(stage="prophet_predict"):
+            future = m.make_future_dataframe(periods=days_ahead)
+            if regressor is not None:
+                future = self.with_regressor(future, regressor)
+            return m.predict(future)
+
+    async def predict_async(self, current_price, product_url=None, product_name="", days_ahead=30):
+        # Upstream calls below share one deadline budget, so a slow or blocked
+        # source falls through quickly instead of holding up the response
+        with deadline(UPSTREAM_BUDGET):
+            result = await self._predict(current_price, product_url, product_name, days_ahead)
+        PREDICTIONS.inc(data_source=SOURCE_LABELS.get(result.get("data_source"), "other"))
+        return result
+
+    def forecast_shared(self, product_url, product_name, days_ahead):
+        """
+        The expensive, price-independent part of a prediction, computed once
+        for all concurrent callers with the same key and then cached in
+        forecast_cache. Everyone gets the same result (or exception); the
+        shared forecast must not be mutated. None when there is too little
+        history; that is never cached, so new history counts right away.
+        """
+        self.predictions += 1
+        key = (product_url or "", product_name or "", days_ahead)
+        future = self._inflight.get(key)
+        if future is not None:
+            self.coalesced += 1
+        else:
+            async def run():
                 try:
-                    ext_df = fetch_external_history(product_url)
-                    if not ext_df.empty:
-                        print(f"Scraper Success! Found {len(ext_df)} points.")
-                        df = ext_df
-                        source = "External Scraper (Live)"
-                except Exception as e:
-                    print(f"Scraper failed: {e}")
-        
+                    return await forecast_cache.get_or_fetch(
+                        'forecast', forecast_target(product_url, product_name, days_ahead),
+                        lambda: self._forecast(product_url, product_name, days_ahead))
+                finally:
+                    self._inflight.pop(key, None)
+
+            future = asyncio.ensure_future(run())
+            future.add_done_callback(lambda f: f.cancelled() or f.exception())
+            self._inflight[key] = future
+        # A caller that gives up (client disconnect) must not cancel it for the rest
+        return asyncio.shield(future)
+
+    def cached_prediction(self, current_price, product_url, product_name="", days_ahead=30):
+        """
+        predict_async()'s result when the forecast is already in forecast_cache,
+        else None. Never waits on a fit: a missing or stale forecast is started
+        in the background, for whoever asks next.
+        """
+        entry = forecast_cache.get_entry(
+            normalize_key('forecast', forecast_target(product_url, product_name, days_ahead)))
+        if entry is None or not entry.is_fresh(time.time()):
+            with deadline(UPSTREAM_BUDGET):
+                shared = self.forecast_shared(product_url, product_name, days_ahead)
+            shared.add_done_callback(lambda f: f.cancelled() or f.exception())
+        if entry is None:
+            return None
+        return self.finish(entry.value, current_price, days_ahead)
+
+    async def _forecast(self, product_url, product_name, days_ahead):
+        # Stages form a small DAG: news and history start together, the fit
+        # starts as soon as history is ready and news drift is applied last,
+        # so latency is roughly max(history + fit, news) rather than the sum
+        news_task = run_stage(self.fetch_news, product_name) if product_name else None
+
+        df, source = await self.load_history(product_url)
+
         # 3. Validation - No Mock
-        if len(df) < 3: 
-             print("Insufficient data.")
-             return { "trend": "Unknown", "forecast": [], "recommendation": "Data Collection Started", "data_source": "Insufficient History", "news_context": None }
+        if len(df) < 3:
+            if news_task is not None:
+                news_task.cancel()
+            # Often a transient miss (DB error, failed scrape); ScrapeCache keeps no empty results
+            return None
 
         print(f"Training on {len(df)} data points from {source}!!")
-        df['ds'] = pd.to_datetime(df['ds']).dt.tz_localize(None)
+        # External history is the frame held in the scrape cache; never modify it in place
+        df = df.assign(ds=pd.to_datetime(df['ds']).dt.tz_localize(None))
 
         # 4. Train Prophet
+        regressor = self.news_regressor(product_name, df)
+        forecast = await run_stage(self.fit_forecast, df, days_ahead, regressor)
+        sentiment = await news_task if news_task is not None else None
+        return {"points": len(df), "source": source, "forecast": forecast,
+                "regressor": regressor is not None, "sentiment": sentiment}
+
+    def quick_estimate(self, current_price, product_url, days_ahead=30):
+        """
+        Trend from the last ESTIMATE_DAYS of stored prices: a straight line
+        through them, projected days_ahead out. One indexed read, no fit.
+        """
+        df = self.get_real_history(product_url) if product_url else pd.DataFrame()
+        estimate = {"current_price": current_price, "trend": "Unknown", "recommendation": "Analyzing",
+                    "data_source": "Recent History", "points": 0}
+        if df.empty:
+            return estimate
+        df['ds'] = pd.to_datetime(df['ds']).dt.tz_localize(None)
+        recent = df[df['ds'] >= df['ds'].max() - timedelta(days=ESTIMATE_DAYS)]
+        prices = recent['y'].astype(float)
+        estimate.update(points=len(recent), recent_low=round(prices.min()), recent_average=round(prices.mean()))
+        if len(recent) < 3:
+            return estimate
+
+        days = (recent['ds'] - recent['ds'].min()).dt.total_seconds() / 86400
+        slope = np.polyfit(days, prices, 1)[0] if days.nunique() > 1 else 0.0
+        estimate["trend"], estimate["recommendation"] = classify_trend(current_price + slope * days_ahead, current_price)
+        return estimate
+
+    async def predict_stream(self, current_price, product_url=None, product_name="", days_ahead=30):
+        """
+        A prediction as (event, payload) pairs, cheapest first:
+        - "estimate": current price and a trend from recent stored history,
+          after one DB read
+        - "news": the news sentiment, as soon as it is fetched
+        - "forecast": the full predict_async() result, last. A cached forecast
+          is answered from forecast_cache and follows the estimate at once
+        The forecast is shared like any other prediction's, so a client that
+        disconnects leaves it running for the rest.
+        """
+        with deadline(UPSTREAM_BUDGET):
+            shared = self.forecast_shared(product_url, product_name, days_ahead)
+            news = run_stage(self.fetch_news, product_name) if product_name else None
+        if news is not None:
+            # Left unawaited when the forecast comes first
+            news.add_done_callback(lambda f: f.cancelled() or f.exception())
+        yield "estimate", await run_stage(self.quick_estimate, current_price, product_url, days_ahead)
+
+        pending = {shared} if news is None else {shared, news}
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            if news in done:
+                try:
+                    yield "news", news.result()
+                except Exception as e:
+                    print(f"News Error: {e}")
+            if shared in done:
+                try:
+                    result = self.finish(shared.result(), current_price, days_ahead)
+                except Exception as e:
+                    print(f"Prophet/News Error: {e}")
+                    result = { "trend": "Error", "forecast": [], "recommendation": "Error", "data_source": "Error" }
+                PREDICTIONS.inc(data_source=SOURCE_LABELS.get(result.get("data_source"), "other"))
+                # The forecast is the final word; a news fetch still running is already folded into it
+                yield "forecast", result
+                return
+
+    def stats(self):
+        return {"predictions": self.predictions, "coalesced": self.coalesced, "in_flight": len(self._inflight),
+                "cache": forecast_cache.stats()}
+
+    async def _predict(self, current_price, product_url, product_name, days_ahead):
+        try:
+            shared = await self.forecast_shared(product_url, product_name, days_ahead)
+        except Exception as e:
+            print(f"Prophet/News Error: {e}")
+            return { "trend": "Error", "forecast": [], "recommendation": "Error", "data_source": "Error" }
+        return self.finish(shared, current_price, days_ahead)
+
+    def finish(self, shared, current_price, days_ahead):
+        """This caller's result from a shared forecast: news drift at its price, trend, recommendation"""
+        if shared is None:
+             print("Insufficient data.")
+             return { "trend": "Unknown", "forecast": [], "recommendation": "Data Collection Started", "data_source": "Insufficient History", "news_context": None }
+
+        source = shared["source"]
+        regressor = shared["regressor"]
+        # Drift depends on this caller's price; the shared frame stays untouched
+        forecast = shared["forecast"].copy()
+
         try:
-            m = Prophet(daily_seasonality=True, yearly_seasonality=False)
-            m.fit(df)
-            
-            future = m.make_future_dataframe(periods=days_ahead)
-            forecast = m.predict(future)
-            
             # --- NEWS INTEGRATION ---
-            news_impact = 0
             news_context = None
-            if product_name:
-                sentiment = fetch_market_sentiment(product_name)
+            if shared["sentiment"] is not None:
+                sentiment = shared["sentiment"]
                 news_context = sentiment
                 
-                # Apply Bias
+                # Apply Bias (already in the forecast when fitted as a regressor)
                 # If Score is +2 (Strong Inflation), add gradual 5% increase over 30 days
                 # If Score is -2 (Strong Deflation), add gradual 5% decrease
-                if sentiment['score'] != 0:
+                if sentiment['score'] != 0 and not regressor:
                     impact_factor = 0.02 * sentiment['score'] # 2% per sentiment point
                     # Clamp
                     impact_factor = max(min(impact_factor, 0.10), -0.10) 
@@ -130,19 +384,15 @@ class PricePredictor:
                     "upper_bound": round(row['yhat_upper'])
                 })
                 
-            trend = "Stable"
+            trend, recommendation = "Stable", "Buy Now"
             if len(predictions) > 0:
-                final_pred = predictions[-1]['predicted_price']
-                if final_pred < current_price * 0.95:
-                    trend = "Dropping"
-                elif final_pred > current_price * 1.05:
-                    trend = "Rising"
+                trend, recommendation = classify_trend(predictions[-1]['predicted_price'], current_price)
                 
             return {
                 "current_price": current_price,
                 "trend": trend,
                 "forecast": predictions,
-                "recommendation": "Buy Now" if trend == "Rising" or trend == "Stable" else "Wait",
+                "recommendation": recommendation,
                 "data_source": source,
                 "news_context": news_context
             }
@@ -0,0 +1,250 @@
+"""
+Background news ingestion.
+
+Every NEWS_INGEST_INTERVAL seconds each category feed (news_sentiment.CATEGORY_QUERIES)
+is fetched, new headlines are deduplicated and scored once, and a point is
+appended to that category's rolling sentiment series:
+
+- news_headlines: one row per distinct headline per category, with its score
+- news_sentiment_series: one row per category per ingestion run
+
+A point's score is the sum over the 10 most recent headlines from the last
+NEWS_WINDOW_DAYS days, the same scale fetch_market_sentiment has always
+reported. The latest point per category is kept in memory, so predict reads
+it in O(1) with no network; daily_series() exposes the history as a model
+regressor. Both tables are created by init_db.py; without a database the
+store works in memory only.
+"""
+
+import os
+import re
+import time
+import asyncio
+import calendar
+import hashlib
+import logging
+import threading
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+from news_sentiment import (CATEGORY_QUERIES, NEWS_STALE_SECONDS, fetch_feed, score_headlines,
+                            sentiment_signal)
+
+logger = logging.getLogger(__name__)
+
+INGEST_INTERVAL = float(os.environ.get('NEWS_INGEST_INTERVAL', str(15 * 60)))  # 0 disables the job
+WINDOW_DAYS = int(os.environ.get('NEWS_WINDOW_DAYS', '30'))
+SERIES_DAYS = int(os.environ.get('NEWS_SERIES_DAYS', '180'))
+TOP_HEADLINES = 10
+
+# Google News appends " - Publisher"; the same story from two outlets is one headline
+PUBLISHER_SUFFIX_RE = re.compile(r'\s+[-|]\s+[^-|]{2,60}$')
+WHITESPACE_RE = re.compile(r'\s+')
+
+
+def headline_key(title: str) -> str:
+    normalized = WHITESPACE_RE.sub(' ', PUBLISHER_SUFFIX_RE.sub('', title).lower()).strip()
+    return hashlib.sha1(normalized.encode()).hexdigest()
+
+
+def entry_published(entry, default: float) -> float:
+    parsed = entry.get('published_parsed') or entry.get('updated_parsed')
+    return float(calendar.timegm(parsed)) if parsed else default
+
+
+class NewsStore:
+    def __init__(self, database_url: Optional[str] = None):
+        self.database_url = database_url
+        self._engine = None
+        self._lock = threading.Lock()
+        # category -> headline key -> (published, score, title), within WINDOW_DAYS
+        self._headlines: Dict[str, Dict[str, Tuple[float, int, str]]] = {}
+        # category -> (observed_at, score, headline count), oldest first
+        self._series: Dict[str, Deque[Tuple[float, float, int]]] = {}
+        self._latest: Dict[str, Dict] = {}
+        self.loaded = False
+        self.runs = 0
+        self.new_headlines = 0
+
+    # ---- reads (request path) ----
+
+    def latest(self, category: str) -> Optional[Dict]:
+        """Latest sentiment for an ingested category, or None if missing or stale"""
+        latest = self._latest.get(category)
+        if latest is None or time.time() - latest['refreshed_at'] > NEWS_STALE_SECONDS:
+            return None
+        return dict(latest)
+
+    def daily_series(self, category: str):
+        """Daily mean sentiment as a DataFrame (ds, news_sentiment); empty if none"""
+        import pandas as pd
+        points = list(self._series.get(category, ()))
+        if not points:
+            return pd.DataFrame(columns=['ds', 'news_sentiment'])
+        frame = pd.DataFrame(points, columns=['ts', 'news_sentiment', 'headlines'])
+        frame['ds'] = pd.to_datetime(frame['ts'], unit='s').dt.floor('D')
+        return frame.groupby('ds', as_index=False)['news_sentiment'].mean()
+
+    # ---- ingestion ----
+
+    def ingest(self, category: str, entries, now: Optional[float] = None) -> int:
+        """Add feed entries for a category and record a series point; returns new headline count"""
+        now = now or time.time()
+        cutoff = now - WINDOW_DAYS * 86400
+        with self._lock:
+            known = self._headlines.setdefault(category, {})
+            fresh = {}
+            for entry in entries:
+                title = (entry.get('title') or '').strip()
+                if not title:
+                    continue
+                key = headline_key(title)
+                published = entry_published(entry, now)
+                if key in known or key in fresh or published < cutoff:
+                    continue
+                fresh[key] = (title, entry.get('link'), published)
+
+            # New headlines are scored together, once
+            new_rows = []
+            scores = score_headlines([title for title, _, _ in fresh.values()]).tolist()
+            for (key, (title, link, published)), score in zip(fresh.items(), scores):
+                known[key] = (published, score, title)
+                new_rows.append((key, title, link, published, score))
+            for key in [k for k, (published, _, _) in known.items() if published < cutoff]:
+                del known[key]
+
+            recent = sorted(known.values(), reverse=True)[:TOP_HEADLINES]
+            score = sum(s for _, s, _ in recent)
+            point = (now, float(score), len(recent))
+            series = self._series.setdefault(category, deque())
+            series.append(point)
+            while series and series[0][0] < now - SERIES_DAYS * 86400:
+                series.popleft()
+            self._latest[category] = {
+                "score": score,
+                "signal": sentiment_signal(score),
+                "top_news": [title for _, s, title in recent if s != 0][:2],
+                "refreshed_at": now,
+            }
+            self.runs += 1
+            self.new_headlines += len(new_rows)
+
+        self._persist(category, new_rows, point)
+        return len(new_rows)
+
+    def ingest_category(self, category: str) -> int:
+        feed = fetch_feed(category)
+        return self.ingest(category, feed.entries)
+
+    # ---- persistence ----
+
+    def _get_engine(self):
+        if self._engine is None and self.database_url:
+            from sqlalchemy import create_engine
+            self._engine = create_engine(self.database_url, pool_pre_ping=True)
+        return self._engine
+
+    def _persist(self, category: str, new_rows, point):
+        engine = self._get_engine()
+        if engine is None:
+            return
+
+        from sqlalchemy import text
+        try:
+            with engine.begin() as conn:
+                if new_rows:
+                    conn.execute(text("""
+                        INSERT INTO news_headlines (category, headline_key, title, link, published_at, score)
+                        VALUES (:category, :key, :title, :link, TO_TIMESTAMP(:published), :score)
+                        ON CONFLICT (category, headline_key) DO NOTHING
+                    """), [{"category": category, "key": key, "title": title, "link": link,
+                            "published": published, "score": score}
+                           for key, title, link, published, score in new_rows])
+                observed_at, score, count = point
+                conn.execute(text("""
+                    INSERT INTO news_sentiment_series (category, observed_at, score, headline_count)
+                    VALUES (:category, TO_TIMESTAMP(:observed_at), :score, :count)
+                    ON CONFLICT (category, observed_at) DO NOTHING
+                """), {"category": category, "observed_at": observed_at, "score": score, "count": count})
+        except Exception as e:
+            logger.warning(f"[NewsStore] Persist failed, keeping {category} in memory only: {e}")
+
+    def load(self):
+        """
+        Restore recent headlines and the series from the database. Safe to
+        repeat: only points newer than what is in memory are added, which is
+        how API workers that don't run the ingestion job keep up with it.
+        """
+        engine = self._get_engine()
+        if engine is None:
+            self.loaded = True
+            return
+
+        from sqlalchemy import text
+        try:
+            with engine.connect() as conn:
+                headlines = conn.execute(text("""
+                    SELECT category, headline_key, EXTRACT(EPOCH FROM published_at), score, title
+                    FROM news_headlines
+                    WHERE published_at > NOW() - make_interval(days => :days)
+                """), {"days": WINDOW_DAYS}).fetchall()
+                points = conn.execute(text("""
+                    SELECT category, EXTRACT(EPOCH FROM observed_at), score, headline_count
+                    FROM news_sentiment_series
+                    WHERE observed_at > NOW() - make_interval(days => :days)
+                    ORDER BY observed_at
+                """), {"days": SERIES_DAYS}).fetchall()
+        except Exception as e:
+            logger.warning(f"[NewsStore] Load failed: {e}")
+            return
+
+        with self._lock:
+            for category, key, published, score, title in headlines:
+                self._headlines.setdefault(category, {}).setdefault(key, (float(published), score, title))
+            for category, observed_at, score, count in points:
+                series = self._series.setdefault(category, deque())
+                if series and float(observed_at) <= series[-1][0]:
+                    continue
+                series.append((float(observed_at), float(score), count))
+            for category, series in self._series.items():
+                observed_at, score, _ = series[-1]
+                latest = self._latest.get(category)
+                if latest is None or latest['refreshed_at'] < observed_at:
+                    recent = sorted(self._headlines.get(category, {}).values(), reverse=True)[:TOP_HEADLINES]
+                    self._latest[category] = {
+                        "score": score,
+                        "signal": sentiment_signal(score),
+                        "top_news": [title for _, s, title in recent if s != 0][:2],
+                        "refreshed_at": observed_at,
+                    }
+            self.loaded = True
+        logger.info(f"[NewsStore] Loaded {len(headlines)} headlines and {len(points)} series points")
+
+    def stats(self) -> Dict:
+        return {
+            'categories': sorted(self._latest),
+            'headlines': sum(len(h) for h in self._headlines.values()),
+            'series_points': sum(len(s) for s in self._series.values()),
+            'runs': self.runs,
+            'new_headlines': self.new_headlines,
+            'loaded': self.loaded,
+        }
+
+
+# Global instance
+news_store = NewsStore(os.environ.get('DATABASE_URL'))
+
+
+async def run_news_ingestion(categories: List[str] = CATEGORY_QUERIES, interval: float = INGEST_INTERVAL):
+    """Ingest every category forever; started from the app's startup hook"""
+    if interval <= 0:
+        return
+    await asyncio.to_thread(news_store.load)
+    while True:
+        for category in categories:
+            try:
+                added = await asyncio.to_thread(news_store.ingest_category, category)
+                logger.info(f"[NewsIngest] {category}: {added} new headlines")
+            except Exception as e:
+                logger.warning(f"[NewsIngest] {category} failed: {e}")
+        await asyncio.sleep(interval)
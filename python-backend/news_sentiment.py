@@ -1,74 +1,152 @@
 import feedparser
-from textblob import TextBlob
 import urllib.parse
 import re
+import os
+import time
+from datetime import datetime, timezone
+from http_client import get_sync_client, ua_pool
+from scraping.cache import ScrapeCache, CACHE_DIR
+from metrics import register_cache
+from headline_scorer import HeadlineScorer
+
+# Sentiment per resolved query ("GPU price trend", ...): most products share a
+# handful of queries, so a burst of predictions should cost one feed fetch
+NEWS_FRESH_SECONDS = float(os.environ.get("NEWS_SENTIMENT_TTL", str(30 * 60)))
+NEWS_STALE_SECONDS = float(os.environ.get("NEWS_SENTIMENT_STALE", str(2 * 60 * 60)))
+sentiment_cache = ScrapeCache(max_entries=256, disk_dir=CACHE_DIR,
+                              ttls={'news': (NEWS_FRESH_SECONDS, NEWS_STALE_SECONDS)})
+register_cache('news_sentiment', sentiment_cache)
+
+# Category queries from resolve_news_query; news_ingest.py keeps these warm
+CATEGORY_QUERIES = ("DRAM price trend", "NAND flash price trend", "CPU price forecast", "GPU price trend")
+
+# Keywords that specifically mean PRICE INCREASE
+inflation_words = ["hike", "surge", "jump", "soar", "increase", "shortage", "crisis", "expensive", "inflation", "climb"]
+# Keywords that specifically mean PRICE DECREASE
+deflation_words = ["drop", "fall", "plunge", "slash", "cut", "cheaper", "discount", "surplus", "glut", "low", "down"]
+# Whole-word, negation-aware matcher over both lists, compiled once
+headline_scorer = HeadlineScorer(inflation_words, deflation_words)
+
+# rss_url -> (validator, parsed feed); lets an unchanged feed skip re-parsing
+_parsed_feeds = {}
+
+def parse_feed(rss_url, resp):
+    """feedparser result for a response, reused when the HTTP cache says it's unchanged"""
+    validator = resp.headers.get('etag') or resp.headers.get('last-modified')
+    cached = _parsed_feeds.get(rss_url)
+    if (cached and validator and cached[0] == validator
+            and resp.extensions.get('cache_status') in ('HIT', 'REVALIDATED')):
+        return cached[1]
+
+    feed = feedparser.parse(resp.content)
+    if validator:
+        _parsed_feeds[rss_url] = (validator, feed)
+    return feed
 
 def fetch_market_sentiment(product_name):
     """
     Fetches news via Google News RSS and deduces a 'Price Sentiment Score'.
     Score > 0 : Expect Price Rise (Inflation/Shortage)
     Score < 0 : Expect Price Drop (Discounts/Glut)
+    Results are cached per query with single-flight, so concurrent callers
+    for the same category share one fetch.
     """
-    try:
-        # 1. Cleaner Query
-        # Remove specific specs to get broader category trends if needed, 
-        # or keep it specific. e.g. "Intel i7 price trends"
-        # Let's try to identify category keywords (RAM, SSD, Processor, GPU)
-        keywords = []
-        full_lower = product_name.lower()
-        if 'ram' in full_lower or 'memory' in full_lower: keywords.append("DRAM price trend")
-        elif 'ssd' in full_lower or 'storage' in full_lower: keywords.append("NAND flash price trend")
-        elif 'processor' in full_lower or 'cpu' in full_lower or 'intel' in full_lower or 'amd' in full_lower: keywords.append("CPU price forecast")
-        elif 'card' in full_lower or 'gpu' in full_lower or 'rtx' in full_lower: keywords.append("GPU price trend")
-        else: keywords.append(f"{product_name} price")
-        
-        query = keywords[0]
-        encoded = urllib.parse.quote(query)
-        rss_url = f"https://news.google.com/rss/search?q={encoded}+when:30d&hl=en-IN&gl=IN&ceid=IN:en"
-        
-        print(f"News Analyzer: Checking '{query}'...")
-        feed = feedparser.parse(rss_url)
-        
-        if not feed.entries:
-            return {"score": 0, "summary": "No specific news found."}
-
-        sentiment_score = 0
-        headline_count = 0
-        reasons = []
-
-        # Keywords that specifically mean PRICE INCREASE
-        inflation_words = ["hike", "surge", "jump", "soar", "increase", "shortage", "crisis", "expensive", "inflation", "climb"]
-        # Keywords that specifically mean PRICE DECREASE
-        deflation_words = ["drop", "fall", "plunge", "slash", "cut", "cheaper", "discount", "surplus", "glut", "low", "down"]
-
-        for entry in feed.entries[:10]: # Check top 10 news
-            title = entry.title.lower()
-            
-            # Simple Keyword Heuristic (More accurate than generic NLP for this specific domain)
-            score = 0
-            if any(w in title for w in inflation_words):
-                score += 1
-            if any(w in title for w in deflation_words):
-                score -= 1
-                
-            if score != 0:
-                sentiment_score += score
-                headline_count += 1
-                reasons.append(entry.title)
-
-        # Normalize
-        final_signal = "Neutral"
-        if sentiment_score > 0: final_signal = "Inflationary (Prices Rising)"
-        if sentiment_score < 0: final_signal = "Deflationary (Prices Falling)"
-
-        print(f"News Analysis: Score {sentiment_score} from {headline_count} relevant articles.")
-        
-        return {
-            "score": sentiment_score, 
-            "signal": final_signal,
-            "top_news": reasons[:2]
-        }
+    query = resolve_news_query(product_name)
+    started = time.time()
+
+    # Categories ingested in the background are answered from memory
+    from news_ingest import news_store
+    result = news_store.latest(query)
+    if result is not None:
+        result["source"] = "ingested"
+        result["cached"] = True
+        result["last_refreshed"] = datetime.fromtimestamp(result.pop("refreshed_at"), timezone.utc).isoformat()
+        result["cache_hit_rate"] = sentiment_cache.stats()["hit_rate"]
+        return result
 
+    try:
+        result = sentiment_cache.get_or_fetch_sync('news', query, lambda: score_news_query(query))
     except Exception as e:
         print(f"News Error: {e}")
         return {"score": 0, "signal": "Error", "top_news": []}
+
+    # The cached dict is shared; annotate a copy
+    result = dict(result)
+    refreshed_at = result.pop("refreshed_at")
+    result["cached"] = refreshed_at < started
+    result["last_refreshed"] = datetime.fromtimestamp(refreshed_at, timezone.utc).isoformat()
+    result["cache_hit_rate"] = sentiment_cache.stats()["hit_rate"]
+    return result
+
+def resolve_news_query(product_name):
+    """Category-level news query for a product"""
+    # 1. Cleaner Query
+    # Remove specific specs to get broader category trends if needed, 
+    # or keep it specific. e.g. "Intel i7 price trends"
+    # Let's try to identify category keywords (RAM, SSD, Processor, GPU)
+    keywords = []
+    full_lower = product_name.lower()
+    if 'ram' in full_lower or 'memory' in full_lower: keywords.append("DRAM price trend")
+    elif 'ssd' in full_lower or 'storage' in full_lower: keywords.append("NAND flash price trend")
+    elif 'processor' in full_lower or 'cpu' in full_lower or 'intel' in full_lower or 'amd' in full_lower: keywords.append("CPU price forecast")
+    elif 'card' in full_lower or 'gpu' in full_lower or 'rtx' in full_lower: keywords.append("GPU price trend")
+    else: keywords.append(f"{product_name} price")
+    
+    return keywords[0]
+
+def fetch_feed(query):
+    """Parsed Google News RSS feed for a query; raises on fetch errors"""
+    encoded = urllib.parse.quote(query)
+    rss_url = f"https://news.google.com/rss/search?q={encoded}+when:30d&hl=en-IN&gl=IN&ceid=IN:en"
+    
+    print(f"News Analyzer: Checking '{query}'...")
+    # Fetch through the shared client so the feed gets pooled connections and
+    # real timeouts (feedparser's own fetcher has neither)
+    resp = get_sync_client().get(rss_url, headers=ua_pool.headers())
+    resp.raise_for_status()
+    return parse_feed(rss_url, resp)
+
+def score_headline(title):
+    """+1 for a price-rise headline, -1 for a price-drop one, 0 otherwise"""
+    # Simple Keyword Heuristic (More accurate than generic NLP for this specific domain)
+    return headline_scorer.score(title)
+
+def score_headlines(titles):
+    """score_headline for many titles in one pass (numpy int8 array)"""
+    return headline_scorer.score_batch(titles)
+
+def sentiment_signal(sentiment_score):
+    final_signal = "Neutral"
+    if sentiment_score > 0: final_signal = "Inflationary (Prices Rising)"
+    if sentiment_score < 0: final_signal = "Deflationary (Prices Falling)"
+    return final_signal
+
+def score_news_query(query):
+    """Fetch and score one news query (uncached); raises on fetch errors"""
+    feed = fetch_feed(query)
+    
+    if not feed.entries:
+        return {"score": 0, "summary": "No specific news found.", "refreshed_at": time.time()}
+
+    sentiment_score = 0
+    headline_count = 0
+    reasons = []
+
+    entries = feed.entries[:10] # Check top 10 news
+    for entry, score in zip(entries, score_headlines([e.title for e in entries]).tolist()):
+        if score != 0:
+            sentiment_score += score
+            headline_count += 1
+            reasons.append(entry.title)
+
+    # Normalize
+    final_signal = sentiment_signal(sentiment_score)
+
+    print(f"News Analysis: Score {sentiment_score} from {headline_count} relevant articles.")
+    
+    return {
+        "score": sentiment_score, 
+        "signal": final_signal,
+        "top_news": reasons[:2],
+        "refreshed_at": time.time()
+    }
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Notification Retention Job
+Moves old notifications from the hot "Notification" table into
+"NotificationArchive" so the bell/unread queries stay on a small table.
+"""
+
+import os
+import sys
+import logging
+from sqlalchemy import create_engine, text
+from dotenv import load_dotenv
+from pathlib import Path
+
+# Load environment variables from .env file in parent directory
+env_path = Path(__file__).parent.parent / ".env"
+if env_path.exists():
+    load_dotenv(env_path)
+
+logging.basicConfig(
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    level=logging.INFO
+)
+logger = logging.getLogger(__name__)
+
+DATABASE_URL = os.environ.get("DATABASE_URL")
+if not DATABASE_URL:
+    raise ValueError("DATABASE_URL environment variable is not set")
+
+engine = create_engine(DATABASE_URL)
+
+# Read notifications are archived sooner than unread ones
+READ_RETENTION_DAYS = int(os.environ.get('NOTIFICATION_READ_RETENTION_DAYS', '30'))
+UNREAD_RETENTION_DAYS = int(os.environ.get('NOTIFICATION_UNREAD_RETENTION_DAYS', '90'))
+BATCH_SIZE = int(os.environ.get('NOTIFICATION_ARCHIVE_BATCH_SIZE', '5000'))
+
+ARCHIVE_COLUMNS = """
+    id, "userEmail", "alertId", type, title, message,
+    "productTitle", "oldPrice", "newPrice", "productImage", "productLink",
+    "isRead", "dedupeKey", "createdAt"
+"""
+
+# One batch: delete from the hot table and insert the same rows into the archive
+# in a single statement, so a crash never loses or duplicates a notification.
+# SKIP LOCKED lets the job run alongside the alert checker without blocking it.
+ARCHIVE_BATCH_QUERY = text(f"""
+    WITH moved AS (
+        DELETE FROM "Notification"
+        WHERE id IN (
+            SELECT id FROM "Notification"
+            WHERE ("isRead" AND "createdAt" < NOW() - make_interval(days => :read_days))
+               OR "createdAt" < NOW() - make_interval(days => :unread_days)
+            ORDER BY "createdAt"
+            LIMIT :batch_size
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING {ARCHIVE_COLUMNS}
+    )
+    INSERT INTO "NotificationArchive" ({ARCHIVE_COLUMNS})
+    SELECT {ARCHIVE_COLUMNS} FROM moved
+    ON CONFLICT (id) DO NOTHING
+""")
+
+def archive_old_notifications(read_days: int = READ_RETENTION_DAYS,
+                              unread_days: int = UNREAD_RETENTION_DAYS,
+                              batch_size: int = BATCH_SIZE) -> int:
+    """Archive notifications past their retention window, returns the number moved"""
+    total = 0
+    try:
+        while True:
+            # Commit per batch so locks and WAL stay bounded on large backlogs
+            with engine.begin() as conn:
+                moved = conn.execute(ARCHIVE_BATCH_QUERY, {
+                    'read_days': read_days,
+                    'unread_days': unread_days,
+                    'batch_size': batch_size
+                }).rowcount
+
+            total += moved
+            if moved < batch_size:
+                break
+
+        logger.info(f"Archived {total} notifications (read > {read_days}d, unread > {unread_days}d)")
+
+    except Exception as e:
+        # Batches committed so far stay archived; the caller still has to know it failed
+        logger.error(f"Error archiving notifications after {total} moved: {e}")
+        raise
+
+    return total
+
+if __name__ == '__main__':
+    try:
+        archive_old_notifications()
+    except Exception:
+        sys.exit(1)  # run_daily_alerts.py reports the failed run
@@ -15,6 +15,11 @@ from sqlalchemy.orm import sessionmaker
 import json
 from dotenv import load_dotenv
 from pathlib import Path
+from product_index import product_index, lookup_or_scrape
+from http_client import http_pool
+from telegram_integration.pool import bot_pool
+from telegram_integration.dispatcher import notification_dispatcher, format_drop
+from metrics import Counter, Histogram, metrics_store
 
 # Load environment variables from .env file in parent directory
 env_path = Path(__file__).parent.parent / ".env"
@@ -36,6 +41,10 @@ if not DATABASE_URL:
 engine = create_engine(DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+ALERT_CHECKS = Counter('alert_checks_total', 'Alert price checks by outcome', ['outcome'])
+ALERT_CHECK_SECONDS = Histogram('alert_check_seconds', 'Time to price one alert')
+ALERT_DROPS = Counter('alert_price_drops_total', 'Alerts found below their target price')
+
 class PriceAlertChecker:
     def __init__(self):
         self.backend_url = os.environ.get('BACKEND_URL', 'http://localhost:8000')
@@ -87,38 +96,21 @@ class PriceAlertChecker:
     async def check_product_price(self, product_title: str, product_link: str) -> float:
         """Check current price of a product using the scraper"""
         try:
-            # For testing: return a mock price that's sometimes lower than target
-            # In production, this would use the actual scraper
-            import random
-
-            # Mock price logic: FORCE a price drop for testing
-            mock_price = 250.0  # Force price below target of ₹277
-            logger.info(f"Mock price check for '{product_title}': ₹{mock_price} (FORCED price drop for testing)")
-            return mock_price
-
-            # Production code (commented out for testing):
-            # response = requests.post(
-            #     f"{self.backend_url}/scrape_price",
-            #     json={
-            #         "product_title": product_title,
-            #         "product_url": product_link
-            #     },
-            #     timeout=30
-            # )
-            #
-            # if response.status_code == 200:
-            #     data = response.json()
-            #     if data.get('success') and data.get('price'):
-            #         return float(data['price'])
-            #     else:
-            #         logger.warning(f"No price found for {product_title}")
-            #         return 0.0
-            # else:
-            #     logger.error(f"Scrape request failed: {response.status_code}")
-            #     return 0.0
+            with ALERT_CHECK_SECONDS.time():
+                best_match, from_index = await lookup_or_scrape(product_title, product_link)
+
+            if best_match:
+                logger.info(f"Price check for '{product_title}': ₹{best_match.price} on {best_match.source}")
+                ALERT_CHECKS.inc(outcome='index' if from_index else 'scraped')
+                return float(best_match.price)
+
+            logger.warning(f"No price found for {product_title}")
+            ALERT_CHECKS.inc(outcome='not_found')
+            return 0.0
 
         except Exception as e:
             logger.error(f"Error checking price for {product_title}: {e}")
+            ALERT_CHECKS.inc(outcome='error')
             return 0.0
 
     def update_alert_price(self, alert_id: str, new_price: float):
@@ -144,43 +136,30 @@ class PriceAlertChecker:
 
     def create_notification(self, alert_id: str, user_email: str, product_title: str,
                           old_price: float, new_price: float, product_image: str, product_link: str):
-        """Create a notification record for the user"""
+        """Create a notification record for the user (at most one per alert, type and day)"""
         try:
             with SessionLocal() as session:
-                # Check if similar notification already exists (avoid spam)
-                check_query = text("""
-                    SELECT id FROM "Notification"
-                    WHERE "userEmail" = :user_email
-                    AND "alertId" = :alert_id
-                    AND type = 'price_drop'
-                    AND "createdAt" > NOW() - INTERVAL '24 hours'
-                """)
-
-                existing = session.execute(check_query, {
-                    'user_email': user_email,
-                    'alert_id': alert_id
-                }).fetchone()
-
-                if existing:
-                    logger.info(f"Notification already sent recently for alert {alert_id}")
-                    return
-
-                # Create notification
+                # The unique "dedupeKey" (alertId:type:day) makes the insert a no-op
+                # when this alert already notified today, even across concurrent checkers
                 insert_query = text("""
                     INSERT INTO "Notification" (
                         id, "userEmail", "alertId", type, title, message,
                         "productTitle", "oldPrice", "newPrice", "productImage", "productLink",
-                        "isRead", "createdAt"
+                        "isRead", "dedupeKey", "createdAt"
                     ) VALUES (
                         gen_random_uuid(), :user_email, :alert_id, 'price_drop',
                         'Price Drop Alert!', :message, :product_title, :old_price,
-                        :new_price, :product_image, :product_link, false, NOW()
+                        :new_price, :product_image, :product_link, false,
+                        :alert_id || ':price_drop:' || to_char(NOW() AT TIME ZONE 'UTC', 'YYYY-MM-DD'),
+                        NOW()
                     )
+                    ON CONFLICT ("dedupeKey") DO NOTHING
+                    RETURNING id
                 """)
 
                 message = f"Great news! {product_title} is now ₹{new_price:.0f} (was ₹{old_price:.0f})"
 
-                session.execute(insert_query, {
+                created = session.execute(insert_query, {
                     'user_email': user_email,
                     'alert_id': alert_id,
                     'message': message,
@@ -189,11 +168,25 @@ class PriceAlertChecker:
                     'new_price': new_price,
                     'product_image': product_image,
                     'product_link': product_link
-                })
+                }).fetchone()
 
                 session.commit()
+
+                if not created:
+                    logger.info(f"Notification already sent today for alert {alert_id}")
+                    return
+
                 logger.info(f"Created price drop notification for {user_email}: {product_title}")
 
+            # Telegram delivery is queued separately so a missing outbox can't lose the notification
+            try:
+                notification_dispatcher.enqueue(
+                    created.id, user_email,
+                    format_drop(product_title, old_price, new_price, product_link)
+                )
+            except Exception as e:
+                logger.error(f"Error queueing Telegram notification: {e}")
+
         except Exception as e:
             logger.error(f"Error creating notification: {e}")
 
@@ -239,6 +232,7 @@ class PriceAlertChecker:
                         )
 
                         price_drops_found += 1
+                        ALERT_DROPS.inc()
 
                     processed_count += 1
 
@@ -258,7 +252,22 @@ class PriceAlertChecker:
 async def main():
     """Main entry point"""
     checker = PriceAlertChecker()
-    await checker.run_daily_check()
+    # Picked up by the API's /metrics from METRICS_DIR
+    metrics_store.start()
+    try:
+        # Known products resolve by identity instead of re-matching titles
+        await asyncio.to_thread(product_index.load)
+        await checker.run_daily_check()
+
+        # Push today's drops out through the bots instead of waiting for the API's dispatcher
+        if len(bot_pool):
+            await bot_pool.start()
+            sent = await notification_dispatcher.drain()
+            logger.info(f"Dispatched {sent} Telegram notifications")
+    finally:
+        await bot_pool.stop()
+        await http_pool.aclose()
+        metrics_store.flush()
 
 if __name__ == '__main__':
     asyncio.run(main())
\ No newline at end of file
@@ -0,0 +1,492 @@
+"""
+Product identity index.
+
+Maps scraped titles and URLs to canonical products so a product is resolved
+once and recognised on every later lookup, whatever store, URL or word order
+it comes back with.
+
+Resolution order:
+1. Strong identifiers (clean URL, ASIN, Flipkart PID, model number) via a hash map
+2. MinHash LSH over normalized title tokens for candidates, then token scoring
+
+Everything lives in memory with compact per-product storage (token-id tuples,
+parallel arrays) so lookups stay sub-millisecond at a million products. The
+product_identities / product_identifiers tables (see init_db.py) persist it;
+load() rebuilds the in-memory index on startup.
+
+Each canonical product also remembers its latest price, taken from the listing
+that matched it. /scrape_price and the alert checker use lookup_or_scrape(): a
+product priced within IDENTITY_PRICE_FRESH_SECONDS is answered straight from
+the index, with no scrape.
+"""
+
+import os
+import time
+import struct
+import hashlib
+import logging
+import threading
+from array import array
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple, Union
+
+from scraping.identity import (distinguishing_tokens, variant_tokens, normalize_tokens, extract_identifiers,
+                              token_match_score)
+from scraping.types import ScrapedProduct
+
+logger = logging.getLogger(__name__)
+
+PRICE_FRESH_SECONDS = float(os.environ.get('IDENTITY_PRICE_FRESH_SECONDS', str(15 * 60)))
+# Scores from scraping.identity.token_match_score
+MATCH_THRESHOLD = 0.75     # a title resolves to an existing product
+MERGE_JACCARD = 0.8        # a scraped listing is folded into an existing product
+IDENTIFIER_MIN_SCORE = 0.3  # sanity check when only a model number matched
+
+# 4 bands of 4 rows: near-duplicates (Jaccard 0.8+) share a bucket ~90% of the
+# time, while titles that only share brand/category words almost never do
+NUM_PERM = 16
+BANDS = 4
+ROWS = NUM_PERM // BANDS
+MAX_BUCKET = 256        # very common token combinations stop growing their bucket
+MAX_CANDIDATES = 64     # candidates scored per lookup, smallest buckets first
+LOAD_CHUNK = 5000       # products inserted per lock hold while loading
+
+_MERSENNE = (1 << 61) - 1
+_PERMUTATIONS = [
+    (int.from_bytes(hashlib.blake2b(b'a%d' % i, digest_size=8).digest(), 'big') % _MERSENNE | 1,
+     int.from_bytes(hashlib.blake2b(b'b%d' % i, digest_size=8).digest(), 'big') % _MERSENNE)
+    for i in range(NUM_PERM)
+]
+
+
+@dataclass
+class IdentityMatch:
+    product_id: int
+    title: str
+    score: float
+    via: str  # 'identifier' or 'title'
+    price: Optional[float]
+    source: Optional[str]
+    product_url: Optional[str]
+    price_age: Optional[float]
+
+    @property
+    def price_is_fresh(self) -> bool:
+        return self.price is not None and self.price_age is not None and self.price_age < PRICE_FRESH_SECONDS
+
+
+class ProductIndex:
+    def __init__(self, database_url: Optional[str] = None):
+        self.database_url = database_url
+        self._engine = None
+        self._lock = threading.RLock()
+        self.loaded = False
+
+        # vocabulary: token -> token id; its NUM_PERM minhash values live
+        # flat in _token_hashes[id * NUM_PERM:(id + 1) * NUM_PERM]
+        self._vocab: Dict[str, int] = {}
+        self._token_hashes = array('Q')
+        # ids of variant words and sizes (scraping.identity.variant_tokens)
+        self._variant_ids: Set[int] = set()
+
+        # per-product storage, indexed by slot
+        self._ids = array('q')
+        self._tokens: List[Tuple[int, ...]] = []
+        self._titles: List[str] = []
+        self._urls: List[Optional[str]] = []
+        self._sources: List[Optional[str]] = []
+        self._prices = array('d')
+        self._seen = array('d')
+        self._slot_by_id: Dict[int, int] = {}
+
+        self._identifiers: Dict[str, int] = {}
+        # band key -> slot, or an array of slots once a second product lands there
+        self._buckets: List[Dict[int, Union[int, array]]] = [dict() for _ in range(BANDS)]
+        self._next_local_id = -1
+
+        self.lookups = 0
+        self.identifier_hits = 0
+        self.title_hits = 0
+        self.skipped_scrapes = 0
+
+    # ---- hashing ----
+
+    def _token(self, token: str) -> int:
+        token_id = self._vocab.get(token)
+        if token_id is None:
+            base = struct.unpack('<Q', hashlib.blake2b(token.encode(), digest_size=8).digest())[0]
+            token_id = len(self._vocab)
+            self._token_hashes.extend((a * base + b) % _MERSENNE for a, b in _PERMUTATIONS)
+            self._vocab[token] = token_id
+            if variant_tokens((token,)):
+                self._variant_ids.add(token_id)
+        return token_id
+
+    def _variant(self, token_ids: Iterable[int]) -> FrozenSet[int]:
+        """Ids of the variant words and sizes among a product's tokens"""
+        return frozenset(t for t in token_ids if t in self._variant_ids)
+
+    def _encode(self, tokens: Iterable[str], add: bool) -> Tuple[Tuple[int, ...], Optional[List[int]]]:
+        """(token ids, minhash signature); unknown tokens are skipped unless add"""
+        ids = []
+        signature = None
+        hashes = self._token_hashes
+        for token in tokens:
+            token_id = self._token(token) if add else self._vocab.get(token)
+            if token_id is None:
+                continue
+            ids.append(token_id)
+            values = hashes[token_id * NUM_PERM:(token_id + 1) * NUM_PERM]
+            signature = values.tolist() if signature is None else [min(x, y) for x, y in zip(signature, values)]
+        return tuple(sorted(ids)), signature
+
+    @staticmethod
+    def _band_keys(signature: List[int]) -> List[int]:
+        return [hash(tuple(signature[b * ROWS:(b + 1) * ROWS])) for b in range(BANDS)]
+
+    # ---- lookup ----
+
+    def resolve(self, title: str = '', url: Optional[str] = None) -> Optional[IdentityMatch]:
+        """
+        Canonical product for a title and/or URL, or None. Holds the lock:
+        observe() and load() change the maps from worker threads.
+        """
+        query_tokens = normalize_tokens(title)
+        identifiers = sorted(extract_identifiers(title, url))
+
+        with self._lock:
+            self.lookups += 1
+            for identifier in identifiers:
+                slot = self._slot_by_id.get(self._identifiers.get(identifier))
+                if slot is None:
+                    continue
+                score = self._score(query_tokens, slot) if query_tokens else 1.0
+                if identifier.startswith('model:') and score < IDENTIFIER_MIN_SCORE:
+                    continue
+                self.identifier_hits += 1
+                return self._match(slot, max(score, MATCH_THRESHOLD), 'identifier')
+
+            if not query_tokens:
+                return None
+            slot, score = self._best_candidate(query_tokens)
+            if slot is None or score < MATCH_THRESHOLD:
+                return None
+            self.title_hits += 1
+            return self._match(slot, score, 'title')
+
+    def _score(self, query_tokens, slot: int) -> float:
+        ids = {self._vocab[t] for t in query_tokens if t in self._vocab}
+        # Tokens the index has never seen still count against containment
+        return token_match_score(ids | {-i - 1 for i in range(len(query_tokens) - len(ids))}, self._tokens[slot])
+
+    def _best_candidate(self, query_tokens) -> Tuple[Optional[int], float]:
+        ids, signature = self._encode(query_tokens, add=False)
+        if signature is None:
+            return None, 0.0
+        query_ids = set(ids) | {-i - 1 for i in range(len(query_tokens) - len(ids))}
+        # The query's numbers and model codes must all be in the candidate, and
+        # variant words and sizes must be the same: "iPhone 15 Pro" is not
+        # "iPhone 15 Pro Max", whichever of the two is asked for
+        required = {self._vocab.get(t) for t in distinguishing_tokens(query_tokens)}
+        if None in required:
+            return None, 0.0
+        query_variant = self._variant(ids)
+
+        buckets = [self._buckets[b].get(key) for b, key in enumerate(self._band_keys(signature))]
+        buckets = sorted(((b,) if isinstance(b, int) else b for b in buckets if b is not None), key=len)
+
+        best_slot, best_score = None, 0.0
+        seen = set()
+        for bucket in buckets:
+            for slot in bucket:
+                if slot in seen:
+                    continue
+                seen.add(slot)
+                candidate = self._tokens[slot]
+                if not required.issubset(candidate) or not self._variant(candidate) <= query_variant:
+                    continue
+                score = token_match_score(query_ids, candidate)
+                if score > best_score:
+                    best_slot, best_score = slot, score
+            if len(seen) >= MAX_CANDIDATES:
+                break
+        return best_slot, best_score
+
+    def _match(self, slot: int, score: float, via: str) -> IdentityMatch:
+        seen = self._seen[slot]
+        price = self._prices[slot]
+        return IdentityMatch(
+            product_id=self._ids[slot],
+            title=self._titles[slot],
+            score=round(score, 3),
+            via=via,
+            price=price if price > 0 else None,
+            source=self._sources[slot],
+            product_url=self._urls[slot],
+            price_age=time.time() - seen if seen > 0 else None,
+        )
+
+    # ---- updates ----
+
+    def _insert(self, product_id: int, title: str, url: Optional[str], source: Optional[str],
+                price: float, seen: float, identifiers: Iterable[str]) -> int:
+        ids, signature = self._encode(normalize_tokens(title), add=True)
+        slot = len(self._ids)
+        self._ids.append(product_id)
+        self._tokens.append(ids)
+        self._titles.append(title)
+        self._urls.append(url)
+        self._sources.append(source)
+        self._prices.append(price or 0.0)
+        self._seen.append(seen or 0.0)
+        self._slot_by_id[product_id] = slot
+        for identifier in identifiers:
+            self._identifiers.setdefault(identifier, product_id)
+        if signature is not None:
+            for band, key in enumerate(self._band_keys(signature)):
+                bucket = self._buckets[band].get(key)
+                if bucket is None:
+                    self._buckets[band][key] = slot
+                elif isinstance(bucket, int):
+                    self._buckets[band][key] = array('i', (bucket, slot))
+                elif len(bucket) < MAX_BUCKET:
+                    bucket.append(slot)
+        return slot
+
+    def observe(self, products: Iterable[ScrapedProduct], matched: Optional[ScrapedProduct] = None) -> List[int]:
+        """
+        Index freshly scraped products: attach each to its canonical product
+        (or create one) and record its price. A canonical product takes price
+        and store from its first listing in the batch, `matched` (the listing
+        the caller picked) going first. Returns canonical product ids in the
+        order of `products`.
+
+        Only the in-memory work holds the lock; database writes happen after.
+        """
+        now = time.time()
+        products = list(products)
+        product_ids: List[Optional[int]] = [None] * len(products)
+        new_products, price_rows, identifier_rows = [], [], []
+        priced = set()
+
+        with self._lock:
+            for position in sorted(range(len(products)), key=lambda p: products[p] is not matched):
+                product = products[position]
+                identifiers = extract_identifiers(product.title, product.product_url)
+                slot = self._merge_target(product, identifiers)
+                if slot is None:
+                    # Memory-only id for now; swapped for the database id below
+                    product_id = self._next_local_id
+                    self._next_local_id -= 1
+                    priced.add(self._insert(product_id, product.title, product.product_url,
+                                            product.source, product.price, now, identifiers))
+                    new_products.append((product_id, product, identifiers))
+                    product_ids[position] = product_id
+                    continue
+
+                product_id = self._ids[slot]
+                if slot not in priced:
+                    priced.add(slot)
+                    self._prices[slot] = product.price
+                    self._seen[slot] = now
+                    self._urls[slot] = product.product_url or self._urls[slot]
+                    self._sources[slot] = product.source
+                    price_rows.append((product_id, product))
+                fresh = [i for i in identifiers if i not in self._identifiers]
+                for identifier in fresh:
+                    self._identifiers[identifier] = product_id
+                identifier_rows.extend((i, product_id) for i in fresh)
+                product_ids[position] = product_id
+
+        remap = self._persist_new(new_products)
+        if remap:
+            with self._lock:
+                self._apply_remap(remap)
+            product_ids = [remap.get(pid, pid) for pid in product_ids]
+            price_rows = [(remap.get(pid, pid), p) for pid, p in price_rows]
+            identifier_rows = [(i, remap.get(pid, pid)) for i, pid in identifier_rows]
+        # Listings folded into a product another batch is still inserting keep
+        # their updates in memory only (their rows carry its negative id)
+        self._persist_updates(price_rows, identifier_rows)
+        return product_ids
+
+    def _merge_target(self, product: ScrapedProduct, identifiers) -> Optional[int]:
+        """
+        Slot of the canonical product a scraped listing belongs to. Stricter
+        than resolve(): titles must agree both ways and carry the same variant
+        words and sizes, so "128 GB" / "256 GB" and "Pro" / "Pro Max" stay
+        separate products.
+        """
+        match = self.resolve(product.title, product.product_url)
+        if match is None:
+            return None
+        slot = self._slot_by_id[match.product_id]
+        strong = any(i.split(':', 1)[0] in ('url', 'asin', 'fkpid') and self._identifiers.get(i) == match.product_id
+                     for i in identifiers)
+        if strong:
+            return slot
+        tokens = normalize_tokens(product.title)
+        ids, _ = self._encode(tokens, add=False)
+        candidate = self._tokens[slot]
+        variant = self._variant(ids)
+        # A variant word or size the index has never seen is one the candidate lacks
+        if len(variant) != len(variant_tokens(tokens)) or variant != self._variant(candidate):
+            return None
+        common = len(set(ids).intersection(candidate))
+        union = len(tokens) + len(candidate) - common
+        return slot if union and common / union >= MERGE_JACCARD else None
+
+    def _reassign(self, slot: int, old_id: int, new_id: int):
+        self._ids[slot] = new_id
+        del self._slot_by_id[old_id]
+        self._slot_by_id[new_id] = slot
+
+    def _apply_remap(self, remap: Dict[int, int]):
+        """Swap memory-only ids for database ids; caller holds the lock"""
+        for old_id, new_id in remap.items():
+            slot = self._slot_by_id.get(old_id)
+            if slot is not None:
+                self._reassign(slot, old_id, new_id)
+        for identifier, product_id in list(self._identifiers.items()):
+            if product_id in remap:
+                self._identifiers[identifier] = remap[product_id]
+
+    # ---- persistence ----
+
+    def _get_engine(self):
+        if self._engine is None and self.database_url:
+            from sqlalchemy import create_engine
+            self._engine = create_engine(self.database_url, pool_pre_ping=True)
+        return self._engine
+
+    def _persist_new(self, new_products) -> Dict[int, int]:
+        """Insert new canonical products; returns {memory-only id: database id}"""
+        engine = self._get_engine()
+        if engine is None or not new_products:
+            return {}
+
+        from sqlalchemy import text
+        remap = {}
+        try:
+            with engine.begin() as conn:
+                for local_id, product, identifiers in new_products:
+                    product_id = conn.execute(text("""
+                        INSERT INTO product_identities (canonical_title, product_url, source, latest_price, price_seen_at)
+                        VALUES (:title, :url, :source, :price, NOW())
+                        RETURNING id
+                    """), {"title": product.title, "url": product.product_url, "source": product.source,
+                           "price": product.price or 0.0}).scalar()
+                    remap[local_id] = product_id
+                    if identifiers:
+                        conn.execute(text("""
+                            INSERT INTO product_identifiers (identifier, product_id)
+                            VALUES (:identifier, :product_id)
+                            ON CONFLICT (identifier) DO NOTHING
+                        """), [{"identifier": i, "product_id": product_id} for i in identifiers])
+        except Exception as e:
+            # Products stay indexed in memory under their negative ids
+            logger.warning(f"[ProductIndex] Persist failed, keeping products in memory only: {e}")
+            return {}
+        return remap
+
+    def _persist_updates(self, price_rows, identifier_rows):
+        engine = self._get_engine()
+        # Negative ids are memory-only products (no database, or a failed insert)
+        price_rows = [(pid, p) for pid, p in price_rows if pid > 0]
+        identifier_rows = [(i, pid) for i, pid in identifier_rows if pid > 0]
+        if engine is None or not (price_rows or identifier_rows):
+            return
+
+        from sqlalchemy import text
+        try:
+            with engine.begin() as conn:
+                if price_rows:
+                    conn.execute(text("""
+                        UPDATE product_identities
+                        SET latest_price = :price, source = :source, product_url = COALESCE(:url, product_url),
+                            price_seen_at = NOW(), updated_at = NOW()
+                        WHERE id = :id
+                    """), [{"id": pid, "price": p.price, "source": p.source, "url": p.product_url or None}
+                           for pid, p in price_rows])
+                if identifier_rows:
+                    conn.execute(text("""
+                        INSERT INTO product_identifiers (identifier, product_id)
+                        VALUES (:identifier, :product_id)
+                        ON CONFLICT (identifier) DO NOTHING
+                    """), [{"identifier": i, "product_id": pid} for i, pid in identifier_rows])
+        except Exception as e:
+            logger.warning(f"[ProductIndex] Price update failed: {e}")
+
+    def load(self):
+        """Rebuild the in-memory index from the database"""
+        engine = self._get_engine()
+        if engine is None:
+            self.loaded = True
+            return
+
+        from sqlalchemy import text
+        started = time.perf_counter()
+        try:
+            with engine.connect() as conn:
+                products = conn.execute(text("""
+                    SELECT id, canonical_title, product_url, source, COALESCE(latest_price, 0),
+                           COALESCE(EXTRACT(EPOCH FROM price_seen_at), 0)
+                    FROM product_identities
+                """)).fetchall()
+                identifiers = conn.execute(text(
+                    "SELECT identifier, product_id FROM product_identifiers"
+                )).fetchall()
+        except Exception as e:
+            logger.warning(f"[ProductIndex] Load failed: {e}")
+            return
+
+        by_product: Dict[int, List[str]] = {}
+        for identifier, product_id in identifiers:
+            by_product.setdefault(product_id, []).append(identifier)
+
+        # In chunks, so lookups never wait long on the lock
+        for start in range(0, len(products), LOAD_CHUNK):
+            with self._lock:
+                for product_id, title, url, source, price, seen in products[start:start + LOAD_CHUNK]:
+                    if product_id not in self._slot_by_id:
+                        self._insert(product_id, title, url, source, float(price), float(seen),
+                                     by_product.get(product_id, ()))
+        self.loaded = True
+        logger.info(f"[ProductIndex] Loaded {len(products)} products in {time.perf_counter() - started:.1f}s")
+
+    def stats(self) -> Dict:
+        return {
+            'products': len(self._ids),
+            'identifiers': len(self._identifiers),
+            'vocabulary': len(self._vocab),
+            'lookups': self.lookups,
+            'identifier_hits': self.identifier_hits,
+            'title_hits': self.title_hits,
+            'skipped_scrapes': self.skipped_scrapes,
+            'loaded': self.loaded,
+        }
+
+
+# Global instance
+product_index = ProductIndex(os.environ.get('DATABASE_URL'))
+
+
+async def lookup_or_scrape(title: str, url: Optional[str] = None) -> Tuple[Optional[ScrapedProduct], bool]:
+    """
+    Current price for a product: from the index when it was priced recently,
+    otherwise scraped, matched and indexed. Returns (product, from_index).
+    """
+    import asyncio
+    from scraping import scrape_products, find_best_match
+
+    match = product_index.resolve(title, url)
+    if match is not None and match.price_is_fresh:
+        product_index.skipped_scrapes += 1
+        return ScrapedProduct(title=match.title, price=match.price, source=match.source or '',
+                              product_url=match.product_url or ''), True
+
+    products = await scrape_products(title)
+    best = find_best_match(products, title)
+    if products:
+        await asyncio.to_thread(product_index.observe, products, best)
+    return best, False
@@ -0,0 +1,257 @@
+"""
+On-demand sampling profiler for slow requests.
+
+A sampler thread reads every thread's stack (sys._current_frames) each
+PROFILE_INTERVAL_MS and counts identical stacks, rooted at the thread's name
+(MainThread for the event loop, predict-stage for DB reads, scrapes and the
+Prophet fit, ...). Threads parked in a wait are left out. Profiles are saved
+in the folded-stack format ("root;frame;frame count" per line) that
+flamegraph.pl, speedscope and inferno read as they are.
+
+A request is profiled when:
+- it carries X-Profile: <PROFILE_TOKEN>; the response names the saved
+  profile in X-Profile-Id
+- or it is still running after PROFILE_SLOW_SECONDS. Sampling starts at the
+  threshold, so the profile covers the slow part of the request. Fast
+  requests only cost a timer that is cancelled.
+
+Samples cover the whole process while the request runs. Concurrent requests
+show up too, but a slow one dominates its own profile. Time in cmdstan is
+spent in a subprocess, so it shows up as the stage thread waiting in
+cmdstanpy.
+
+Profiles are kept in PROFILE_DIR (the newest PROFILE_KEEP), shared by every
+worker. They are listed and downloaded through /admin/profiles with the
+X-Admin-Token: <PROFILE_TOKEN> header. Without PROFILE_TOKEN and
+PROFILE_SLOW_SECONDS nothing is sampled and the admin routes answer 404.
+"""
+
+import os
+import re
+import sys
+import time
+import asyncio
+import hmac
+import logging
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+PROFILE_TOKEN = os.environ.get('PROFILE_TOKEN', '')
+SLOW_SECONDS = float(os.environ.get('PROFILE_SLOW_SECONDS', '0'))  # 0 disables automatic profiles
+INTERVAL = float(os.environ.get('PROFILE_INTERVAL_MS', '5')) / 1000.0
+PROFILE_DIR = os.environ.get('PROFILE_DIR', str(Path(__file__).parent / '.cache' / 'profiles'))
+KEEP = int(os.environ.get('PROFILE_KEEP', '100'))
+MAX_DEPTH = 128
+PROFILE_HEADER = b'x-profile'
+
+# Leaf frames of a thread that is waiting rather than working
+IDLE_FRAMES = {
+    ('threading.py', 'wait'), ('selectors.py', 'select'), ('queue.py', 'get'),
+    ('thread.py', '_worker'), ('threading.py', '_wait_for_tstate_lock'),
+}
+THREAD_SUFFIX_RE = re.compile(r'[_-]?\d+$')
+UNSAFE_RE = re.compile(r'[^A-Za-z0-9_.-]+')
+
+
+def frame_label(frame) -> str:
+    code = frame.f_code
+    # ';' separates frames in the folded format (the count follows the last space)
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(';', ':')
+
+
+def fold(frame, thread_name: str) -> Optional[str]:
+    """'thread;outermost;...;innermost' for one stack, or None while it idles"""
+    code = frame.f_code
+    if (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES:
+        return None
+    labels = []
+    while frame is not None and len(labels) < MAX_DEPTH:
+        labels.append(frame_label(frame))
+        frame = frame.f_back
+    labels.append(THREAD_SUFFIX_RE.sub('', thread_name) or 'thread')
+    return ';'.join(reversed(labels))
+
+
+class Profile:
+    def __init__(self, label: str):
+        self.label = label
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.started_at: Optional[float] = None
+        self.elapsed = 0.0
+
+    def render(self) -> str:
+        return ''.join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class Sampler:
+    """One thread samples for every active profile; it runs only while there is one"""
+
+    def __init__(self, interval: float = INTERVAL):
+        self.interval = interval
+        self._active: List[Profile] = []
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, profile: Profile):
+        profile.started_at = time.perf_counter()
+        with self._lock:
+            self._active.append(profile)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='profiler', daemon=True)
+                self._thread.start()
+
+    def stop(self, profile: Profile) -> bool:
+        """False if the profile wasn't being sampled"""
+        with self._lock:
+            if profile not in self._active:
+                return False
+            self._active.remove(profile)
+        profile.elapsed = time.perf_counter() - profile.started_at
+        return True
+
+    def _run(self):
+        me = threading.get_ident()
+        while True:
+            with self._lock:
+                if not self._active:
+                    self._thread = None
+                    return
+                active = list(self._active)
+            names = {t.ident: t.name for t in threading.enumerate()}
+            stacks = []
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = fold(frame, names.get(ident, 'thread'))
+                if stack is not None:
+                    stacks.append(stack)
+            for profile in active:
+                profile.samples += 1
+                profile.stacks.update(stacks)
+            time.sleep(self.interval)
+
+
+class Profiler:
+    def __init__(self, token: str = PROFILE_TOKEN, slow_seconds: float = SLOW_SECONDS,
+                 directory: str = PROFILE_DIR, keep: int = KEEP):
+        self.token = token
+        self.slow_seconds = slow_seconds
+        self.directory = Path(directory)
+        self.keep = keep
+        self.sampler = Sampler()
+        self.counters = {'forced': 0, 'slow': 0, 'saved': 0}
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.token) or self.slow_seconds > 0
+
+    def authorized(self, token: Optional[str]) -> bool:
+        return bool(self.token and token) and hmac.compare_digest(token, self.token)
+
+    def save(self, profile: Profile) -> Optional[str]:
+        """Write a profile with samples to PROFILE_DIR; returns its name"""
+        if not profile.stacks:
+            return None
+        stamp = time.strftime('%Y%m%dT%H%M%S', time.gmtime())
+        name = f"{stamp}-{os.getpid()}-{UNSAFE_RE.sub('_', profile.label).strip('_')[:60]}-{profile.elapsed * 1000:.0f}ms.folded"
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            (self.directory / name).write_text(profile.render())
+            for old in self.list()[self.keep:]:
+                (self.directory / old['name']).unlink(missing_ok=True)
+        except OSError as e:
+            logger.warning(f"[Profiler] Could not save profile: {e}")
+            return None
+        self.counters['saved'] += 1
+        logger.info(f"[Profiler] Saved {name} ({profile.samples} samples)")
+        return name
+
+    def list(self) -> List[Dict]:
+        """Saved profiles, newest first"""
+        profiles = []
+        for path in self.directory.glob('*.folded'):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue  # pruned by another worker meanwhile
+            profiles.append({'name': path.name, 'bytes': stat.st_size, 'saved_at': stat.st_mtime})
+        return sorted(profiles, key=lambda p: p['saved_at'], reverse=True)
+
+    def read(self, name: str) -> Optional[str]:
+        path = self.directory / name
+        # Names come from a URL; nothing outside PROFILE_DIR
+        if path.name != name or path.suffix != '.folded' or not path.exists():
+            return None
+        return path.read_text()
+
+    async def capture(self, label: str, seconds: float) -> Optional[str]:
+        """Sample the whole process for a while, e.g. to catch background jobs"""
+        profile = Profile(label)
+        self.sampler.start(profile)
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            self.sampler.stop(profile)
+        return await asyncio.to_thread(self.save, profile)
+
+    def stats(self) -> Dict:
+        return {'enabled': self.enabled, 'slow_seconds': self.slow_seconds, **self.counters}
+
+
+class ProfilingMiddleware:
+    """ASGI middleware that profiles requests asked for by header, or slow ones"""
+
+    def __init__(self, app, profiler: Optional[Profiler] = None):
+        self.app = app
+        self.profiler = profiler or request_profiler
+
+    async def __call__(self, scope, receive, send):
+        profiler = self.profiler
+        if scope['type'] != 'http' or not profiler.enabled:
+            return await self.app(scope, receive, send)
+
+        forced = False
+        if profiler.token:
+            for key, value in scope['headers']:
+                if key == PROFILE_HEADER:
+                    forced = profiler.authorized(value.decode('latin-1'))
+                    break
+        if not forced and profiler.slow_seconds <= 0:
+            return await self.app(scope, receive, send)
+
+        profile = Profile(f"{scope['method']} {scope['path']}")
+        timer = None
+        if forced:
+            profiler.counters['forced'] += 1
+            profiler.sampler.start(profile)
+        else:
+            timer = asyncio.get_running_loop().call_later(profiler.slow_seconds, self._slow, profile)
+
+        # A forced profile is saved before the headers go out, so they can name it
+        async def send_wrapper(message):
+            if forced and message['type'] == 'http.response.start' and profiler.sampler.stop(profile):
+                name = await asyncio.to_thread(profiler.save, profile)
+                if name:
+                    message = {**message, 'headers': list(message.get('headers', [])) + [(b'x-profile-id', name.encode())]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if timer is not None:
+                timer.cancel()
+            if profiler.sampler.stop(profile):
+                await asyncio.to_thread(profiler.save, profile)
+
+    def _slow(self, profile: Profile):
+        self.profiler.counters['slow'] += 1
+        self.profiler.sampler.start(profile)
+
+
+# Global instance
+request_profiler = Profiler()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Local replay server for recorded upstream responses.
+
+Serves a fixture archive (see http_replay.py) over plain HTTP so the scrapers,
+news fetcher and alert checker can run without the internet. Point the
+backend at it with HTTP_REPLAY_URL=http://127.0.0.1:<port>.
+
+Fault injection, all optional:
+  --latency-ms / --jitter-ms   base delay plus an exponential tail per response
+  --error-rate                 fraction answered with 503
+  --throttle-rate              fraction answered with 429 + Retry-After
+  --hang-rate                  fraction that stall for --hang-seconds (client timeouts)
+
+A URL with no exact fixture falls back to one recorded for the same path
+(unless --strict); anything else gets a 404. GET /__replay/stats reports counters.
+
+Usage: python replay_server.py --archive fixtures.jsonl.gz [--port 8765] [--latency-ms 80 --jitter-ms 40]
+"""
+
+import sys
+import json
+import random
+import asyncio
+import argparse
+from dataclasses import dataclass, asdict
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+
+from http_replay import FixtureArchive, REPLAY_URL_HEADER
+
+
+@dataclass
+class FaultConfig:
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    error_rate: float = 0.0
+    throttle_rate: float = 0.0
+    hang_rate: float = 0.0
+    hang_seconds: float = 30.0
+
+    def delay(self) -> float:
+        jitter = random.expovariate(1.0 / self.jitter_ms) if self.jitter_ms > 0 else 0.0
+        return (self.latency_ms + jitter) / 1000.0
+
+
+class ReplayApp:
+    """Minimal ASGI app; avoids framework overhead so the server isn't the bottleneck"""
+
+    def __init__(self, archive: FixtureArchive, faults: FaultConfig, strict: bool = False):
+        self.archive = archive
+        self.faults = faults
+        self.strict = strict
+        self.counters = {'served': 0, 'missing': 0, 'errors': 0, 'throttled': 0, 'hung': 0}
+        self._header = REPLAY_URL_HEADER.lower().encode()
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            while True:
+                message = await receive()
+                if message['type'] == 'lifespan.startup':
+                    await send({'type': 'lifespan.startup.complete'})
+                elif message['type'] == 'lifespan.shutdown':
+                    await send({'type': 'lifespan.shutdown.complete'})
+                    return
+
+        if scope['path'] == '/__replay/stats':
+            body = json.dumps({**self.counters, 'fixtures': len(self.archive), 'faults': asdict(self.faults)})
+            return await self._respond(send, 200, [(b'content-type', b'application/json')], body.encode())
+
+        url = dict(scope['headers']).get(self._header, b'').decode()
+        faults = self.faults
+        roll = random.random()
+
+        await asyncio.sleep(faults.delay())
+
+        if roll < faults.hang_rate:
+            self.counters['hung'] += 1
+            await asyncio.sleep(faults.hang_seconds)
+            return await self._respond(send, 504, [], b'')
+        roll -= faults.hang_rate
+        if roll < faults.error_rate:
+            self.counters['errors'] += 1
+            return await self._respond(send, 503, [], b'injected error')
+        roll -= faults.error_rate
+        if roll < faults.throttle_rate:
+            self.counters['throttled'] += 1
+            return await self._respond(send, 429, [(b'retry-after', b'1')], b'injected throttle')
+
+        fixture = self.archive.get(scope['method'], url, loose=not self.strict)
+        if fixture is None:
+            self.counters['missing'] += 1
+            return await self._respond(send, 404, [], f'no fixture for {url}'.encode())
+
+        status, headers, body = fixture
+        self.counters['served'] += 1
+        raw_headers = [(k.encode(), v.encode()) for k, v in headers.items()]
+        await self._respond(send, status, raw_headers, body)
+
+    @staticmethod
+    async def _respond(send, status, headers, body: bytes):
+        await send({'type': 'http.response.start', 'status': status,
+                    'headers': headers + [(b'content-length', str(len(body)).encode())]})
+        await send({'type': 'http.response.body', 'body': body})
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve recorded HTTP fixtures')
+    parser.add_argument('--archive', required=True)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency-ms', type=float, default=0.0)
+    parser.add_argument('--jitter-ms', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--throttle-rate', type=float, default=0.0)
+    parser.add_argument('--hang-rate', type=float, default=0.0)
+    parser.add_argument('--hang-seconds', type=float, default=30.0)
+    parser.add_argument('--strict', action='store_true', help='exact URL matches only')
+    args = parser.parse_args()
+
+    archive = FixtureArchive(args.archive)
+    if not len(archive):
+        sys.exit(f"No fixtures in {args.archive}")
+
+    faults = FaultConfig(args.latency_ms, args.jitter_ms, args.error_rate,
+                         args.throttle_rate, args.hang_rate, args.hang_seconds)
+
+    import uvicorn
+    print(f"Replaying {len(archive)} fixtures on http://{args.host}:{args.port}")
+    uvicorn.run(ReplayApp(archive, faults, args.strict), host=args.host, port=args.port,
+                log_level='warning', access_log=False)
+
+
+if __name__ == '__main__':
+    main()
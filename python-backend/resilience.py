@@ -0,0 +1,348 @@
+"""
+Per-host resilience for outbound HTTP.
+
+Every upstream host (pricehistoryapp.com, news.google.com, the store sites)
+gets its own guard with:
+- a circuit breaker: after BREAKER_FAILURE_THRESHOLD consecutive failures the
+  host is skipped outright for BREAKER_RESET_TIMEOUT seconds, then a single
+  half-open probe decides whether to close it again
+- an AIMD rate limiter: the request rate creeps up on success and is cut
+  multiplicatively on 429/5xx, honouring Retry-After
+
+On top of that a deadline budget (a contextvar) caps the total time a caller
+is willing to spend on upstream calls, so one slow source can't hold up an
+endpoint. Request timeouts are clamped to what is left of the budget, and a
+request that couldn't finish in time fails fast with DeadlineExceeded.
+
+ResilientTransport / AsyncResilientTransport apply all of this underneath the
+shared httpx clients in http_client.py.
+"""
+
+import os
+import time
+import asyncio
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+BREAKER_FAILURE_THRESHOLD = int(os.environ.get('BREAKER_FAILURE_THRESHOLD', '5'))
+BREAKER_RESET_TIMEOUT = float(os.environ.get('BREAKER_RESET_TIMEOUT', '30'))
+RATE_INITIAL = float(os.environ.get('HOST_RATE_INITIAL', '10'))
+RATE_MIN = float(os.environ.get('HOST_RATE_MIN', '0.2'))
+RATE_MAX = float(os.environ.get('HOST_RATE_MAX', '50'))
+RATE_INCREASE = float(os.environ.get('HOST_RATE_INCREASE', '1'))
+RATE_DECREASE = float(os.environ.get('HOST_RATE_DECREASE', '0.5'))
+MAX_RETRY_AFTER = 300.0
+
+# Upstream answers that mean "back off", as opposed to "not found"
+THROTTLE_STATUS = {429, 503}
+
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar('deadline', default=None)
+
+
+class CircuitOpenError(httpx.TransportError):
+    """Host is failing; request was not sent"""
+
+
+class DeadlineExceeded(httpx.TimeoutException):
+    """The caller's deadline budget ran out before the request could complete"""
+
+
+# ---- deadline budget ----
+
+@contextmanager
+def deadline(seconds: float):
+    """
+    Limit upstream calls made inside the block to `seconds` in total.
+    Nested budgets never extend an outer one.
+    """
+    until = time.monotonic() + seconds
+    outer = _deadline.get()
+    token = _deadline.set(until if outer is None else min(outer, until))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left in the current budget, or None when there is no budget"""
+    until = _deadline.get()
+    if until is None:
+        return None
+    return max(0.0, until - time.monotonic())
+
+
+def _clamp_timeouts(request: httpx.Request, left: float):
+    timeout = dict(request.extensions.get('timeout') or {})
+    for name in ('connect', 'read', 'write', 'pool'):
+        current = timeout.get(name)
+        timeout[name] = left if current is None else min(current, left)
+    request.extensions = {**request.extensions, 'timeout': timeout}
+
+
+def _retry_after(response: httpx.Response) -> Optional[float]:
+    value = response.headers.get('retry-after')
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            seconds = parsedate_to_datetime(value).timestamp() - time.time()
+        except (TypeError, ValueError, IndexError):
+            return None
+    return min(MAX_RETRY_AFTER, max(0.0, seconds))
+
+
+# ---- per-host state ----
+
+class CircuitBreaker:
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+                 reset_timeout: float = BREAKER_RESET_TIMEOUT):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+
+    def allow(self) -> bool:
+        """Whether a request may go out now (claims the probe slot when half-open)"""
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN:
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                return False
+            self.state = self.HALF_OPEN
+            self._probe_in_flight = False
+        if self._probe_in_flight:
+            return False
+        self._probe_in_flight = True
+        return True
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self.failures = 0
+        self._probe_in_flight = False
+
+    def release_probe(self):
+        """The probe never reached the host (cancelled, out of budget); let another try"""
+        self._probe_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+            self._probe_in_flight = False
+
+    def retry_in(self) -> float:
+        if self.state != self.OPEN:
+            return 0.0
+        return max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+
+
+class AimdRateLimiter:
+    """
+    Request spacing for one host. Additive increase on success, multiplicative
+    decrease when the host pushes back.
+    """
+
+    def __init__(self, rate: float = RATE_INITIAL, min_rate: float = RATE_MIN, max_rate: float = RATE_MAX,
+                 increase: float = RATE_INCREASE, decrease: float = RATE_DECREASE):
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self._next_slot = 0.0
+
+    def reserve(self) -> float:
+        """Claim the next send slot; returns how long to wait for it"""
+        now = time.monotonic()
+        slot = max(now, self._next_slot)
+        self._next_slot = slot + 1.0 / self.rate
+        return slot - now
+
+    def release(self):
+        """Give back a slot that was reserved but not used"""
+        self._next_slot -= 1.0 / self.rate
+
+    def on_success(self):
+        self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def on_throttle(self, retry_after: Optional[float] = None):
+        self.rate = max(self.min_rate, self.rate * self.decrease)
+        if retry_after:
+            self._next_slot = max(self._next_slot, time.monotonic() + retry_after)
+
+
+class HostGuard:
+    """Breaker and rate limiter for one host"""
+
+    def __init__(self, host: str):
+        self.host = host
+        self.breaker = CircuitBreaker()
+        self.limiter = AimdRateLimiter()
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.rejected = 0
+        self.throttled = 0
+
+    def before_send(self) -> float:
+        """Check the breaker and reserve a slot; returns the wait before sending"""
+        left = remaining()
+        with self.lock:
+            if not self.breaker.allow():
+                self.rejected += 1
+                raise CircuitOpenError(f"Circuit open for {self.host}, retry in {self.breaker.retry_in():.0f}s")
+            wait = self.limiter.reserve()
+            if left is not None and wait >= left:
+                self.limiter.release()
+                self.breaker.release_probe()
+                raise DeadlineExceeded(f"{self.host} rate limit wait {wait:.1f}s exceeds deadline")
+            self.requests += 1
+            return wait
+
+    def after_response(self, response: httpx.Response):
+        with self.lock:
+            if response.status_code in THROTTLE_STATUS or response.status_code >= 500:
+                if response.status_code in THROTTLE_STATUS:
+                    self.throttled += 1
+                self.limiter.on_throttle(_retry_after(response))
+                self.breaker.record_failure()
+                if self.breaker.state == CircuitBreaker.OPEN:
+                    logger.warning(f"[{self.host}] circuit opened after HTTP {response.status_code}")
+            else:
+                self.limiter.on_success()
+                self.breaker.record_success()
+
+    def abandon(self, unused_slot: bool = False):
+        """The request didn't complete: free the probe, and its rate slot if it never went out"""
+        with self.lock:
+            self.breaker.release_probe()
+            if unused_slot:
+                self.limiter.release()
+
+    def after_error(self, error: Exception):
+        # Running out of our own budget says nothing about the host
+        if isinstance(error, DeadlineExceeded) or remaining() == 0:
+            self.abandon()
+            return
+        with self.lock:
+            self.breaker.record_failure()
+            if self.breaker.state == CircuitBreaker.OPEN:
+                logger.warning(f"[{self.host}] circuit opened after {error!r}")
+
+    def stats(self) -> Dict:
+        return {
+            'state': self.breaker.state,
+            'failures': self.breaker.failures,
+            'rate': round(self.limiter.rate, 2),
+            'requests': self.requests,
+            'rejected': self.rejected,
+            'throttled': self.throttled,
+        }
+
+
+class HostGuards:
+    def __init__(self):
+        self._guards: Dict[str, HostGuard] = {}
+        self._lock = threading.Lock()
+
+    def get(self, host: str) -> HostGuard:
+        guard = self._guards.get(host)
+        if guard is None:
+            with self._lock:
+                guard = self._guards.setdefault(host, HostGuard(host))
+        return guard
+
+    def stats(self) -> Dict[str, Dict]:
+        return {host: guard.stats() for host, guard in list(self._guards.items())}
+
+
+# ---- transports ----
+
+def _prepare(guards: HostGuards, request: httpx.Request):
+    guard = guards.get(request.url.host)
+    wait = guard.before_send()
+    return guard, wait
+
+
+def _apply_deadline(request: httpx.Request):
+    left = remaining()
+    if left is None:
+        return
+    if left <= 0:
+        raise DeadlineExceeded(f"Deadline exhausted before {request.url.host}", request=request)
+    _clamp_timeouts(request, left)
+
+
+class ResilientTransport(httpx.BaseTransport):
+    """Sync transport wrapper enforcing host guards and the deadline budget"""
+
+    def __init__(self, transport: httpx.BaseTransport, guards: Optional[HostGuards] = None):
+        self.transport = transport
+        self.guards = guards or host_guards
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        guard, wait = _prepare(self.guards, request)
+        if wait:
+            time.sleep(wait)
+        try:
+            _apply_deadline(request)
+            response = self.transport.handle_request(request)
+        except Exception as e:
+            guard.after_error(e)
+            raise
+        guard.after_response(response)
+        return response
+
+    def close(self):
+        self.transport.close()
+
+
+class AsyncResilientTransport(httpx.AsyncBaseTransport):
+    """Async counterpart of ResilientTransport for the scraping pool"""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, guards: Optional[HostGuards] = None):
+        self.transport = transport
+        self.guards = guards or host_guards
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        guard, wait = _prepare(self.guards, request)
+        sent = False
+        try:
+            if wait:
+                await asyncio.sleep(wait)
+            _apply_deadline(request)
+            sent = True
+            response = await self.transport.handle_async_request(request)
+        except asyncio.CancelledError:
+            # Cancelled in the rate-limit wait too: otherwise a half-open probe stays claimed forever
+            guard.abandon(unused_slot=not sent)
+            raise
+        except Exception as e:
+            guard.after_error(e)
+            raise
+        guard.after_response(response)
+        return response
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+
+# Global instance
+host_guards = HostGuards()
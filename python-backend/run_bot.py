@@ -1,7 +1,9 @@
 #!/usr/bin/env python3
 """
 Telegram Bot Runner
-Run this script to start the Telegram bot for price analysis and alerts.
+Run this script to start the Telegram bots for price analysis and alerts with
+long polling. When TELEGRAM_WEBHOOK_URL is set the backend serves the bots
+through webhooks instead and this script isn't needed.
 """
 
 import os
@@ -13,15 +15,21 @@ from pathlib import Path
 sys.path.append(str(Path(__file__).parent))
 
 from telegram_integration.bot import PriceAnalysisBot
+from telegram_integration.pool import load_bot_tokens
 
 async def main():
     """Main function to run the Telegram bot"""
     try:
         print("🤖 Starting Price Analysis Telegram Bot...")
 
+        if os.getenv('TELEGRAM_WEBHOOK_URL'):
+            print("ℹ️  TELEGRAM_WEBHOOK_URL is set; the backend receives updates by webhook")
+            return
+
         # Check for required environment variables
-        if not os.getenv('TELEGRAM_BOT_TOKEN'):
-            print("❌ TELEGRAM_BOT_TOKEN environment variable is required")
+        tokens = [token for _, token in load_bot_tokens()]
+        if not tokens:
+            print("❌ TELEGRAM_BOT_TOKEN_1 (or TELEGRAM_BOT_TOKEN) environment variable is required")
             print("Please set your bot token from @BotFather")
             return
 
@@ -29,9 +37,10 @@ async def main():
             print("❌ DATABASE_URL environment variable is required")
             return
 
-        # Create and run bot
-        bot = PriceAnalysisBot()
-        await bot.run()
+        # Create and run one polling bot per token
+        bots = [PriceAnalysisBot(token=token) for token in tokens]
+        print(f"📡 Polling with {len(bots)} bot(s)")
+        await asyncio.gather(*(bot.run() for bot in bots))
 
     except KeyboardInterrupt:
         print("\n🛑 Bot stopped by user")
@@ -36,6 +36,27 @@ def run_price_checker():
         print(f"Error running price checker: {e}")
         return False
 
+def run_notification_retention():
+    """Archive old notifications so the hot table stays small"""
+    try:
+        script_dir = Path(__file__).parent
+
+        result = subprocess.run([
+            sys.executable,
+            str(script_dir / "notification_retention.py")
+        ], capture_output=True, text=True, cwd=script_dir)
+
+        print("=== Notification Retention Results ===")
+        print(result.stdout)
+        if result.stderr:
+            print(result.stderr)
+
+        return result.returncode == 0
+
+    except Exception as e:
+        print(f"Error running notification retention: {e}")
+        return False
+
 def main():
     """Main function"""
     print("🔔 Starting Daily Price Alert Check...")
@@ -60,6 +81,10 @@ def main():
     # Run the price checker
     success = run_price_checker()
 
+    # Retention failures shouldn't mark the alert check as failed
+    if not run_notification_retention():
+        print("⚠️  Notification retention job failed")
+
     if success:
         print("✅ Daily price alert check completed successfully!")
     else:
@@ -0,0 +1,15 @@
+"""
+Native async store scrapers for the Python backend.
+Mirrors lib/search/*.ts: one extractor per store, run in parallel by ScrapeEngine.
+"""
+
+from scraping.types import ScrapedProduct
+from scraping.engine import ScrapeEngine, scrape_engine, scrape_products, find_best_match
+from scraping.stores import StoreExtractor, STORE_EXTRACTORS, register_store
+from scraping.cache import ScrapeCache, scrape_cache
+
+__all__ = [
+    'ScrapedProduct', 'ScrapeEngine', 'scrape_engine', 'scrape_products',
+    'find_best_match', 'StoreExtractor', 'STORE_EXTRACTORS', 'register_store',
+    'ScrapeCache', 'scrape_cache',
+]
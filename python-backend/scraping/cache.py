@@ -0,0 +1,351 @@
+"""
+Scrape result cache (the Python side of lib/search/cache.ts).
+
+- Memory tier: LRU bounded by entry count and approximate byte size
+- Disk tier (optional): sqlite file, survives restarts and is shared by every
+  process pointed at the same SCRAPE_CACHE_DIR (e.g. the gunicorn workers)
+- Per-source TTLs with stale-while-revalidate: a stale entry is served
+  immediately while one background refresh runs
+- Single-flight: concurrent misses for the same key share one upstream fetch
+"""
+
+import os
+import re
+import time
+import pickle
+import asyncio
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+from metrics import register_cache
+from resilience import DeadlineExceeded, remaining
+from scraping.utils import TRACKING_PARAMS
+
+logger = logging.getLogger(__name__)
+
+# (fresh seconds, stale-while-revalidate seconds) per source
+SOURCE_TTLS: Dict[str, Tuple[float, float]] = {
+    'search': (15 * 60, 60 * 60),          # store search results, same 15 min as cache.ts
+    'history': (6 * 60 * 60, 24 * 60 * 60),  # external price history changes slowly
+}
+DEFAULT_TTL = (15 * 60, 60 * 60)
+
+MAX_ENTRIES = int(os.environ.get('SCRAPE_CACHE_MAX_ENTRIES', '2048'))
+MAX_BYTES = int(os.environ.get('SCRAPE_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+CACHE_DIR = os.environ.get('SCRAPE_CACHE_DIR')
+
+WHITESPACE_RE = re.compile(r'\s+')
+
+
+@dataclass
+class CacheEntry:
+    value: Any
+    stored_at: float
+    fresh_until: float
+    stale_until: float
+    size: int
+
+    def is_fresh(self, now: float) -> bool:
+        return now < self.fresh_until
+
+    def is_usable(self, now: float) -> bool:
+        return now < self.stale_until
+
+
+class _SyncFlight:
+    """In-flight synchronous fetch that other threads can wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error: Optional[BaseException] = None
+
+
+def normalize_key(source: str, target: str) -> str:
+    """Cache key for a URL or a free-text query"""
+    target = target.strip()
+    if target.startswith(('http://', 'https://')):
+        parts = urlsplit(target)
+        params = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+                        if k not in TRACKING_PARAMS)
+        path = parts.path.rstrip('/') or '/'
+        target = urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, urlencode(params), ''))
+    else:
+        target = WHITESPACE_RE.sub(' ', target.lower())
+    return f"{source}:{target}"
+
+
+def is_empty(value: Any) -> bool:
+    """Empty results (no products, empty DataFrame) are never cached"""
+    if value is None:
+        return True
+    empty = getattr(value, 'empty', None)
+    if isinstance(empty, bool):
+        return empty
+    try:
+        return len(value) == 0
+    except TypeError:
+        return False
+
+
+class DiskTier:
+    """sqlite-backed second tier; values are pickled"""
+
+    def __init__(self, path: Path, max_entries: int = MAX_ENTRIES * 8):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with sqlite3.connect(str(path), timeout=5) as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS entries (
+                    key TEXT PRIMARY KEY,
+                    value BLOB NOT NULL,
+                    stored_at REAL NOT NULL,
+                    fresh_until REAL NOT NULL,
+                    stale_until REAL NOT NULL
+                )
+            """)
+        conn.close()
+
+    def _connection(self) -> sqlite3.Connection:
+        # A sqlite connection must not cross fork(): a process preloaded by
+        # gunicorn opens its own on first use
+        if self._pid != os.getpid():
+            self._conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=5)
+            self._pid = os.getpid()
+        return self._conn
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        with self._lock:
+            row = self._connection().execute(
+                'SELECT value, stored_at, fresh_until, stale_until FROM entries WHERE key = ?', (key,)
+            ).fetchone()
+        if not row:
+            return None
+        blob, stored_at, fresh_until, stale_until = row
+        try:
+            value = pickle.loads(blob)
+        except Exception:
+            return None
+        return CacheEntry(value, stored_at, fresh_until, stale_until, len(blob))
+
+    def set(self, key: str, blob: bytes, entry: CacheEntry):
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                'INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)',
+                (key, blob, entry.stored_at, entry.fresh_until, entry.stale_until)
+            )
+            conn.commit()
+
+    def purge(self):
+        """Drop expired rows, then the oldest rows beyond max_entries"""
+        with self._lock:
+            conn = self._connection()
+            conn.execute('DELETE FROM entries WHERE stale_until < ?', (time.time(),))
+            conn.execute("""
+                DELETE FROM entries WHERE key IN (
+                    SELECT key FROM entries ORDER BY stored_at DESC LIMIT -1 OFFSET ?
+                )
+            """, (self.max_entries,))
+            conn.commit()
+
+
+class ScrapeCache:
+    def __init__(self, max_entries: int = MAX_ENTRIES, max_bytes: int = MAX_BYTES,
+                 disk_dir: Optional[str] = CACHE_DIR, ttls: Optional[Dict[str, Tuple[float, float]]] = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttls = {**SOURCE_TTLS, **(ttls or {})}
+        self.disk = DiskTier(Path(disk_dir) / 'scrape_cache.sqlite3') if disk_dir else None
+
+        self._entries: 'OrderedDict[str, CacheEntry]' = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._inflight_sync: Dict[str, _SyncFlight] = {}
+        self._sets_since_purge = 0
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    # ---- storage ----
+
+    def get_entry(self, key: str) -> Optional[CacheEntry]:
+        """Usable (fresh or stale) entry from memory, then disk"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry.is_usable(now):
+                    self._entries.move_to_end(key)
+                    return entry
+                self._evict(key)
+
+        if self.disk:
+            entry = self.disk.get(key)
+            if entry is not None and entry.is_usable(now):
+                with self._lock:
+                    self._store(key, entry)
+                return entry
+        return None
+
+    def set(self, source: str, key: str, value: Any):
+        fresh_ttl, stale_ttl = self.ttls.get(source, DEFAULT_TTL)
+        now = time.time()
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        entry = CacheEntry(value, now, now + fresh_ttl, now + fresh_ttl + stale_ttl, len(blob))
+
+        with self._lock:
+            self._store(key, entry)
+
+        if self.disk:
+            try:
+                self.disk.set(key, blob, entry)
+                self._sets_since_purge += 1
+                if self._sets_since_purge >= 256:
+                    self._sets_since_purge = 0
+                    self.disk.purge()
+            except sqlite3.Error as e:
+                logger.warning(f"[ScrapeCache] Disk write failed: {e}")
+
+    def _store(self, key: str, entry: CacheEntry):
+        if key in self._entries:
+            self._evict(key)
+        self._entries[key] = entry
+        self._bytes += entry.size
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            self._evict(next(iter(self._entries)))
+
+    def _evict(self, key: str):
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    # ---- read-through ----
+
+    def _lookup(self, key: str) -> Tuple[Optional[CacheEntry], bool]:
+        """(entry, needs_refresh) and hit/miss accounting"""
+        entry = self.get_entry(key)
+        if entry is None:
+            self.misses += 1
+            return None, True
+        if entry.is_fresh(time.time()):
+            self.hits += 1
+            return entry, False
+        self.stale_hits += 1
+        return entry, True
+
+    async def get_or_fetch(self, source: str, target: str, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        """Cached value for (source, target), fetching at most once concurrently"""
+        key = normalize_key(source, target)
+        entry, needs_refresh = self._lookup(key)
+
+        if entry is not None:
+            if needs_refresh and key not in self._inflight:
+                # Stale-while-revalidate: answer now, refresh in the background
+                self._start_flight(source, key, fetch)
+            return entry.value
+
+        future = self._inflight.get(key)
+        if future is not None:
+            self.coalesced += 1
+        else:
+            future = self._start_flight(source, key, fetch)
+        return await asyncio.shield(future)
+
+    def _start_flight(self, source: str, key: str, fetch: Callable[[], Awaitable[Any]]) -> asyncio.Future:
+        async def run():
+            try:
+                value = await fetch()
+                if not is_empty(value):
+                    self.set(source, key, value)
+                return value
+            finally:
+                self._inflight.pop(key, None)
+
+        future = asyncio.ensure_future(run())
+        # Background refreshes may never be awaited; keep their errors out of the log noise
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._inflight[key] = future
+        return future
+
+    def get_or_fetch_sync(self, source: str, target: str, fetch: Callable[[], Any]) -> Any:
+        """Thread-based variant for the synchronous code paths"""
+        key = normalize_key(source, target)
+        entry, needs_refresh = self._lookup(key)
+
+        if entry is not None:
+            if needs_refresh:
+                flight, leader = self._join_sync_flight(key)
+                if leader:
+                    threading.Thread(target=self._run_sync_flight, args=(source, key, fetch, flight),
+                                     daemon=True).start()
+            return entry.value
+
+        flight, leader = self._join_sync_flight(key)
+        if leader:
+            self._run_sync_flight(source, key, fetch, flight)
+        else:
+            self.coalesced += 1
+            # Don't outwait our own deadline budget just because the leader has a longer one
+            if not flight.done.wait(remaining()):
+                raise DeadlineExceeded(f"Timed out waiting on in-flight fetch for {key}")
+        if flight.error is not None:
+            raise flight.error
+        return flight.value
+
+    def _join_sync_flight(self, key: str) -> Tuple[_SyncFlight, bool]:
+        with self._lock:
+            flight = self._inflight_sync.get(key)
+            if flight is not None:
+                return flight, False
+            flight = _SyncFlight()
+            self._inflight_sync[key] = flight
+            return flight, True
+
+    def _run_sync_flight(self, source: str, key: str, fetch: Callable[[], Any], flight: _SyncFlight):
+        try:
+            flight.value = fetch()
+            if not is_empty(flight.value):
+                self.set(source, key, flight.value)
+        except BaseException as e:
+            flight.error = e
+        finally:
+            with self._lock:
+                self._inflight_sync.pop(key, None)
+            flight.done.set()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'bytes': self._bytes,
+            'hits': self.hits,
+            'stale_hits': self.stale_hits,
+            'misses': self.misses,
+            'coalesced': self.coalesced,
+            'hit_rate': round((self.hits + self.stale_hits) / lookups, 3) if lookups else 0.0,
+            'disk': str(self.disk.path) if self.disk else None,
+        }
+
+
+# Global instance
+scrape_cache = ScrapeCache()
+register_cache('scrape', scrape_cache)
@@ -0,0 +1,110 @@
+import re
+import asyncio
+import logging
+from typing import Dict, Iterable, List, Optional
+
+from http_client import HttpPool, http_pool
+from scraping.cache import scrape_cache
+from scraping.identity import VARIANT_WORDS, distinguishing_tokens, normalize_tokens, token_match_score
+from scraping.stores import STORE_EXTRACTORS, StoreExtractor
+from scraping.types import ScrapedProduct
+from scraping.utils import is_accessory
+
+logger = logging.getLogger(__name__)
+
+DEDUPE_KEY_RE = re.compile(r'[^a-z0-9]')
+# A title must cover most of the query's tokens to count as a match
+MIN_MATCH_SCORE = 0.65
+
+
+class ScrapeEngine:
+    """
+    Runs every registered store extractor for a query in parallel over the
+    shared HTTP pool, then cleans the combined results the same way
+    lib/search/index.ts does (drop zero prices and accessories, dedupe titles).
+    """
+
+    def __init__(self, stores: Optional[Dict[str, StoreExtractor]] = None,
+                 pool: Optional[HttpPool] = None, store_timeout: float = 20.0):
+        self.stores = stores if stores is not None else STORE_EXTRACTORS
+        self.pool = pool or http_pool
+        self.store_timeout = store_timeout
+
+    async def search(self, query: str, store_names: Optional[Iterable[str]] = None) -> List[ScrapedProduct]:
+        stores = [self.stores[name] for name in store_names] if store_names else list(self.stores.values())
+        logger.info(f"Scraping {len(stores)} stores for: {query}")
+
+        results = await asyncio.gather(*(self._search_store(store, query) for store in stores))
+        combined = [product for store_results in results for product in store_results]
+
+        seen = set()
+        cleaned = []
+        for product in combined:
+            if product.price <= 0 or is_accessory(product.title, query):
+                continue
+            key = DEDUPE_KEY_RE.sub('', product.title.lower())[:30]
+            if key in seen:
+                continue
+            seen.add(key)
+            cleaned.append(product)
+
+        return cleaned
+
+    async def _search_store(self, store: StoreExtractor, query: str) -> List[ScrapedProduct]:
+        try:
+            response = await asyncio.wait_for(
+                self.pool.get(store.search_url(query), headers=store.headers),
+                timeout=self.store_timeout,
+            )
+            if response.status_code != 200:
+                logger.warning(f"[{store.name}] HTTP {response.status_code}")
+                return []
+
+            html = response.text
+            if store.is_blocked(html):
+                logger.warning(f"[{store.name}] Bot detection triggered")
+                return []
+
+            # Parsing is CPU-bound; keep it off the event loop
+            products = await asyncio.to_thread(store.parse, html, query)
+            logger.info(f"[{store.name}] Found {len(products)} products")
+            return products
+
+        except Exception as e:
+            logger.warning(f"[{store.name}] Scrape failed: {e!r}")
+            return []
+
+
+def find_best_match(products: List[ScrapedProduct], query: str) -> Optional[ScrapedProduct]:
+    """
+    Product whose title covers the query's tokens, preferring the tightest
+    title. Token sets make the match insensitive to word order and spacing
+    ("128 GB" vs "128GB"). Numbers, model codes and variant words in the query
+    must all be in the title, and the title's variant words in the query:
+    "iPhone 15 Pro" and "iPhone 15 Pro Max" never match each other. A title may
+    add numbers (capacity, colour code) to a query that leaves them out.
+    """
+    query_tokens = normalize_tokens(query)
+    required = distinguishing_tokens(query_tokens)
+    best_match = None
+    best_score = MIN_MATCH_SCORE
+
+    for product in products:
+        title_tokens = normalize_tokens(product.title)
+        if not required <= title_tokens or not title_tokens & VARIANT_WORDS <= query_tokens:
+            continue
+        score = token_match_score(query_tokens, title_tokens)
+        if score > best_score:
+            best_score = score
+            best_match = product
+
+    return best_match
+
+
+# Global instance
+scrape_engine = ScrapeEngine()
+
+
+async def scrape_products(query: str) -> List[ScrapedProduct]:
+    """Search all stores for a query using the shared engine (cached, single-flight)"""
+    return await scrape_cache.get_or_fetch('search', query, lambda: scrape_engine.search(query))
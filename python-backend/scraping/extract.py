@@ -0,0 +1,113 @@
+"""
+Fast HTML extraction helpers.
+
+DOM work goes through lxml (libxml2) with CSS selectors compiled to XPath once
+at import time. Embedded JSON (__NEXT_DATA__, Highcharts series) is pulled out
+of the raw HTML with precompiled regexes, so no tree is built at all for it.
+"""
+
+import re
+import json
+from typing import Any, Iterator, List, Optional, Tuple, Union
+
+import lxml.html
+from lxml.cssselect import CSSSelector
+from bs4 import BeautifulSoup
+
+SCRIPT_RE = re.compile(r'<script\b[^>]*>(.*?)</script\s*>', re.S | re.I)
+NEXT_DATA_RE = re.compile(
+    r'<script\b[^>]*\bid\s*=\s*["\']?__NEXT_DATA__["\']?[^>]*>(.*?)</script\s*>', re.S | re.I
+)
+CHART_CATEGORIES_RE = re.compile(r'categories"?\s*:\s*(\[[^\]]*\])')
+CHART_DATA_RE = re.compile(r'\bdata"?\s*:\s*(\[[^\]]*\])')
+
+# Keys that hold a list of {date, price} points in tracker sites' page data
+PRICE_HISTORY_KEYS = ('priceHistory', 'price_history', 'history', 'prices')
+
+
+class Selector:
+    """CSS selector compiled to XPath once and reused across documents"""
+
+    def __init__(self, css: str):
+        self.css = css
+        self._xpath = CSSSelector(css, translator='html')
+
+    def all(self, tree) -> List:
+        return self._xpath(tree)
+
+    def first(self, tree):
+        matches = self._xpath(tree)
+        return matches[0] if matches else None
+
+    def __repr__(self):
+        return f"Selector({self.css!r})"
+
+
+def parse_html(html: Union[str, bytes]):
+    """Parse a page into an lxml tree"""
+    return lxml.html.fromstring(html)
+
+
+def make_soup(html: Union[str, bytes]) -> BeautifulSoup:
+    """BeautifulSoup on the lxml tree builder (several times faster than html.parser)"""
+    return BeautifulSoup(html, 'lxml')
+
+
+def iter_scripts(html: str) -> Iterator[str]:
+    """Inline <script> bodies straight from the raw HTML"""
+    for match in SCRIPT_RE.finditer(html):
+        body = match.group(1)
+        if body.strip():
+            yield body
+
+
+def extract_next_data(html: str) -> Optional[dict]:
+    """Parsed __NEXT_DATA__ JSON of a Next.js page, if present"""
+    match = NEXT_DATA_RE.search(html)
+    if not match:
+        return None
+    try:
+        return json.loads(match.group(1))
+    except ValueError:
+        return None
+
+
+def extract_chart_series(html: str) -> Optional[Tuple[List[Any], List[Any]]]:
+    """(categories, data) of the first Highcharts-style series with matching lengths"""
+    for script in iter_scripts(html):
+        if 'Highcharts' not in script and 'Chart' not in script:
+            continue
+        categories_match = CHART_CATEGORIES_RE.search(script)
+        data_match = CHART_DATA_RE.search(script)
+        if not categories_match or not data_match:
+            continue
+        try:
+            categories = json.loads(categories_match.group(1))
+            data = json.loads(data_match.group(1))
+        except ValueError:
+            continue
+        if categories and len(categories) == len(data):
+            return categories, data
+    return None
+
+
+def find_price_history(node: Any, depth: int = 0) -> Optional[List[dict]]:
+    """Depth-first search of page JSON for a list of price points"""
+    if depth > 12:
+        return None
+    if isinstance(node, dict):
+        for key in PRICE_HISTORY_KEYS:
+            value = node.get(key)
+            if isinstance(value, list) and value and isinstance(value[0], dict):
+                return value
+        children = node.values()
+    elif isinstance(node, list):
+        children = node
+    else:
+        return None
+
+    for child in children:
+        found = find_price_history(child, depth + 1)
+        if found:
+            return found
+    return None
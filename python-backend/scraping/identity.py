@@ -0,0 +1,98 @@
+"""
+Title normalization and identifier extraction for product matching.
+
+Two listings are treated as the same product when they share a strong
+identifier (ASIN, Flipkart PID, clean URL, manufacturer model number) or when
+their normalized token sets overlap enough. Token sets ignore word order, so
+"Apple iPhone 15 (Black, 128 GB)" and "iPhone 15 128GB Black - Apple" match.
+"""
+
+import re
+from typing import AbstractSet, Collection, FrozenSet, Optional, Set
+
+from scraping.utils import ASIN_RE, FLIPKART_PID_RE, clean_product_url
+
+# "128 GB" -> "128gb", "6.1 inch" -> "6.1inch", so capacities stay one token
+UNIT_RE = re.compile(r'(\d+(?:\.\d+)?)\s*(gb|tb|mb|mah|hz|mp|w|inch|inches|cm|mm|kg|l)\b')
+TOKEN_RE = re.compile(r'[a-z0-9]+(?:\.[0-9]+)?')
+# Mixed letters and digits, optionally hyphenated/slashed: SM-S921B, MU6T3HN/A, WH-1000XM5
+MODEL_RE = re.compile(r'\b(?=[A-Z0-9/-]*\d)(?=[A-Z0-9/-]*[A-Z])[A-Z0-9][A-Z0-9/-]{3,}[A-Z0-9]\b')
+UNIT_ONLY_RE = re.compile(r'^\d+(?:GB|TB|MB|MAH|HZ|MP|W|INCH|CM|MM|KG|L|G|K|P)$')
+
+STOPWORDS = frozenset({
+    'a', 'an', 'and', 'the', 'with', 'for', 'of', 'in', 'to', 'by', 'on', 'new', 'latest',
+    'edition', 'version', 'india', 'free', 'combo', 'pack', 'set',
+})
+# Letter+digit words that are categories or standards, not models
+GENERIC_CODES = frozenset({
+    'DDR3', 'DDR4', 'DDR5', 'LPDDR4', 'LPDDR5', 'LPDDR5X', 'GDDR6', 'GDDR6X', 'PCIE4', 'PCIE5',
+    'USB2', 'USB3', 'WIFI6', 'WIFI6E', 'WIFI7', 'HDMI2', 'NVME2', 'IP67', 'IP68', '1080P', '1440P', '2160P',
+})
+# Words that make a different model of the same line ("iPhone 15 Pro" vs "iPhone 15 Pro Max")
+VARIANT_WORDS = frozenset({'pro', 'max', 'plus', 'ultra', 'mini', 'lite', 'fe', 'se', 'note', 'fold', 'flip'})
+# A size or capacity token after UNIT_RE: "256gb", "6.1inch"
+SIZE_RE = re.compile(r'^\d+(?:\.\d+)?(?:gb|tb|mb|mah|hz|mp|w|inch|inches|cm|mm|kg|l)$')
+
+
+def normalize_tokens(title: str) -> FrozenSet[str]:
+    """Order-insensitive token set for a product title"""
+    text = UNIT_RE.sub(r'\1\2', (title or '').lower().replace('&', ' and '))
+    return frozenset(t for t in TOKEN_RE.findall(text) if t not in STOPWORDS)
+
+
+def distinguishing_tokens(tokens: AbstractSet[str]) -> FrozenSet[str]:
+    """
+    Tokens a title must contain to be the queried product rather than a
+    sibling: numbers, capacities and model codes, and variant words.
+    """
+    return frozenset(t for t in tokens if t in VARIANT_WORDS or any(c.isdigit() for c in t))
+
+
+def variant_tokens(tokens: AbstractSet[str]) -> FrozenSet[str]:
+    """
+    Variant words and sizes: two titles are one product only if they have the
+    same ones ("Pro" is not "Pro Max", "256 GB" is not "512 GB"). Model codes
+    aren't included; one store's title often leaves them out.
+    """
+    return frozenset(t for t in tokens if t in VARIANT_WORDS or SIZE_RE.match(t))
+
+
+def model_numbers(title: str) -> Set[str]:
+    models = set()
+    for raw in MODEL_RE.findall((title or '').upper()):
+        code = raw.replace('-', '').replace('/', '')
+        if len(code) >= 5 and code not in GENERIC_CODES and not UNIT_ONLY_RE.match(code):
+            models.add(code)
+    return models
+
+
+def extract_identifiers(title: str = '', url: Optional[str] = None) -> Set[str]:
+    """Strong identifiers as 'kind:value' strings"""
+    identifiers = {f"model:{m}" for m in model_numbers(title)}
+    if url:
+        asin = ASIN_RE.search(url)
+        if asin and ('amazon' in url or 'amzn' in url):
+            identifiers.add(f"asin:{asin.group(1)}")
+        if 'flipkart' in url:
+            pid = FLIPKART_PID_RE.search(url)
+            if pid:
+                identifiers.add(f"fkpid:{pid.group(1)}")
+        clean = clean_product_url(url)
+        if clean:
+            identifiers.add(f"url:{clean}")
+    return identifiers
+
+
+def token_match_score(query: AbstractSet, title: Collection) -> float:
+    """
+    How well a title answers a query: the share of query tokens it contains,
+    nudged by Jaccard so tighter titles win ties.
+    """
+    if not query:
+        return 0.0
+    common = len(query.intersection(title))
+    if not common:
+        return 0.0
+    containment = common / len(query)
+    jaccard = common / (len(query) + len(title) - common)
+    return 0.8 * containment + 0.2 * jaccard
@@ -0,0 +1,27 @@
+from typing import Dict
+
+from scraping.stores.base import StoreExtractor
+from scraping.stores.amazon import AmazonExtractor
+from scraping.stores.flipkart import FlipkartExtractor
+from scraping.stores.croma import CromaExtractor
+from scraping.stores.reliance import RelianceExtractor
+from scraping.stores.snapdeal import SnapdealExtractor
+
+# Stores queried by default, keyed by name
+STORE_EXTRACTORS: Dict[str, StoreExtractor] = {}
+
+
+def register_store(extractor: StoreExtractor):
+    """Add (or replace) a store extractor used by ScrapeEngine"""
+    STORE_EXTRACTORS[extractor.name] = extractor
+
+
+for _extractor in (AmazonExtractor(), FlipkartExtractor(), CromaExtractor(),
+                   RelianceExtractor(), SnapdealExtractor()):
+    register_store(_extractor)
+
+__all__ = [
+    'StoreExtractor', 'STORE_EXTRACTORS', 'register_store',
+    'AmazonExtractor', 'FlipkartExtractor', 'CromaExtractor',
+    'RelianceExtractor', 'SnapdealExtractor',
+]
@@ -0,0 +1,79 @@
+from typing import List
+from urllib.parse import quote_plus
+
+from scraping.extract import make_soup
+from scraping.stores.base import StoreExtractor
+from scraping.types import ScrapedProduct
+from scraping.utils import parse_price, absolute_url, clean_product_url
+
+
+class AmazonExtractor(StoreExtractor):
+    """Amazon India search results (port of lib/search/amazon.ts)"""
+
+    name = 'Amazon'
+    base_url = 'https://www.amazon.in'
+    blocked_markers = ('Enter the characters you see below', 'captcha')
+
+    def search_url(self, query: str) -> str:
+        return f"{self.base_url}/s?k={quote_plus(query)}"
+
+    def parse(self, html: str, query: str) -> List[ScrapedProduct]:
+        soup = make_soup(html)
+        results = []
+
+        # METHOD 1: data-component-type="s-search-result" (most reliable)
+        for card in soup.select('[data-component-type="s-search-result"]'):
+            asin = card.get('data-asin')
+            if not asin:
+                continue
+
+            title_el = card.select_one('h2 span, h2 a span')
+            price = parse_price(self._text(card.select_one('.a-price-whole')))
+            title = self._text(title_el)
+            if not title or not price:
+                continue
+
+            mrp = parse_price(self._text(card.select_one('.a-text-price .a-offscreen'))) or price
+            image_el = card.select_one('img.s-image')
+            link_el = card.select_one('h2 a, a.a-link-normal.s-no-outline')
+            href = link_el.get('href') if link_el else None
+            rating_text = self._text(card.select_one('.a-icon-star-small .a-icon-alt, .a-icon-star .a-icon-alt'))
+            rating_count = parse_price(self._text(card.select_one('span[aria-label*="ratings"], .a-size-base.s-underline-text')))
+
+            results.append(ScrapedProduct(
+                title=title,
+                price=price,
+                mrp=mrp,
+                image=image_el.get('src', '') if image_el else '',
+                rating=self._rating(rating_text),
+                rating_count=int(rating_count or 0),
+                seller='Amazon',
+                source=self.name,
+                product_url=clean_product_url(absolute_url(href, self.base_url) or f"{self.base_url}/dp/{asin}"),
+            ))
+
+        # METHOD 2: older result markup
+        if not results:
+            for card in soup.select('.s-result-item'):
+                title = self._text(card.select_one('h2 span'))
+                price = parse_price(self._text(card.select_one('.a-price-whole')))
+                link_el = card.select_one('a')
+                if title and price and len(title) > 5:
+                    image_el = card.select_one('img')
+                    results.append(ScrapedProduct(
+                        title=title,
+                        price=price,
+                        image=image_el.get('src', '') if image_el else '',
+                        seller='Amazon',
+                        source=self.name,
+                        product_url=clean_product_url(absolute_url(link_el.get('href') if link_el else None, self.base_url)),
+                    ))
+
+        return results
+
+    @staticmethod
+    def _rating(text: str) -> float:
+        try:
+            return float(text.split(' ')[0])
+        except (ValueError, IndexError):
+            return 0.0
@@ -0,0 +1,49 @@
+from typing import Dict, List, Tuple
+
+from scraping.types import ScrapedProduct
+from scraping.utils import FIREFOX_HEADERS, find_rupee_price
+
+
+class StoreExtractor:
+    """
+    One store's search page: where to fetch it and how to turn the HTML into
+    ScrapedProducts. Subclasses only parse; fetching, pooling and concurrency
+    are handled by ScrapeEngine.
+    """
+
+    name = 'Unknown'
+    base_url = ''
+    headers: Dict[str, str] = FIREFOX_HEADERS
+    # Substrings that mean we got a bot wall instead of results
+    blocked_markers: Tuple[str, ...] = ()
+
+    def search_url(self, query: str) -> str:
+        raise NotImplementedError
+
+    def parse(self, html: str, query: str) -> List[ScrapedProduct]:
+        raise NotImplementedError
+
+    def is_blocked(self, html: str) -> bool:
+        return any(marker in html for marker in self.blocked_markers)
+
+    @staticmethod
+    def _text(el) -> str:
+        return el.get_text(strip=True) if el else ''
+
+
+def first_two_prices(elements):
+    """Selling price and MRP: the first two distinct ₹ amounts in document order"""
+    price = mrp = None
+    for el in elements:
+        text = el.get_text(strip=True)
+        if '₹' not in text:
+            continue
+        amount = find_rupee_price(text)
+        if not amount:
+            continue
+        if price is None:
+            price = amount
+        elif amount != price:
+            mrp = amount
+            break
+    return price, mrp
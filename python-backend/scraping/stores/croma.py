@@ -0,0 +1,72 @@
+from typing import List
+from urllib.parse import quote
+
+from scraping.extract import make_soup, extract_next_data
+from scraping.stores.base import StoreExtractor, first_two_prices
+from scraping.types import ScrapedProduct
+from scraping.utils import absolute_url
+
+
+class CromaExtractor(StoreExtractor):
+    """Croma search results (port of lib/search/croma.ts)"""
+
+    name = 'Croma'
+    base_url = 'https://www.croma.com'
+    blocked_markers = ('blocked', 'captcha')
+
+    def search_url(self, query: str) -> str:
+        encoded = quote(query)
+        return f"{self.base_url}/searchB?q={encoded}%3Arelevance&page=0&text={encoded}"
+
+    def parse(self, html: str, query: str) -> List[ScrapedProduct]:
+        soup = make_soup(html)
+        results = []
+
+        # METHOD 1: product cards with data attributes
+        for card in soup.select('[data-productcode], [data-product], .product-item, .cp-product'):
+            link_el = card.select_one('a')
+            title = self._text(card.select_one('.product-title, .product-name, h3, h4'))
+            if not title:
+                titled = card.select_one('a[title]')
+                title = titled.get('title', '') if titled else ''
+
+            price, mrp = first_two_prices(card.find_all(['span', 'div']))
+            if not title or not price or len(title) <= 3:
+                continue
+
+            image_el = card.select_one('img')
+            image = (image_el.get('src') or image_el.get('data-src') or '') if image_el else ''
+            results.append(ScrapedProduct(
+                title=title,
+                price=price,
+                mrp=mrp or price,
+                image=absolute_url(image, self.base_url) if image.startswith('//') else image,
+                seller='Croma',
+                source=self.name,
+                product_url=absolute_url(link_el.get('href') if link_el else None, self.base_url) or self.search_url(query),
+            ))
+
+        # METHOD 2: Next.js page data
+        if not results:
+            next_data = extract_next_data(html)
+            if next_data:
+                try:
+                    page_props = next_data.get('props', {}).get('pageProps', {})
+                    products = page_props.get('products') or page_props.get('searchResult', {}).get('products') or []
+                    for p in products:
+                        price = float(p.get('price') or p.get('salePrice') or 0)
+                        if p.get('name') and price > 0:
+                            results.append(ScrapedProduct(
+                                title=p['name'],
+                                price=price,
+                                mrp=float(p.get('mrp') or price),
+                                image=p.get('image') or p.get('plpImage') or '',
+                                seller='Croma',
+                                source=self.name,
+                                product_url=absolute_url(p.get('url'), self.base_url) or self.search_url(query),
+                            ))
+                except (ValueError, TypeError, AttributeError):
+                    pass
+
+        return results
+
@@ -0,0 +1,88 @@
+from typing import List
+from urllib.parse import quote_plus
+
+from scraping.extract import make_soup
+from scraping.stores.base import StoreExtractor
+from scraping.types import ScrapedProduct
+from scraping.utils import parse_price, absolute_url
+
+TITLE_SELECTOR = 'div.KzDlHZ, a.wjcEIp, a.s1Q9rs, div._4rR01T, .IRpwTa'
+RATING_SELECTOR = 'div.XQDdHH, div._3LWZlK'
+
+
+class FlipkartExtractor(StoreExtractor):
+    """Flipkart search results (port of lib/search/flipkart.ts)"""
+
+    name = 'Flipkart'
+    base_url = 'https://www.flipkart.com'
+    blocked_markers = ('Are you a human?', 'Retry in ')
+
+    def search_url(self, query: str) -> str:
+        return f"{self.base_url}/search?q={quote_plus(query)}&marketplace=FLIPKART"
+
+    def parse(self, html: str, query: str) -> List[ScrapedProduct]:
+        soup = make_soup(html)
+        results = []
+
+        # METHOD 1: cards carry a stable data-id attribute
+        for card in soup.select('div[data-id]'):
+            link_el = card.select_one('a')
+            title = (link_el.get('title') if link_el else '') or self._text(card.select_one(TITLE_SELECTOR))
+            if title == 'Sponsored':
+                title = ''
+
+            # First standalone "₹..." block is the selling price, the second the MRP
+            prices = []
+            for div in card.find_all('div'):
+                text = div.get_text(strip=True)
+                if text.startswith('₹') and text.count('₹') == 1:
+                    price = parse_price(text)
+                    if price:
+                        prices.append(price)
+                    if len(prices) == 2:
+                        break
+
+            if not title or not prices:
+                continue
+
+            image_el = card.select_one('img')
+            results.append(ScrapedProduct(
+                title=title,
+                price=prices[0],
+                mrp=prices[1] if len(prices) > 1 else prices[0],
+                image=image_el.get('src', '') if image_el else '',
+                rating=self._rating(self._text(card.select_one(RATING_SELECTOR))),
+                seller='Flipkart',
+                source=self.name,
+                product_url=absolute_url(link_el.get('href') if link_el else None, self.base_url),
+            ))
+
+        # METHOD 2: common container classes
+        if not results:
+            for card in soup.select('div._1AtVbE, div._13oc-S, div.tUxRFH, div.cPHDOP'):
+                title = self._text(card.select_one(TITLE_SELECTOR))
+                price = parse_price(self._text(card.select_one('div.Nx9bqj, div._30jeq3')))
+                if not title or not price:
+                    continue
+                mrp = parse_price(self._text(card.select_one('div.yRaY8j, div._3I9_wc'))) or price
+                image_el = card.select_one('img')
+                link_el = card.select_one('a')
+                results.append(ScrapedProduct(
+                    title=title,
+                    price=price,
+                    mrp=mrp,
+                    image=image_el.get('src', '') if image_el else '',
+                    rating=self._rating(self._text(card.select_one(RATING_SELECTOR))),
+                    seller='Flipkart',
+                    source=self.name,
+                    product_url=absolute_url(link_el.get('href') if link_el else None, self.base_url),
+                ))
+
+        return results
+
+    @staticmethod
+    def _rating(text: str) -> float:
+        try:
+            return float(text)
+        except ValueError:
+            return 0.0
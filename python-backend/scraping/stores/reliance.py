@@ -0,0 +1,89 @@
+from typing import List
+from urllib.parse import quote_plus
+
+from scraping.extract import make_soup, extract_next_data
+from scraping.stores.base import StoreExtractor, first_two_prices
+from scraping.types import ScrapedProduct
+from scraping.utils import absolute_url, find_rupee_price
+
+
+class RelianceExtractor(StoreExtractor):
+    """Reliance Digital search results (port of lib/search/reliance.ts)"""
+
+    name = 'Reliance'
+    base_url = 'https://www.reliancedigital.in'
+    blocked_markers = ('blocked', 'captcha', 'Access Denied')
+
+    def search_url(self, query: str) -> str:
+        return f"{self.base_url}/search?q={quote_plus(query)}"
+
+    def parse(self, html: str, query: str) -> List[ScrapedProduct]:
+        soup = make_soup(html)
+        results = []
+
+        # METHOD 1: product cards with data attributes
+        for card in soup.select('[data-testid*="product"], [data-product-id], .sp__product, .product-item'):
+            link_el = card.select_one('a')
+            title = self._text(card.select_one('.sp__name, .product-title, h3, h4, [class*="name"]'))
+            if not title and link_el:
+                title = link_el.get('title', '')
+
+            price, mrp = first_two_prices(card.find_all(['span', 'div', 'p']))
+            if not title or not price or len(title) <= 3:
+                continue
+
+            image_el = card.select_one('img')
+            image = (image_el.get('src') or image_el.get('data-src') or '') if image_el else ''
+            results.append(ScrapedProduct(
+                title=title,
+                price=price,
+                mrp=mrp or price,
+                image=absolute_url(image, self.base_url) if image.startswith('//') else image,
+                seller='Reliance Digital',
+                source=self.name,
+                product_url=absolute_url(link_el.get('href') if link_el else None, self.base_url) or self.search_url(query),
+            ))
+
+        # METHOD 2: Next.js page data
+        if not results:
+            next_data = extract_next_data(html)
+            if next_data:
+                try:
+                    page_props = next_data.get('props', {}).get('pageProps', {})
+                    products = (page_props.get('products')
+                                or page_props.get('searchData', {}).get('products')
+                                or page_props.get('initialData', {}).get('products')
+                                or [])
+                    for p in products:
+                        price = float(p.get('price') or p.get('sellingPrice') or p.get('salePrice') or 0)
+                        if p.get('name') and price > 0:
+                            results.append(ScrapedProduct(
+                                title=p['name'],
+                                price=price,
+                                mrp=float(p.get('mrp') or price),
+                                image=p.get('image') or p.get('plpImage') or '',
+                                seller='Reliance Digital',
+                                source=self.name,
+                                product_url=absolute_url(p.get('url'), self.base_url) or self.search_url(query),
+                            ))
+                except (ValueError, TypeError, AttributeError):
+                    pass
+
+        # METHOD 3: any product link with a price in its container
+        if not results:
+            for link_el in soup.select('a[href*="/p/"]'):
+                title = link_el.get_text(strip=True) or link_el.get('title', '')
+                container = link_el.find_parent(['li', 'div'])
+                price = find_rupee_price(container.get_text(' ', strip=True)) if container else None
+                if title and price and len(title) > 5:
+                    image_el = container.select_one('img')
+                    results.append(ScrapedProduct(
+                        title=title,
+                        price=price,
+                        image=image_el.get('src', '') if image_el else '',
+                        seller='Reliance Digital',
+                        source=self.name,
+                        product_url=absolute_url(link_el.get('href'), self.base_url),
+                    ))
+
+        return results
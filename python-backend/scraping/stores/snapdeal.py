@@ -0,0 +1,57 @@
+import re
+from typing import List
+from urllib.parse import quote_plus
+
+from scraping.extract import make_soup
+from scraping.stores.base import StoreExtractor
+from scraping.types import ScrapedProduct
+from scraping.utils import FIREFOX_HEADERS, parse_price, absolute_url
+
+STAR_WIDTH_RE = re.compile(r'width:\s*([0-9.]+)%')
+
+
+class SnapdealExtractor(StoreExtractor):
+    """Snapdeal search results (port of lib/search/snapdeal.ts)"""
+
+    name = 'Snapdeal'
+    base_url = 'https://www.snapdeal.com'
+    headers = {**FIREFOX_HEADERS, 'Referer': 'https://www.snapdeal.com/'}
+
+    def search_url(self, query: str) -> str:
+        return f"{self.base_url}/search?keyword={quote_plus(query)}&sort=rlvncy"
+
+    def parse(self, html: str, query: str) -> List[ScrapedProduct]:
+        soup = make_soup(html)
+        results = []
+
+        for card in soup.select('.product-tuple-listing, [data-widget-type="widget"], .product-item'):
+            title = self._text(card.select_one('.product-title, .product-name, h4'))
+            price = parse_price(self._text(card.select_one('.product-price, .lfloat.product-price')))
+            if not title or not price:
+                continue
+
+            mrp = parse_price(self._text(card.select_one('.product-desc-price, .pdp-mrp'))) or price
+            image_el = card.select_one('img.product-image') or card.select_one('img')
+            link_el = card.select_one('a.dp-widget-link, a')
+            rating_count = parse_price(self._text(card.select_one('.product-rating-count, .rating-count')))
+
+            # Snapdeal renders stars as a width percentage (80% = 4 stars)
+            rating = 0.0
+            stars = card.select_one('.filled-stars')
+            width_match = STAR_WIDTH_RE.search(stars.get('style', '')) if stars else None
+            if width_match:
+                rating = round(float(width_match.group(1)) / 100 * 5, 1)
+
+            results.append(ScrapedProduct(
+                title=title,
+                price=price,
+                mrp=mrp,
+                image=image_el.get('src', '') if image_el else '',
+                rating=rating,
+                rating_count=int(rating_count or 0),
+                seller='Snapdeal',
+                source=self.name,
+                product_url=absolute_url(link_el.get('href') if link_el else None, self.base_url) or self.search_url(query),
+            ))
+
+        return results
@@ -0,0 +1,27 @@
+from dataclasses import dataclass, asdict
+from typing import Dict, Optional
+
+
+@dataclass
+class ScrapedProduct:
+    """One search result from a store (mirrors UnifiedSearchResult in lib/search/types.ts)"""
+    title: str
+    price: float
+    source: str
+    product_url: str
+    mrp: Optional[float] = None
+    image: str = ''
+    rating: float = 0.0
+    rating_count: int = 0
+    seller: Optional[str] = None
+
+    @property
+    def discount(self) -> int:
+        if self.mrp and self.mrp > self.price:
+            return round((self.mrp - self.price) / self.mrp * 100)
+        return 0
+
+    def to_dict(self) -> Dict:
+        data = asdict(self)
+        data['discount'] = self.discount
+        return data
@@ -0,0 +1,94 @@
+import re
+from typing import Optional
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+# Firefox headers - same set the TypeScript scrapers use (more reliable than Chrome)
+FIREFOX_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:138.0) Gecko/20100101 Firefox/138.0',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8',
+    'Accept-Language': 'en-IN,en;q=0.9',
+    'Upgrade-Insecure-Requests': '1',
+    'Sec-Fetch-Dest': 'document',
+    'Sec-Fetch-Mode': 'navigate',
+    'Sec-Fetch-Site': 'none',
+    'Sec-Fetch-User': '?1',
+    'Cache-Control': 'max-age=0',
+}
+
+ACCESSORY_KEYWORDS = [
+    'case', 'cover', 'back cover', 'tempered glass', 'screen protector',
+    'pouch', 'wallet case', 'wallet flip', 'wallet', 'strap', 'wristband',
+    'charger cable', 'usb cable', 'protector', 'skin', 'sticker', 'lens protector',
+    'mount', 'holder', 'stand', 'stylus pen'
+]
+
+TRACKING_PARAMS = {
+    'ref', 'ref_', 'qid', 'sr', 'keywords', 'dib', 'dib_tag',
+    'crid', 'sprefix', 'psc', 'smid', 'linkCode', 'tag', 'ascsubtag',
+    'pf_rd_r', 'pf_rd_p', 'pd_rd_r', 'pd_rd_w', 'pd_rd_wg', 'clnoe'
+}
+
+RUPEE_PRICE_RE = re.compile(r'₹\s*([\d,]+)')
+NON_DIGIT_RE = re.compile(r'[^0-9]')
+ASIN_RE = re.compile(r'/(?:dp|gp/product)/([A-Z0-9]{10})')
+FLIPKART_PID_RE = re.compile(r'pid=([A-Z0-9]{10,})')
+
+
+def parse_price(text: Optional[str]) -> Optional[float]:
+    """'₹1,23,999.00' -> 123999.0 (keeps only the integer rupee part)"""
+    if not text:
+        return None
+    digits = NON_DIGIT_RE.sub('', text.split('.')[0])
+    return float(digits) if digits else None
+
+
+def find_rupee_price(text: str) -> Optional[float]:
+    """First '₹ 12,345' amount in a block of text"""
+    match = RUPEE_PRICE_RE.search(text)
+    if match:
+        return float(match.group(1).replace(',', ''))
+    return None
+
+
+def absolute_url(href: Optional[str], base: str) -> str:
+    if not href:
+        return ''
+    if href.startswith('//'):
+        return f"https:{href}"
+    if href.startswith('http'):
+        return href
+    return f"{base}{href}"
+
+
+def clean_product_url(url: Optional[str]) -> str:
+    """Canonical product URL without tracking params (port of lib/url-utils.ts)"""
+    if not url:
+        return ''
+
+    parts = urlsplit(url)
+    host = parts.hostname or ''
+
+    asin_match = ASIN_RE.search(url)
+    if asin_match and ('amazon' in url or 'amzn' in url):
+        return f"https://{host or 'www.amazon.in'}/dp/{asin_match.group(1)}"
+
+    if 'flipkart' in url:
+        pid_match = FLIPKART_PID_RE.search(url)
+        if pid_match:
+            host = host or 'www.flipkart.com'
+            if '/p/' in parts.path:
+                return f"https://{host}{parts.path}?pid={pid_match.group(1)}"
+            return f"https://{host}/product/p/itme?pid={pid_match.group(1)}"
+
+    query = urlencode([(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+                       if k not in TRACKING_PARAMS])
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, query, ''))
+
+
+def is_accessory(title: str, query: str) -> bool:
+    """True when the title is an accessory but the query wasn't asking for one"""
+    lower_query = query.lower()
+    if any(kw in lower_query for kw in ACCESSORY_KEYWORDS):
+        return False
+    lower_title = title.lower()
+    return any(kw in lower_title for kw in ACCESSORY_KEYWORDS)
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Run the backend with pre-forked workers (production mode, see serving.py).
+
+Usage:
+  python serve.py            start gunicorn with gunicorn.conf.py
+  python serve.py reload     zero-downtime restart onto new code
+  python serve.py workers    replace the workers one by one (config changes)
+  python serve.py stop       finish in-flight requests, then exit
+  python serve.py status
+
+`reload` starts a second master from the current code (USR2), waits until
+its workers answer, then gracefully stops the old master, so the port never
+stops accepting connections. `workers` (HUP) re-reads gunicorn.conf.py and
+swaps the workers, but with preload_app they keep the code already loaded.
+"""
+
+import os
+import sys
+import time
+import signal
+from pathlib import Path
+
+import httpx
+
+sys.path.append(str(Path(__file__).parent))
+
+from serving import STATE_DIR
+
+PIDFILE = Path(STATE_DIR) / 'gunicorn.pid'
+HEALTH_URL = f"http://127.0.0.1:{os.environ.get('PORT', '8000')}/"
+
+
+def master_pid(pidfile: Path = PIDFILE):
+    try:
+        pid = int(pidfile.read_text().strip())
+        os.kill(pid, 0)
+        return pid
+    except (OSError, ValueError):
+        return None
+
+
+def worker_pids(master: int):
+    try:
+        return Path(f"/proc/{master}/task/{master}/children").read_text().split()
+    except OSError:
+        return []
+
+
+def start():
+    here = Path(__file__).parent
+    # The console script rather than `python -m gunicorn`: on USR2 the master
+    # re-executes its own argv, and running gunicorn/__main__.py as a script
+    # puts the gunicorn package first on sys.path, shadowing the stdlib `http`
+    script = Path(sys.executable).parent / 'gunicorn'
+    gunicorn = str(script) if script.exists() else 'gunicorn'
+    os.execvp(gunicorn, [gunicorn, '-c', str(here / 'gunicorn.conf.py')])
+
+
+def wait_healthy(timeout: float) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(HEALTH_URL, timeout=2).status_code == 200:
+                return True
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    return False
+
+
+def reload(timeout: float = 120.0):
+    old = master_pid()
+    if old is None:
+        sys.exit("❌ No running master found")
+    os.kill(old, signal.SIGUSR2)
+    print(f"🔄 Starting a new master next to {old}...")
+
+    # The new master writes <pidfile>.2 and takes over the pidfile once the old one exits
+    deadline = time.monotonic() + timeout
+    new = None
+    while time.monotonic() < deadline:
+        new = master_pid(PIDFILE.with_name(PIDFILE.name + '.2'))
+        if new is not None:
+            break
+        time.sleep(0.5)
+    else:
+        sys.exit("❌ New master did not start; the old one keeps serving")
+
+    # The new master forks once its preload is done. Both masters share the
+    # listening socket, so a 200 may come from either; the old one is only
+    # retired once the new workers exist and the port answers
+    while time.monotonic() < deadline and not worker_pids(new):
+        time.sleep(0.5)
+    if not worker_pids(new) or not wait_healthy(max(1.0, deadline - time.monotonic())):
+        os.kill(new, signal.SIGTERM)
+        sys.exit("❌ New workers are not answering; stopped them, the old ones keep serving")
+    os.kill(old, signal.SIGTERM)
+    print(f"✅ Now serving from master {new}; {old} is draining")
+
+
+def main():
+    command = sys.argv[1] if len(sys.argv) > 1 else 'start'
+    if command == 'start':
+        start()
+    elif command == 'reload':
+        reload()
+    elif command in ('workers', 'stop'):
+        pid = master_pid()
+        if pid is None:
+            sys.exit("❌ No running master found")
+        os.kill(pid, signal.SIGHUP if command == 'workers' else signal.SIGTERM)
+    elif command == 'status':
+        pid = master_pid()
+        print(f"Master {pid}" if pid else "Not running")
+    else:
+        sys.exit(__doc__)
+
+
+if __name__ == '__main__':
+    main()
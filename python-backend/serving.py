@@ -0,0 +1,124 @@
+"""
+Production serving: pre-forked uvicorn workers under gunicorn.
+
+gunicorn.conf.py imports the app once in the master (preload_app) and
+preload_shared_state() fills the read-only state there - the product index,
+the news series, the User-Agent sample - so every worker starts with it
+already in memory, shared copy-on-write rather than loaded N times.
+
+Caches that change at runtime (scrape results, news sentiment, forecasts) are
+ScrapeCache instances whose sqlite disk tier lives in SCRAPE_CACHE_DIR; every
+worker reads and writes the same file, so a value fetched by one worker is a
+hit for the others. Each worker keeps only a small hot set in memory.
+
+Background jobs that must run once per host (news ingestion, the Telegram
+outbox dispatcher, webhook registration) run in whichever worker holds the
+jobs lock; the others follow the news series from the database and take over
+if that worker goes away.
+"""
+
+import os
+import asyncio
+import fcntl
+import logging
+from pathlib import Path
+from typing import Awaitable, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# "auto" sizes the pool from the CPUs this process may run on
+BACKEND_WORKERS = os.environ.get('BACKEND_WORKERS', 'auto')
+MAX_WORKERS = int(os.environ.get('BACKEND_MAX_WORKERS', '8'))
+STATE_DIR = os.environ.get('SERVE_STATE_DIR', str(Path(__file__).parent / '.cache' / 'serve'))
+LEADER_RETRY = float(os.environ.get('SERVE_LEADER_RETRY', '30'))
+
+
+def usable_cpus() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def worker_count(setting: str = BACKEND_WORKERS) -> int:
+    """
+    Worker processes to run. A prediction is CPU-bound (the Prophet fit) and
+    each worker already overlaps its I/O on threads, so one worker per usable
+    CPU; at least two, so one busy or restarting worker never stalls the API.
+    """
+    if setting and setting != 'auto':
+        return max(1, int(setting))
+    return max(2, min(usable_cpus(), MAX_WORKERS))
+
+
+def preload_shared_state():
+    """Load read-only state in the gunicorn master, before workers fork"""
+    from http_client import ua_pool
+    from product_index import product_index
+    from news_ingest import news_store
+
+    ua_pool.preload()
+    product_index.load()
+    news_store.load()
+    # Pooled connections must not be inherited by the workers
+    for store in (product_index, news_store):
+        if store._engine is not None:
+            store._engine.dispose()
+    logger.info(f"[Serving] Preloaded {product_index.stats()['products']} products "
+                f"and {news_store.stats()['series_points']} news points")
+
+
+class JobsLock:
+    """
+    Exclusive flock on a file in STATE_DIR. The kernel drops it when the
+    holder exits, however it exits, so another worker can take over.
+    """
+
+    def __init__(self, path: Path = Path(STATE_DIR) / 'jobs.lock'):
+        self.path = path
+        self._fd: Optional[int] = None
+
+    @property
+    def held(self) -> bool:
+        return self._fd is not None
+
+    def acquire(self) -> bool:
+        if self._fd is not None:
+            return True
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(str(self.path), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        os.ftruncate(fd, 0)
+        os.write(fd, str(os.getpid()).encode())
+        self._fd = fd
+        return True
+
+    def release(self):
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+
+
+async def run_singleton_jobs(start: Callable[[], None], follow: Callable[[], Awaitable],
+                             interval: float = LEADER_RETRY):
+    """
+    Call start() once this process holds the jobs lock. Until then, await
+    follow() every `interval` seconds to keep up with the jobs' results.
+    """
+    while not jobs_lock.acquire():
+        try:
+            await follow()
+        except Exception as e:
+            logger.warning(f"[Serving] Follow-up failed: {e}")
+        await asyncio.sleep(interval)
+    logger.info(f"[Serving] Worker {os.getpid()} runs the background jobs")
+    start()
+
+
+# Global instance
+jobs_lock = JobsLock()
@@ -15,7 +15,7 @@ from pathlib import Path
 def check_environment():
     """Check if required environment variables are set"""
     required_vars = ['DATABASE_URL']
-    optional_vars = ['TELEGRAM_BOT_TOKEN_1', 'NEWS_API_KEY']
+    optional_vars = ['TELEGRAM_BOT_TOKEN_1', 'NEWS_API_KEY', 'BACKEND_WORKERS']
 
     missing_required = []
     for var in required_vars:
@@ -50,14 +50,19 @@ async def start_services():
 
     print("🚀 Starting Price Tracker Services...")
 
-    # Start backend
-    print("📡 Starting FastAPI backend...")
+    # Start backend: a single process, or pre-forked workers when BACKEND_WORKERS is set
+    if os.getenv('BACKEND_WORKERS'):
+        print(f"📡 Starting FastAPI backend with gunicorn ({os.getenv('BACKEND_WORKERS')} workers)...")
+        backend_script = 'serve.py'
+    else:
+        print("📡 Starting FastAPI backend...")
+        backend_script = 'main.py'
     backend_process = subprocess.Popen([
-        sys.executable, 'main.py'
+        sys.executable, backend_script
     ], cwd=Path(__file__).parent)
 
-    # Wait a bit for backend to start
-    await asyncio.sleep(3)
+    # Wait a bit for backend to start (the gunicorn master preloads before forking)
+    await asyncio.sleep(8 if backend_script == 'serve.py' else 3)
 
     # Check if backend is running
     try:
@@ -74,8 +79,11 @@ async def start_services():
 
     # Start Telegram bot (optional)
     bot_process = None
-    if os.getenv('TELEGRAM_BOT_TOKEN_1'):
-        print("🤖 Starting Telegram bot...")
+    if os.getenv('TELEGRAM_WEBHOOK_URL'):
+        # The backend registers the webhooks and handles updates in-process
+        print("🤖 Telegram bots run inside the backend (webhook mode)")
+    elif os.getenv('TELEGRAM_BOT_TOKEN_1'):
+        print("🤖 Starting Telegram bot (polling)...")
         bot_process = subprocess.Popen([
             sys.executable, 'run_bot.py'
         ], cwd=Path(__file__).parent)
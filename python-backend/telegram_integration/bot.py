@@ -4,11 +4,16 @@ import logging
 from telegram import Update, Bot
 from telegram.ext import Application, CommandHandler, MessageHandler, filters, ContextTypes
 from telegram.error import TelegramError
-import requests
 import json
 from datetime import datetime
+import httpx
 import pandas as pd
-from typing import Dict, List, Optional
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from http_client import telegram_request, build_limits, build_timeout
+from telegram_integration.pool import BotPool, bot_pool, TELEGRAM_API_URL, DEFAULT_API_URL
+from telegram_integration.processor import ChatOrderedUpdateProcessor
+from telegram_integration.dispatcher import notification_dispatcher
 
 # Configure logging
 logging.basicConfig(
@@ -17,15 +22,43 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Seconds to wait for the backend's /predict
+BACKEND_TIMEOUT = float(os.getenv('TELEGRAM_BACKEND_TIMEOUT', '30'))
+# Chart etag -> Telegram file_id of the uploaded photo
+PHOTO_ID_CACHE = 512
+
 class PriceAnalysisBot:
-    def __init__(self):
-        self.token = os.getenv('TELEGRAM_BOT_TOKEN')
+    def __init__(self, token: Optional[str] = None, predictor=None, concurrent_updates: Optional[int] = None,
+                 webhook: bool = False):
+        self.token = token or os.getenv('TELEGRAM_BOT_TOKEN')
         if not self.token:
             raise ValueError("TELEGRAM_BOT_TOKEN environment variable is required")
 
         self.backend_url = os.getenv('BACKEND_URL', 'http://localhost:8000')
-        self.bot = Bot(token=self.token)
-        self.application = Application.builder().token(self.token).build()
+        # With a PricePredictor (bot running inside the backend) analysis is
+        # in-process; otherwise it goes to BACKEND_URL over the shared async pool
+        self.predictor = predictor
+        self._backend_client: Optional[httpx.AsyncClient] = None
+        self._photo_ids: "OrderedDict[str, str]" = OrderedDict()
+        http2 = TELEGRAM_API_URL == DEFAULT_API_URL
+        base_url = f"{TELEGRAM_API_URL}/bot"
+        self.bot = Bot(token=self.token, base_url=base_url, request=telegram_request(http2=http2))
+        # Updates from different chats are handled concurrently, each chat in order
+        processor = (ChatOrderedUpdateProcessor(concurrent_updates) if concurrent_updates
+                     else ChatOrderedUpdateProcessor())
+        builder = (
+            Application.builder()
+            .token(self.token)
+            .base_url(base_url)
+            .request(telegram_request(connection_pool_size=processor.max_concurrent_updates + 8, http2=http2))
+            .concurrent_updates(processor)
+        )
+        # Webhook updates are queued by telegram_integration.webhook; no getUpdates loop
+        if webhook:
+            builder = builder.updater(None)
+        else:
+            builder = builder.get_updates_request(telegram_request(http2=http2))
+        self.application = builder.build()
 
         # Setup handlers
         self.setup_handlers()
@@ -36,6 +69,7 @@ class PriceAnalysisBot:
         self.application.add_handler(CommandHandler("analyze", self.analyze_command))
         self.application.add_handler(CommandHandler("alert", self.alert_command))
         self.application.add_handler(CommandHandler("history", self.history_command))
+        self.application.add_handler(CommandHandler("link", self.link_command))
         self.application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, self.handle_message))
 
     async def start_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -47,6 +81,7 @@ Commands:
 /analyze <product_url> - Get price analysis and predictions
 /alert <product_url> <target_price> - Set price alert
 /history <product_url> - Get price history chart
+/link <email> - Get price drop alerts for your account in this chat
 
 Just send me a product URL and I'll analyze it!
         """
@@ -111,12 +146,21 @@ Just send me a product URL and I'll analyze it!
             product_url = context.args[0]
             await update.message.reply_text("📊 Fetching price history...")
 
-            # Call backend for history
-            result = await self.call_backend_history(product_url)
-
-            if result:
-                response = self.format_history_response(result)
-                await update.message.reply_text(response, parse_mode='Markdown')
+            # Call backend for the history chart
+            chart = await self.call_backend_history(product_url)
+
+            if chart:
+                png, etag = chart
+                message = await update.message.reply_photo(
+                    photo=self._photo_ids.get(etag) or png,
+                    caption=self.format_history_response(product_url),
+                    parse_mode='Markdown'
+                )
+                # Telegram keeps uploaded photos; the same chart is re-sent by file_id
+                if message.photo:
+                    self._photo_ids[etag] = message.photo[-1].file_id
+                    while len(self._photo_ids) > PHOTO_ID_CACHE:
+                        self._photo_ids.popitem(last=False)
             else:
                 await update.message.reply_text("❌ Failed to fetch price history.")
 
@@ -124,6 +168,24 @@ Just send me a product URL and I'll analyze it!
             logger.error(f"History command error: {e}")
             await update.message.reply_text("❌ Error occurred while fetching history.")
 
+    async def link_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Handle /link command: the account's price-drop notifications come to this chat"""
+        try:
+            if len(context.args) != 1 or '@' not in context.args[0]:
+                await update.message.reply_text("Usage: /link <email you use on the website>")
+                return
+
+            email = context.args[0]
+            linked = await asyncio.to_thread(notification_dispatcher.link_chat, email, str(update.effective_chat.id))
+            if linked:
+                await update.message.reply_text(f"✅ Price drops for {email} will be sent to this chat.")
+            else:
+                await update.message.reply_text("❌ Linking is not available right now.")
+
+        except Exception as e:
+            logger.error(f"Link command error: {e}")
+            await update.message.reply_text("❌ Error occurred while linking your account.")
+
     async def handle_message(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle regular messages (assuming they contain URLs)"""
         message_text = update.message.text
@@ -144,11 +206,10 @@ Just send me a product URL and I'll analyze it!
                 "product_url": product_url
             }
 
-            response = requests.post(
-                f"{self.backend_url}/predict",
-                json=payload,
-                timeout=30
-            )
+            if self.predictor is not None:
+                return await self.predictor.predict_async(payload["current_price"], product_url, payload["product_name"])
+
+            response = await self.backend_client().post("/predict", json=payload)
 
             if response.status_code == 200:
                 return response.json()
@@ -160,6 +221,25 @@ Just send me a product URL and I'll analyze it!
             logger.error(f"Backend call error: {e}")
             return None
 
+    def backend_client(self) -> httpx.AsyncClient:
+        """
+        Keep-alive client for our own backend. Not http_pool: its per-host
+        limits and adaptive rate are meant for scraped sites, not for the API
+        that every concurrent update calls.
+        """
+        if self._backend_client is None:
+            self._backend_client = httpx.AsyncClient(
+                base_url=self.backend_url,
+                limits=build_limits(),
+                timeout=build_timeout(read=BACKEND_TIMEOUT),
+            )
+        return self._backend_client
+
+    async def close(self):
+        if self._backend_client is not None:
+            await self._backend_client.aclose()
+            self._backend_client = None
+
     async def call_backend_alert(self, product_url: str, target_price: float, user_id: int) -> Dict:
         """Call backend to set alert"""
         try:
@@ -169,11 +249,18 @@ Just send me a product URL and I'll analyze it!
             logger.error(f"Backend alert call error: {e}")
             return {"success": False, "message": str(e)}
 
-    async def call_backend_history(self, product_url: str) -> Optional[Dict]:
-        """Call backend for price history"""
+    async def call_backend_history(self, product_url: str) -> Optional[Tuple[bytes, str]]:
+        """(PNG, etag) price history + forecast chart, from the shared chart cache"""
         try:
-            # This would call a history endpoint
-            return await self.call_backend_analysis(product_url)
+            if self.predictor is not None:
+                from charts import product_chart
+                return await product_chart(self.predictor, product_url)
+
+            response = await self.backend_client().get("/chart", params={"product_url": product_url})
+            if response.status_code == 200:
+                return response.content, response.headers.get('etag', '').strip('"')
+            logger.error(f"Backend chart failed: {response.status_code}")
+            return None
         except Exception as e:
             logger.error(f"Backend history call error: {e}")
             return None
@@ -201,89 +288,62 @@ Just send me a product URL and I'll analyze it!
             logger.error(f"Format analysis error: {e}")
             return "❌ Error formatting analysis data"
 
-    def format_history_response(self, data: Dict) -> str:
-        """Format history data for Telegram"""
-        try:
-            response = "📈 *Price History*\n\n"
-            # Add history formatting logic here
-            return response
-        except Exception as e:
-            logger.error(f"Format history error: {e}")
-            return "❌ Error formatting history data"
+    def format_history_response(self, product_url: str) -> str:
+        """Caption for the history chart"""
+        return "📈 *Price History*\nPast prices, with the 30-day forecast (dashed) once it is ready"
 
     async def run(self):
-        """Start the bot"""
+        """Start the bot with long polling (the fallback when webhooks aren't configured)"""
         logger.info("Starting Price Analysis Bot...")
-        await self.application.run_polling()
+        # run_polling() owns its own event loop, so drive the Application directly
+        async with self.application:
+            # start_polling removes any webhook left over from webhook mode
+            await self.application.updater.start_polling(allowed_updates=Update.ALL_TYPES)
+            await self.application.start()
+            try:
+                await asyncio.Event().wait()
+            finally:
+                await self.application.updater.stop()
+                await self.application.stop()
+                await self.close()
 
 class TelegramBotManager:
-    """Manager for multiple Telegram bots with fallback"""
-
-    def __init__(self):
-        self.bots = []
-        self.load_bot_configs()
-
-    def load_bot_configs(self):
-        """Load bot configurations from environment"""
-        # Primary bot
-        primary_token = os.getenv('TELEGRAM_BOT_TOKEN_1')
-        if primary_token:
-            self.bots.append({
-                'name': 'primary',
-                'token': primary_token,
-                'active': True
-            })
-
-        # Secondary bot (fallback)
-        secondary_token = os.getenv('TELEGRAM_BOT_TOKEN_2')
-        if secondary_token:
-            self.bots.append({
-                'name': 'secondary',
-                'token': secondary_token,
-                'active': True
-            })
+    """Manager for multiple Telegram bots, backed by the shared bot pool"""
 
-    async def send_analysis_request(self, product_url: str, user_id: str = None) -> Optional[Dict]:
-        """Send analysis request to first available bot"""
-        for bot_config in self.bots:
-            if not bot_config['active']:
-                continue
-
-            try:
-                bot = PriceAnalysisBot()
-                bot.token = bot_config['token']
-                bot.bot = Bot(token=bot.token)
+    def __init__(self, pool: BotPool = bot_pool):
+        self.pool = pool
+        self._handler_bot: Optional[PriceAnalysisBot] = None
 
-                result = await bot.call_backend_analysis(product_url)
-                if result:
-                    return result
+    @property
+    def bots(self) -> List[Dict]:
+        return [{'name': b.name, 'token': b.token, 'active': b.healthy} for b in self.pool.bots]
 
-            except Exception as e:
-                logger.error(f"Bot {bot_config['name']} failed: {e}")
-                continue
+    def handler_bot(self) -> PriceAnalysisBot:
+        """One PriceAnalysisBot for the process; building its Application per request is expensive"""
+        if self._handler_bot is None:
+            self._handler_bot = PriceAnalysisBot(token=self.pool.tokens[0])
+        return self._handler_bot
 
-        return None
+    async def send_analysis_request(self, product_url: str, user_id: str = None) -> Optional[Dict]:
+        """Analysis through the long-lived handler bot"""
+        if not self.pool.healthy_bots:
+            return None
+        try:
+            return await self.handler_bot().call_backend_analysis(product_url)
+        except Exception as e:
+            logger.error(f"Analysis request failed: {e}")
+            return None
 
     async def send_alert_request(self, product_url: str, target_price: float, user_id: str) -> bool:
-        """Send alert request to first available bot"""
-        for bot_config in self.bots:
-            if not bot_config['active']:
-                continue
-
-            try:
-                bot = PriceAnalysisBot()
-                bot.token = bot_config['token']
-                bot.bot = Bot(token=bot.token)
-
-                result = await bot.call_backend_alert(product_url, target_price, int(user_id))
-                if result.get('success'):
-                    return True
-
-            except Exception as e:
-                logger.error(f"Bot {bot_config['name']} failed: {e}")
-                continue
-
-        return False
+        """Alert through the long-lived handler bot"""
+        if not self.pool.healthy_bots:
+            return False
+        try:
+            result = await self.handler_bot().call_backend_alert(product_url, target_price, int(user_id))
+            return bool(result.get('success'))
+        except Exception as e:
+            logger.error(f"Alert request failed: {e}")
+            return False
 
 # Global bot manager instance
 bot_manager = TelegramBotManager()
@@ -0,0 +1,307 @@
+"""
+Outbound Telegram notifications through a persistent outbox.
+
+PriceAlertChecker enqueues one telegram_outbox row per new price-drop
+notification; NotificationDispatcher drains the outbox through the bot pool:
+
+- batching: a user's pending drops go out as one message (split only at
+  Telegram's 4096 character limit); users sharing the fallback chat get
+  separate messages
+- per-chat pacing: at most one message per TELEGRAM_CHAT_INTERVAL seconds to a
+  chat (Telegram allows about 1/s)
+- per-bot limits: the pool's rate budgets (~30 msgs/sec per token) spread the
+  sends over every configured bot, and a 429 pauses only that bot
+- retries: when every bot is throttled the rows wait out retry_after; other
+  failures back off exponentially up to NOTIFY_MAX_ATTEMPTS. Chats that
+  blocked the bot or don't exist are marked failed straight away.
+
+Rows are claimed with a conditional UPDATE, so several dispatchers (the API
+process and the daily checker) can drain the same outbox without sending a
+row twice; a claim left behind by a crashed process is released after
+NOTIFY_CLAIM_TIMEOUT seconds. Chats come from telegram_links (user email ->
+chat id, written by the bot's /link command), falling back to TELEGRAM_CHAT_ID.
+Tables are created by init_db.py.
+"""
+
+import os
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from telegram.error import BadRequest, Forbidden, RetryAfter, TelegramError
+
+from telegram_integration.pool import BotPool, NoBotAvailable, bot_pool, retry_after_seconds
+
+logger = logging.getLogger(__name__)
+
+DISPATCH_INTERVAL = float(os.environ.get('NOTIFY_DISPATCH_INTERVAL', '30'))  # 0 disables the job
+CHAT_INTERVAL = float(os.environ.get('TELEGRAM_CHAT_INTERVAL', '1'))
+CLAIM_CHATS = int(os.environ.get('NOTIFY_CLAIM_CHATS', '200'))
+DISPATCH_CONCURRENCY = int(os.environ.get('NOTIFY_DISPATCH_CONCURRENCY', '64'))
+MAX_ATTEMPTS = int(os.environ.get('NOTIFY_MAX_ATTEMPTS', '5'))
+RETRY_BASE = float(os.environ.get('NOTIFY_RETRY_BASE', '30'))
+CLAIM_TIMEOUT = float(os.environ.get('NOTIFY_CLAIM_TIMEOUT', '300'))
+MESSAGE_LIMIT = 4096
+BATCH_HEADER = "📉 Price drops on your alerts:"
+
+
+def utcnow() -> datetime:
+    # Naive UTC, the same on Postgres TIMESTAMP columns and in SQLite
+    return datetime.utcnow()
+
+
+def format_drop(product_title: str, old_price: float, new_price: float, product_link: Optional[str]) -> str:
+    line = f"• {product_title}: ₹{new_price:.0f} (was ₹{old_price:.0f})"
+    return f"{line}\n{product_link}" if product_link else line
+
+
+def compose(bodies: List[str], limit: int = MESSAGE_LIMIT) -> List[List[int]]:
+    """Group body indexes into messages that fit in `limit` characters, in order"""
+    messages: List[List[int]] = []
+    length = 0
+    for i, body in enumerate(bodies):
+        added = len(body) + 2
+        if not messages or length + added > limit:
+            messages.append([])
+            length = len(BATCH_HEADER)
+        messages[-1].append(i)
+        length += added
+    return messages
+
+
+def render(bodies: List[str]) -> str:
+    if len(bodies) == 1:
+        return f"🎉 Price drop!\n{bodies[0]}"
+    return BATCH_HEADER + "\n\n" + "\n\n".join(bodies)
+
+
+class ChatPacer:
+    """
+    Spaces messages to the same chat at least `interval` seconds apart,
+    measured from when the previous send finished (a send can spend a while
+    waiting for a bot's budget before it goes out)
+    """
+
+    def __init__(self, interval: float = CHAT_INTERVAL, max_chats: int = 10000):
+        self.interval = interval
+        self.max_chats = max_chats
+        self._next: "OrderedDict[str, float]" = OrderedDict()
+
+    async def wait(self, chat_id: str):
+        delay = self._next.get(chat_id, 0.0) - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def sent(self, chat_id: str):
+        self._next[chat_id] = time.monotonic() + self.interval
+        self._next.move_to_end(chat_id)
+        while len(self._next) > self.max_chats:
+            self._next.popitem(last=False)
+
+
+class NotificationDispatcher:
+    def __init__(self, database_url: Optional[str] = None, pool: BotPool = bot_pool,
+                 default_chat_id: Optional[str] = None):
+        self.database_url = database_url
+        self.pool = pool
+        self.default_chat_id = default_chat_id
+        self.pacer = ChatPacer()
+        self._engine = None
+        self.counters = {'enqueued': 0, 'sent_messages': 0, 'sent_rows': 0, 'throttled': 0,
+                         'retried': 0, 'failed': 0}
+
+    def _get_engine(self):
+        if self._engine is None and self.database_url:
+            from sqlalchemy import create_engine
+            self._engine = create_engine(self.database_url, pool_pre_ping=True)
+        return self._engine
+
+    # ---- producer side ----
+
+    def link_chat(self, user_email: str, chat_id: str) -> bool:
+        """Send the user's notifications to chat_id from now on; False without a database"""
+        engine = self._get_engine()
+        if engine is None:
+            return False
+        from sqlalchemy import text
+        with engine.begin() as conn:
+            conn.execute(text("""
+                INSERT INTO telegram_links (user_email, chat_id, linked_at)
+                VALUES (:email, :chat_id, :now)
+                ON CONFLICT (user_email) DO UPDATE SET chat_id = excluded.chat_id, linked_at = excluded.linked_at
+            """), {"email": user_email, "chat_id": str(chat_id), "now": utcnow()})
+        return True
+
+    def enqueue(self, notification_id: str, user_email: str, body: str, conn=None) -> bool:
+        """
+        Queue one notification for the user's chat; False when the user has no
+        chat or it was already queued. Pass `conn` to enqueue inside the
+        caller's transaction.
+        """
+        if conn is None:
+            engine = self._get_engine()
+            if engine is None:
+                return False
+            with engine.begin() as conn:
+                return self.enqueue(notification_id, user_email, body, conn)
+
+        from sqlalchemy import text
+        chat_id = conn.execute(text("SELECT chat_id FROM telegram_links WHERE user_email = :email"),
+                               {"email": user_email}).scalar() or self.default_chat_id
+        if not chat_id:
+            return False
+        now = utcnow()
+        created = conn.execute(text("""
+            INSERT INTO telegram_outbox (notification_id, user_email, chat_id, body, status,
+                                         attempts, next_attempt_at, created_at)
+            VALUES (:notification_id, :email, :chat_id, :body, 'pending', 0, :now, :now)
+            ON CONFLICT (notification_id) DO NOTHING
+            RETURNING id
+        """), {"notification_id": notification_id, "email": user_email, "chat_id": str(chat_id),
+               "body": body, "now": now}).fetchone()
+        if created:
+            self.counters['enqueued'] += 1
+        return created is not None
+
+    # ---- outbox bookkeeping (worker threads) ----
+
+    def _claim(self, chats: int) -> List[Dict]:
+        """Claim every due row for up to `chats` chats, so each chat is delivered by one coroutine"""
+        from sqlalchemy import text
+        now = utcnow()
+        with self._get_engine().begin() as conn:
+            # Release claims from a dispatcher that died mid-send
+            conn.execute(text("""
+                UPDATE telegram_outbox SET status = 'pending'
+                WHERE status = 'sending' AND claimed_at < :stale
+            """), {"stale": now - timedelta(seconds=CLAIM_TIMEOUT)})
+            rows = conn.execute(text("""
+                UPDATE telegram_outbox SET status = 'sending', claimed_at = :now
+                WHERE status = 'pending' AND next_attempt_at <= :now AND chat_id IN (
+                    SELECT chat_id FROM telegram_outbox
+                    WHERE status = 'pending' AND next_attempt_at <= :now
+                    GROUP BY chat_id ORDER BY MIN(id) LIMIT :chats
+                )
+                RETURNING id, chat_id, user_email, body, attempts
+            """), {"now": now, "chats": chats}).fetchall()
+        return sorted(({'id': r[0], 'chat_id': r[1], 'user_email': r[2], 'body': r[3], 'attempts': r[4]}
+                       for r in rows), key=lambda r: r['id'])
+
+    def _mark_sent(self, ids: List[int]):
+        from sqlalchemy import text
+        with self._get_engine().begin() as conn:
+            conn.execute(text("""
+                UPDATE telegram_outbox SET status = 'sent', sent_at = :now, last_error = NULL
+                WHERE id = :id
+            """), [{"id": i, "now": utcnow()} for i in ids])
+
+    def _reschedule(self, rows: List[Dict], delay: float, error: str, count_attempt: bool):
+        from sqlalchemy import text
+        now = utcnow()
+        params = []
+        for row in rows:
+            attempts = row['attempts'] + (1 if count_attempt else 0)
+            status = 'failed' if attempts >= MAX_ATTEMPTS else 'pending'
+            params.append({"id": row['id'], "status": status, "attempts": attempts,
+                           "next": now + timedelta(seconds=delay), "error": error[:500]})
+        with self._get_engine().begin() as conn:
+            conn.execute(text("""
+                UPDATE telegram_outbox
+                SET status = :status, attempts = :attempts, next_attempt_at = :next, last_error = :error
+                WHERE id = :id
+            """), params)
+
+    def _fail(self, rows: List[Dict], error: str):
+        from sqlalchemy import text
+        with self._get_engine().begin() as conn:
+            conn.execute(text("""
+                UPDATE telegram_outbox SET status = 'failed', attempts = attempts + 1, last_error = :error
+                WHERE id = :id
+            """), [{"id": row['id'], "error": error[:500]} for row in rows])
+
+    # ---- delivery ----
+
+    async def _deliver_chat(self, chat_id: str, rows: List[Dict]):
+        # Batched per user: the TELEGRAM_CHAT_ID fallback chat receives many users' drops
+        by_user: Dict[str, List[Dict]] = {}
+        for row in rows:
+            by_user.setdefault(row['user_email'], []).append(row)
+        for user_rows in by_user.values():
+            await self._deliver_batches(chat_id, user_rows)
+
+    async def _deliver_batches(self, chat_id: str, rows: List[Dict]):
+        for indexes in compose([row['body'] for row in rows]):
+            batch = [rows[i] for i in indexes]
+            await self.pacer.wait(chat_id)
+            try:
+                await self.pool.send_message(chat_id, render([row['body'] for row in batch]),
+                                             disable_web_page_preview=True)
+            except RetryAfter as e:
+                # Every bot is throttled; not the message's fault
+                self.counters['throttled'] += 1
+                await asyncio.to_thread(self._reschedule, batch, retry_after_seconds(e), str(e), False)
+                continue
+            except (BadRequest, Forbidden) as e:
+                logger.warning(f"[NotificationDispatcher] Chat {chat_id} rejected notification: {e}")
+                self.counters['failed'] += len(batch)
+                await asyncio.to_thread(self._fail, batch, str(e))
+                continue
+            except (NoBotAvailable, TelegramError) as e:
+                self.counters['retried'] += len(batch)
+                delay = RETRY_BASE * 2 ** min(row['attempts'] for row in batch)
+                await asyncio.to_thread(self._reschedule, batch, delay, str(e), True)
+                continue
+            finally:
+                self.pacer.sent(chat_id)
+            self.counters['sent_messages'] += 1
+            self.counters['sent_rows'] += len(batch)
+            await asyncio.to_thread(self._mark_sent, [row['id'] for row in batch])
+
+    async def drain(self) -> int:
+        """Send everything that is due; returns the number of rows handled"""
+        if self._get_engine() is None or not self.pool.healthy_bots:
+            return 0
+        semaphore = asyncio.Semaphore(DISPATCH_CONCURRENCY)
+        handled = 0
+
+        async def deliver(chat_id, rows):
+            async with semaphore:
+                try:
+                    await self._deliver_chat(chat_id, rows)
+                except Exception as e:
+                    logger.error(f"[NotificationDispatcher] Delivery to chat {chat_id} failed: {e}")
+
+        while True:
+            rows = await asyncio.to_thread(self._claim, CLAIM_CHATS)
+            if not rows:
+                return handled
+            handled += len(rows)
+            by_chat: Dict[str, List[Dict]] = {}
+            for row in rows:
+                by_chat.setdefault(row['chat_id'], []).append(row)
+            await asyncio.gather(*(deliver(chat_id, chat_rows) for chat_id, chat_rows in by_chat.items()))
+
+    def stats(self) -> Dict:
+        return dict(self.counters)
+
+
+# Global instance
+notification_dispatcher = NotificationDispatcher(os.environ.get('DATABASE_URL'),
+                                                 default_chat_id=os.getenv('TELEGRAM_CHAT_ID'))
+
+
+async def run_notification_dispatcher(interval: float = DISPATCH_INTERVAL):
+    """Drain the outbox forever; started from the app's startup hook"""
+    if interval <= 0:
+        return
+    while True:
+        try:
+            sent = await notification_dispatcher.drain()
+            if sent:
+                logger.info(f"[NotificationDispatcher] Handled {sent} queued notifications")
+        except Exception as e:
+            logger.error(f"[NotificationDispatcher] Drain failed: {e}")
+        await asyncio.sleep(interval)
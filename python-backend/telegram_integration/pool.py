@@ -0,0 +1,279 @@
+"""
+Long-lived pool of Telegram bots.
+
+Every configured token (TELEGRAM_BOT_TOKEN_1..4, optionally TELEGRAM_BOT_WEIGHT_n;
+or the single legacy TELEGRAM_BOT_TOKEN) becomes one telegram.Bot that lives for the whole process. Calls are spread
+across them instead of bot 1 taking everything until it breaks:
+
+- dispatch: least-loaded (fewest in-flight calls per unit of weight), or
+  smooth weighted round-robin with TELEGRAM_POOL_STRATEGY=round_robin
+- rate budgets: a token bucket per bot (TELEGRAM_BOT_RATE msgs/sec, Telegram's
+  ~30/s per bot); a 429 pauses that bot for retry_after while others carry on
+- health: get_me every TELEGRAM_HEALTH_INTERVAL seconds; a bot that fails
+  checks or TELEGRAM_EJECT_AFTER calls in a row is ejected, and re-admitted
+  once get_me succeeds again
+
+Throughput therefore scales with the number of tokens.
+"""
+
+import os
+import time
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from telegram import Bot
+from telegram.error import BadRequest, Forbidden, InvalidToken, NetworkError, RetryAfter, TelegramError
+
+from http_client import telegram_request
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_API_URL = 'https://api.telegram.org'
+# A self-hosted Bot API server or a local stub (HTTP/1.1 only)
+TELEGRAM_API_URL = os.environ.get('TELEGRAM_API_URL', DEFAULT_API_URL).rstrip('/')
+STRATEGY = os.environ.get('TELEGRAM_POOL_STRATEGY', 'least_loaded')
+BOT_RATE = float(os.environ.get('TELEGRAM_BOT_RATE', '30'))
+# A full bucket of BOT_RATE plus its refill would let a bot send ~2x the rate
+# in its first second, which Telegram answers with 429s; pace evenly instead
+BOT_BURST = float(os.environ.get('TELEGRAM_BOT_BURST', '1'))
+HEALTH_INTERVAL = float(os.environ.get('TELEGRAM_HEALTH_INTERVAL', '30'))
+EJECT_AFTER = int(os.environ.get('TELEGRAM_EJECT_AFTER', '3'))
+MAX_TOKENS = 4
+
+
+class NoBotAvailable(TelegramError):
+    """Every bot in the pool is ejected (or the pool is empty)"""
+
+
+def load_bot_tokens() -> List[Tuple[int, str]]:
+    """
+    (n, token) for each TELEGRAM_BOT_TOKEN_n set, in order. n stays the
+    token's own number when some are unset (webhook paths and weights use
+    it). Without any numbered token, the legacy TELEGRAM_BOT_TOKEN is bot 1.
+    """
+    tokens = []
+    for i in range(1, MAX_TOKENS + 1):  # Support up to 4 bots
+        token = os.getenv(f'TELEGRAM_BOT_TOKEN_{i}')
+        if token:
+            tokens.append((i, token))
+    if not tokens and os.getenv('TELEGRAM_BOT_TOKEN'):
+        tokens.append((1, os.getenv('TELEGRAM_BOT_TOKEN')))
+    return tokens
+
+
+def load_bot_weights(numbers: List[int]) -> List[float]:
+    return [float(os.getenv(f'TELEGRAM_BOT_WEIGHT_{n}', '1')) for n in numbers]
+
+
+def retry_after_seconds(error: RetryAfter) -> float:
+    value = error.retry_after
+    return value.total_seconds() if hasattr(value, 'total_seconds') else float(value)
+
+
+class RateBudget:
+    """Token bucket; pause() blocks it entirely until a 429's retry_after has passed"""
+
+    def __init__(self, rate: float = BOT_RATE, burst: float = BOT_BURST):
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now: float) -> float:
+        """Seconds until a call may be made (0 when one may be made now)"""
+        if now < self.paused_until:
+            return self.paused_until - now
+        self._refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self, now: float):
+        self._refill(now)
+        self.tokens -= 1
+
+    def pause(self, seconds: float):
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+class PooledBot:
+    def __init__(self, index: int, token: str, weight: float = 1.0, number: Optional[int] = None):
+        self.index = index
+        self.name = f"bot{number or index + 1}"
+        self.token = token
+        self.weight = max(weight, 0.01)
+        self.bot = Bot(token=token, base_url=f"{TELEGRAM_API_URL}/bot",
+                       request=telegram_request(http2=TELEGRAM_API_URL == DEFAULT_API_URL))
+        self.budget = RateBudget()
+        self.healthy = True
+        self.username: Optional[str] = None
+        self.in_flight = 0
+        self.current_weight = 0.0  # smooth weighted round-robin state
+        self.consecutive_failures = 0
+        self.sent = 0
+        self.failed = 0
+        self.throttled = 0
+
+    def stats(self) -> Dict:
+        return {
+            'name': self.name, 'username': self.username, 'healthy': self.healthy, 'weight': self.weight,
+            'in_flight': self.in_flight, 'sent': self.sent, 'failed': self.failed, 'throttled': self.throttled,
+            'paused_for': round(max(0.0, self.budget.paused_until - time.monotonic()), 1),
+        }
+
+
+class BotPool:
+    def __init__(self, tokens: Optional[List[str]] = None, weights: Optional[List[float]] = None,
+                 strategy: str = STRATEGY):
+        numbered = load_bot_tokens() if tokens is None else list(enumerate(tokens, start=1))
+        weights = weights or load_bot_weights([n for n, _ in numbered])
+        self.bots = [PooledBot(i, token, weight, n) for i, ((n, token), weight) in enumerate(zip(numbered, weights))]
+        self.strategy = strategy
+        self._health_task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self.bots)
+
+    @property
+    def tokens(self) -> List[str]:
+        return [b.token for b in self.bots]
+
+    @property
+    def healthy_bots(self) -> List[PooledBot]:
+        return [b for b in self.bots if b.healthy]
+
+    # ---- lifecycle ----
+
+    async def start(self):
+        """Check every bot once, then keep checking in the background"""
+        await self.check_health()
+        if self._health_task is None and self.bots:
+            self._health_task = asyncio.create_task(self._health_loop())
+
+    async def stop(self):
+        if self._health_task:
+            self._health_task.cancel()
+            self._health_task = None
+        for pooled in self.bots:
+            try:
+                await pooled.bot.shutdown()
+            except Exception:
+                pass
+
+    async def _health_loop(self):
+        while True:
+            await asyncio.sleep(HEALTH_INTERVAL)
+            try:
+                await self.check_health()
+            except Exception as e:
+                logger.error(f"[BotPool] Health check round failed: {e}")
+
+    async def check_health(self):
+        await asyncio.gather(*(self._check(pooled) for pooled in self.bots))
+
+    async def _check(self, pooled: PooledBot):
+        try:
+            me = await pooled.bot.get_me()
+        except RetryAfter as e:
+            # Throttled, not broken
+            pooled.budget.pause(retry_after_seconds(e))
+            return
+        except Exception as e:
+            if pooled.healthy:
+                logger.warning(f"[BotPool] {pooled.name} failed health check, ejecting: {e}")
+            pooled.healthy = False
+            return
+        pooled.username = me.username
+        pooled.consecutive_failures = 0
+        if not pooled.healthy:
+            logger.info(f"[BotPool] {pooled.name} (@{me.username}) passed health check, re-admitted")
+        pooled.healthy = True
+
+    # ---- dispatch ----
+
+    def _pick(self, candidates: List[PooledBot]) -> PooledBot:
+        if self.strategy == 'round_robin':
+            total = sum(b.weight for b in candidates)
+            for b in candidates:
+                b.current_weight += b.weight
+            chosen = max(candidates, key=lambda b: b.current_weight)
+            chosen.current_weight -= total
+            return chosen
+        return min(candidates, key=lambda b: ((b.in_flight + 1) / b.weight, b.sent / b.weight))
+
+    async def acquire(self, exclude=()) -> PooledBot:
+        """A healthy bot with rate budget, waiting for budget if every bot is spent"""
+        while True:
+            candidates = [b for b in self.bots if b.healthy and b not in exclude]
+            if not candidates:
+                raise NoBotAvailable("No healthy Telegram bot available")
+            now = time.monotonic()
+            ready = [b for b in candidates if b.budget.wait_time(now) == 0]
+            if ready:
+                chosen = self._pick(ready)
+                chosen.budget.take(now)
+                return chosen
+            await asyncio.sleep(min(b.budget.wait_time(now) for b in candidates))
+
+    async def call(self, fn: Callable[[Bot], Awaitable[Any]], attempts: Optional[int] = None) -> Any:
+        """
+        Run fn(bot) on a pooled bot. Throttled or failing bots hand the call to
+        another bot; errors caused by the request itself (bad chat, blocked by
+        the user) are raised straight away.
+        """
+        attempts = attempts or max(1, len(self.bots))
+        tried: List[PooledBot] = []
+        last_error: Optional[Exception] = None
+        for _ in range(attempts):
+            try:
+                pooled = await self.acquire(exclude=tried if len(tried) < len(self.healthy_bots) else ())
+            except NoBotAvailable:
+                if last_error:
+                    raise last_error
+                raise
+            pooled.in_flight += 1
+            try:
+                result = await fn(pooled.bot)
+            except RetryAfter as e:
+                pooled.throttled += 1
+                pooled.budget.pause(retry_after_seconds(e))
+                last_error = e
+            except (BadRequest, Forbidden):
+                raise
+            except InvalidToken as e:
+                logger.error(f"[BotPool] {pooled.name} has an invalid token, ejecting")
+                pooled.healthy = False
+                last_error = e
+            except NetworkError as e:
+                pooled.failed += 1
+                pooled.consecutive_failures += 1
+                if pooled.consecutive_failures >= EJECT_AFTER and pooled.healthy:
+                    logger.warning(f"[BotPool] {pooled.name} failed {pooled.consecutive_failures} calls in a row, ejecting")
+                    pooled.healthy = False
+                last_error = e
+            else:
+                pooled.sent += 1
+                pooled.consecutive_failures = 0
+                return result
+            finally:
+                pooled.in_flight -= 1
+            tried.append(pooled)
+        raise last_error
+
+    async def send_message(self, chat_id, text: str, **kwargs):
+        return await self.call(lambda bot: bot.send_message(chat_id=chat_id, text=text, **kwargs))
+
+    def stats(self) -> Dict:
+        return {
+            'strategy': self.strategy,
+            'healthy': len(self.healthy_bots),
+            'bots': [b.stats() for b in self.bots],
+        }
+
+
+# Global instance
+bot_pool = BotPool()
@@ -0,0 +1,75 @@
+"""
+Concurrent update processing that keeps each chat's updates in order.
+
+PTB's default processes one update at a time, so a single slow /analyze holds
+up every other chat. ChatOrderedUpdateProcessor lets up to
+TELEGRAM_CONCURRENT_UPDATES updates run at once, but updates from the same chat
+still run one after another, in arrival order (a user who sends /analyze then
+/alert gets the replies in that order).
+
+Updates without a chat (inline queries, polls, ...) are not serialized.
+"""
+
+import os
+import asyncio
+from typing import Any, Awaitable, Dict, Hashable
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+CONCURRENT_UPDATES = int(os.environ.get('TELEGRAM_CONCURRENT_UPDATES', '32'))
+
+
+class _ChatQueue:
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.waiting = 0
+
+
+class ChatOrderedUpdateProcessor(BaseUpdateProcessor):
+    def __init__(self, max_concurrent_updates: int = CONCURRENT_UPDATES):
+        super().__init__(max_concurrent_updates)
+        self._chats: Dict[Hashable, _ChatQueue] = {}
+
+    @staticmethod
+    def chat_key(update: object):
+        if isinstance(update, Update) and update.effective_chat is not None:
+            return update.effective_chat.id
+        return None
+
+    async def process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        """
+        Wait for the chat's turn first and only then for a concurrency slot, so
+        a chat's queued updates hold no slots and never starve other chats.
+        (PTB marks this @final; the base version takes the slot first.)
+        """
+        key = self.chat_key(update)
+        if key is None:
+            await super().process_update(update, coroutine)
+            return
+
+        # asyncio.Lock wakes waiters first-in first-out, which keeps arrival order
+        queue = self._chats.get(key)
+        if queue is None:
+            queue = self._chats[key] = _ChatQueue()
+        queue.waiting += 1
+        try:
+            async with queue.lock:
+                await super().process_update(update, coroutine)
+        finally:
+            queue.waiting -= 1
+            if not queue.waiting:
+                del self._chats[key]
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        await coroutine
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+    @property
+    def active_chats(self) -> int:
+        return len(self._chats)
@@ -0,0 +1,129 @@
+"""
+Webhook mode: Telegram pushes updates to the API process.
+
+With TELEGRAM_WEBHOOK_URL set (the public base URL of the backend), every
+configured token gets a PriceAnalysisBot inside the FastAPI process and a
+webhook at <TELEGRAM_WEBHOOK_URL>/telegram/webhook/<n>, n being the token's
+number (TELEGRAM_BOT_TOKEN_n; a lone legacy TELEGRAM_BOT_TOKEN is 1). Updates
+posted there are checked against the bot's secret token and queued straight
+into its Application, whose handlers run on the API's event loop and call the
+predictor in-process.
+
+No process, long poll or connection is held open per bot. Without
+TELEGRAM_WEBHOOK_URL nothing here runs and run_bot.py polls as before.
+"""
+
+import os
+import hmac
+import json
+import hashlib
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from telegram import Update
+
+from telegram_integration.bot import PriceAnalysisBot
+from telegram_integration.pool import load_bot_tokens
+
+logger = logging.getLogger(__name__)
+
+WEBHOOK_URL = os.environ.get('TELEGRAM_WEBHOOK_URL', '').rstrip('/')
+# Secret Telegram echoes in X-Telegram-Bot-Api-Secret-Token; per-bot values are derived from it
+WEBHOOK_SECRET = os.environ.get('TELEGRAM_WEBHOOK_SECRET', '')
+WEBHOOK_MAX_CONNECTIONS = int(os.environ.get('TELEGRAM_WEBHOOK_MAX_CONNECTIONS', '40'))
+WEBHOOK_PATH = '/telegram/webhook'
+SECRET_HEADER = 'X-Telegram-Bot-Api-Secret-Token'
+
+
+def webhook_secret(token: str, secret: str = WEBHOOK_SECRET) -> str:
+    """
+    Per-bot secret_token ([A-Za-z0-9_-], up to 256 chars). Derived from the
+    bot token when TELEGRAM_WEBHOOK_SECRET is unset, which is just as private.
+    """
+    return hmac.new((secret or token).encode(), token.encode(), hashlib.sha256).hexdigest()
+
+
+class TelegramWebhooks:
+    def __init__(self, base_url: str = WEBHOOK_URL, tokens: Optional[List[Tuple[int, str]]] = None):
+        self.base_url = base_url
+        self.tokens = load_bot_tokens() if tokens is None else tokens
+        self.bots: Dict[int, PriceAnalysisBot] = {}
+        self._secrets: Dict[int, str] = {}
+        self.counters = {'received': 0, 'rejected': 0}
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.base_url and self.tokens)
+
+    def url_for(self, bot_id: int) -> str:
+        return f"{self.base_url}{WEBHOOK_PATH}/{bot_id}"
+
+    async def start(self, predictor=None, concurrent_updates: Optional[int] = None, register: bool = True):
+        """
+        Start a handler Application per token and point its webhook here.
+        With several API workers only one needs to register; all of them
+        accept the deliveries.
+        """
+        for bot_id, token in self.tokens:
+            bot = PriceAnalysisBot(token=token, predictor=predictor, concurrent_updates=concurrent_updates,
+                                   webhook=True)
+            secret = webhook_secret(token)
+            try:
+                await bot.application.initialize()
+                await bot.application.start()
+                if register:
+                    await bot.application.bot.set_webhook(
+                        url=self.url_for(bot_id),
+                        secret_token=secret,
+                        max_connections=WEBHOOK_MAX_CONNECTIONS,
+                        allowed_updates=Update.ALL_TYPES,
+                    )
+            except Exception as e:
+                logger.error(f"[TelegramWebhooks] bot{bot_id} webhook setup failed: {e}")
+                await self._stop_bot(bot)
+                continue
+            self.bots[bot_id] = bot
+            self._secrets[bot_id] = secret
+            logger.info(f"[TelegramWebhooks] bot{bot_id} receiving updates at {self.url_for(bot_id)}")
+
+    async def stop(self):
+        # The webhooks stay registered: Telegram holds updates until we are back
+        for bot in self.bots.values():
+            await self._stop_bot(bot)
+        self.bots = {}
+        self._secrets = {}
+
+    @staticmethod
+    async def _stop_bot(bot: PriceAnalysisBot):
+        try:
+            if bot.application.running:
+                await bot.application.stop()
+            await bot.application.shutdown()
+            await bot.close()
+        except Exception as e:
+            logger.warning(f"[TelegramWebhooks] Error stopping bot: {e}")
+
+    async def handle(self, bot_id: int, secret: Optional[str], body: bytes) -> int:
+        """Queue one webhook delivery; returns the HTTP status to answer with"""
+        bot = self.bots.get(bot_id)
+        if bot is None:
+            return 404
+        if not secret or not hmac.compare_digest(secret, self._secrets[bot_id]):
+            self.counters['rejected'] += 1
+            return 403
+        try:
+            update = Update.de_json(json.loads(body), bot.application.bot)
+        except (ValueError, TypeError) as e:
+            logger.warning(f"[TelegramWebhooks] bot{bot_id} sent an unreadable update: {e}")
+            return 400
+        # Telegram only needs a quick 200; the Application's processor runs the handlers
+        await bot.application.update_queue.put(update)
+        self.counters['received'] += 1
+        return 200
+
+    def stats(self) -> Dict:
+        return {'enabled': self.enabled, 'bots': sorted(self.bots), **self.counters}
+
+
+# Global instance
+telegram_webhooks = TelegramWebhooks()
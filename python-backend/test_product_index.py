@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Checks for product identity: sibling models ("iPhone 15 Pro" / "iPhone 15 Pro
+Max") stay separate products, in the index and in find_best_match.
+
+Usage: python -m pytest test_product_index.py   (or run it directly)
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+
+from product_index import ProductIndex
+from scraping.engine import find_best_match
+from scraping.types import ScrapedProduct
+
+PRO_MAX = ScrapedProduct(title="Apple iPhone 15 Pro Max (Black, 256 GB)", price=150000, source='Amazon',
+                         product_url='https://www.amazon.in/dp/B0CHX1W1X1')
+PRO = ScrapedProduct(title="Apple iPhone 15 Pro (Black, 256 GB)", price=120000, source='Amazon',
+                     product_url='https://www.amazon.in/dp/B0CHX1W1X2')
+
+
+def test_pro_does_not_merge_into_pro_max():
+    index = ProductIndex()
+    pro_max_id, = index.observe([PRO_MAX])
+    pro_id, = index.observe([PRO])
+
+    assert pro_id != pro_max_id
+    assert index.resolve(PRO_MAX.title).price == PRO_MAX.price
+    assert index.resolve(PRO.title).product_id == pro_id
+
+
+def test_pro_max_does_not_merge_into_pro():
+    index = ProductIndex()
+    pro_id, = index.observe([PRO])
+    pro_max_id, = index.observe([PRO_MAX])
+
+    assert pro_id != pro_max_id
+    assert index.resolve(PRO.title).price == PRO.price
+
+
+def test_unlisted_sibling_resolves_to_nothing():
+    index = ProductIndex()
+    index.observe([PRO_MAX])
+
+    assert index.resolve(PRO.title) is None
+    assert index.resolve("iPhone 15 Pro Black 256GB") is None
+    assert index.resolve("Apple iPhone 15 Pro Max (Black, 512 GB)") is None
+
+
+def test_same_product_still_merges():
+    index = ProductIndex()
+    first, = index.observe([PRO])
+    again, = index.observe([ScrapedProduct(title="iPhone 15 Pro 256GB Black - Apple", price=119000,
+                                           source='Flipkart', product_url='')])
+
+    assert again == first
+    assert index.resolve(PRO.title).price == 119000
+
+
+def test_find_best_match_skips_siblings():
+    assert find_best_match([PRO_MAX], PRO.title) is None
+    assert find_best_match([PRO], PRO_MAX.title) is None
+    assert find_best_match([PRO_MAX, PRO], "iPhone 15 Pro 256GB") is PRO
+
+
+if __name__ == '__main__':
+    for name, check in list(globals().items()):
+        if name.startswith('test_'):
+            check()
+            print(f"✅ {name}")
@@ -10,7 +10,7 @@ from pathlib import Path
 
 sys.path.append(str(Path(__file__).parent))
 
-from telegram_integration import get_price_analysis_sync, set_price_alert_sync
+from telegram_integration import telegram_integration, init_telegram_integration
 
 async def test_telegram_integration():
     """Test the Telegram integration functions"""
@@ -25,33 +25,34 @@ async def test_telegram_integration():
     test_user_id = "test@example.com"
 
     try:
-        # Test price analysis
-        print("📊 Testing price analysis...")
-        analysis_result = get_price_analysis_sync(
+        await init_telegram_integration()
+
+        # Test price analysis notification
+        print("📊 Testing price analysis notification...")
+        analysis_result = {"trend": "Stable", "recommendation": "Buy Now", "current_price": test_current_price}
+        analysis_sent = await telegram_integration.notify_analysis(
             test_product_url,
             test_product_name,
-            test_current_price
+            analysis_result
         )
 
-        if analysis_result:
-            print("✅ Price analysis successful!")
-            print(f"Trend: {analysis_result.get('trend', 'N/A')}")
-            print(f"Recommendation: {analysis_result.get('recommendation', 'N/A')}")
+        if analysis_sent:
+            print("✅ Price analysis notification sent!")
         else:
-            print("❌ Price analysis failed")
+            print("❌ Price analysis notification failed (are TELEGRAM_BOT_TOKEN_n and TELEGRAM_CHAT_ID set?)")
 
-        # Test alert setting
-        print("🔔 Testing alert setting...")
-        alert_success = set_price_alert_sync(
+        # Test alert notification
+        print("🔔 Testing alert notification...")
+        alert_success = await telegram_integration.notify_alert(
             test_product_url,
             test_target_price,
             test_user_id
         )
 
         if alert_success:
-            print("✅ Alert setting successful!")
+            print("✅ Alert notification sent!")
         else:
-            print("❌ Alert setting failed")
+            print("❌ Alert notification failed")
 
         print("🎉 All tests completed!")
 
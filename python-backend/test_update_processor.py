@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Checks for ChatOrderedUpdateProcessor: per-chat order, and that a busy chat's
+queued updates don't hold concurrency slots other chats need.
+
+Usage: python -m pytest test_update_processor.py   (or run it directly)
+"""
+
+import sys
+import time
+import asyncio
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+
+from telegram import Chat, Message, Update
+
+from telegram_integration.processor import ChatOrderedUpdateProcessor
+
+HANDLER_SECONDS = 0.2
+
+
+def update_from(chat_id: int, update_id: int) -> Update:
+    chat = Chat(chat_id, Chat.PRIVATE)
+    return Update(update_id, message=Message(update_id, datetime.now(timezone.utc), chat))
+
+
+async def run_updates(processor, updates):
+    """Start every update at once; returns {update_id: (started, finished)} relative to the start"""
+    started = time.perf_counter()
+    timings = {}
+
+    async def handler(update):
+        begin = time.perf_counter() - started
+        await asyncio.sleep(HANDLER_SECONDS)
+        timings[update.update_id] = (begin, time.perf_counter() - started)
+
+    tasks = []
+    for update in updates:
+        tasks.append(asyncio.create_task(processor.process_update(update, handler(update))))
+        await asyncio.sleep(0)  # arrival order, as PTB's update fetcher creates them
+    await asyncio.gather(*tasks)
+    return timings
+
+
+def test_idle_chat_not_delayed_by_busy_chat():
+    processor = ChatOrderedUpdateProcessor(max_concurrent_updates=2)
+    busy = [update_from(1, i) for i in range(3)]
+    idle = update_from(2, 3)
+    timings = asyncio.run(run_updates(processor, busy + [idle]))
+
+    # The idle chat runs alongside the busy chat's first update, not after its queue
+    assert timings[idle.update_id][1] < HANDLER_SECONDS * 1.5
+    assert processor.active_chats == 0
+
+
+def test_chat_updates_run_in_order():
+    processor = ChatOrderedUpdateProcessor(max_concurrent_updates=4)
+    timings = asyncio.run(run_updates(processor, [update_from(1, i) for i in range(3)]))
+
+    for earlier, later in zip(range(2), range(1, 3)):
+        assert timings[later][0] >= timings[earlier][1]
+
+
+def test_slots_still_bound_concurrency():
+    processor = ChatOrderedUpdateProcessor(max_concurrent_updates=2)
+    timings = asyncio.run(run_updates(processor, [update_from(chat, chat) for chat in range(4)]))
+
+    # Four chats, two slots: the last two wait for the first two
+    assert sorted(end for _, end in timings.values())[2] >= HANDLER_SECONDS * 2
+
+
+if __name__ == '__main__':
+    for name, check in list(globals().items()):
+        if name.startswith('test_'):
+            check()
+            print(f"✅ {name}")